@@ -11,6 +11,12 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 from general.sams_helper_functions import *
 from general.sams_queries import *
+from general.db_helper_functions import (
+  get_school_name
+)
+from general.term_metadata import (
+  term_code_ends
+)
 
 
 # Create connections
@@ -31,25 +37,6 @@ st_year = 2016
 sheet_pw = 'ADG'
 
 
-def get_school_name(school_code):
-  if school_code == '610P':
-    return 'CBO'
-  if school_code == '615H':
-    return 'ACCT'
-  if school_code == '620H':
-    return 'BITL'
-  if school_code == '625H':
-    return 'EFM'
-  if school_code == '630H':
-    return 'MGT'
-  if school_code == '650T':
-    return 'VBE'
-  if school_code == '660H':
-    return 'GSBL'
-  if school_code == 'VN':
-    return 'Not CoB'
-  return None
-
 def list_to_text(obList):
   # converts a list of object into a string list for sql IN statement
   txt = "("
@@ -150,77 +137,8 @@ ORDER BY enrl.term_code DESC
   '''.format(st_term, term_code, course_code, st_year, term_txt)
   return(qry)
 
-def get_term_category(location, semester=None):
-  if semester != None:
-    if location == 'MELB':
-      return [current_semester]
-    if location == 'SBM':
-      return [current_semester+4]
-    if location == 'SIM':
-      if semester == 1:
-        return[5]
-      if semester == 2:
-        return [7]
-    else:
-      print('Selection not available')
-      return None
-
-  if semester == None:
-    if location == 'MELB':
-      return [1, 2]
-    if location == 'SBM':
-      return [5, 6, 7]
-    if location == 'SIM':
-      return [5, 7]
-    else:
-      print('Selection not available')
-      return None
-
-def get_term_code(location, semester=None, level='VE'):
-  if semester != None:
-    if location == 'MELB':
-      
-      if semester == 1:
-        if level == 'VE':
-          return ['05']
-        else:
-          return ['10']
-    
-      if semester == 2:
-        if level == 'VE':
-          return ['45']
-        else:
-          return ['50']
-    
-    if location == 'SBM':
-      return ['9{}'.format(semester)]
-
-    if location == 'SIM':
-      if semester == 1:
-        return ['20']
-      if semester == 2:
-        return ['60']
-    else:
-      print('Selection not available')
-      return None
-
-  if semester == None:
-    if location == 'MELB':
-      if level == 'VE':
-        return ['05', '45']
-      else:
-        return ['10', '50']
-    if location == 'SBM':
-      return ['91', '92', '93']
-    if location == 'SIM':
-      return ['20', '60']
-    else:
-      print('Selection not available')
-      return None
-    
-
 term_cat = get_term_category(location, current_semester)
-term_code = get_term_code(location, current_semester)
+term_code = term_code_ends(location, current_semester, level='VE')
 
 
 start = dt.datetime.now()
@@ -241,12 +159,12 @@ for i_course, r_course in df_courses.iterrows():
     sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
                                              term_code=r_course['term_code'],
                                              st_year=st_year,
-                                             get_term_code=get_term_code(location, current_semester, level))
+                                             get_term_code=term_code_ends(location, current_semester, level))
   else:
     sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
                                              term_code=r_course['term_code'],
                                              st_year=st_year,
-                                             term_codes=get_term_code(location, level=level))
+                                             term_codes=term_code_ends(location, level=level))
   try:
     df = pd.read_sql(sql=sams_qry, con=sams_engine)
     #print(tabulate(df, headers='keys'))
@@ -10,27 +10,14 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 from general.sams_helper_functions import *
 from general.sams_queries import *
+from general.db_helper_functions import (
+  get_school_name
+)
+from general.term_metadata import (
+  term_code_ends
+)
 
 
-def get_school_name(school_code):
-  if school_code == '610P':
-    return 'CBO'
-  if school_code == '615H':
-    return 'ACCT'
-  if school_code == '620H':
-    return 'BITL'
-  if school_code == '625H':
-    return 'EFM'
-  if school_code == '630H':
-    return 'MGT'
-  if school_code == '650T':
-    return 'VBE'
-  if school_code == '660H':
-    return 'GSBL'
-  if school_code == 'VN':
-    return 'Not CoB'
-  return None
-
 def list_to_text(obList):
   # converts a list of object into a string list for sql IN statement
   txt = "("
@@ -140,68 +127,6 @@ ORDER BY enrl.term_code DESC
   '''.format(st_term, term_code, course_code, st_year, term_txt)
   return(qry)
 
-def get_term_category(location, semester=None):
-  if semester != None:
-    if location == 'MELB':
-      return [current_semester]
-    if location == 'SBM':
-      return [current_semester+4]
-    if location == 'SIM':
-      if semester == 1:
-        return[5]
-      if semester == 2:
-        return [7]
-    else:
-      print('Selection not available')
-      return None
-
-  if semester == None:
-    if location == 'MELB':
-      return [1, 2]
-    if location == 'SBM':
-      return [5, 6, 7]
-    if location == 'SIM':
-      return [5, 7]
-    else:
-      print('Selection not available')
-      return None
-
-def get_term_code(location, semester=None):
-  print(semester)
-  if semester != None:
-    if location == 'MELB':
-      if semester == 1:
-        return ['05', '10']
-      if semester == 2:
-        return ['45', '50']
-    if location == 'SBM':
-      return ['9{}'.format(semester)]
-      
-    if location == 'SIM':
-      if semester == 1:
-        return ['20']
-      if semester == 2:
-        return ['60']
-    else:
-      print('Selection not available')
-      return None
-
-  if semester == None:
-    print('herhe')
-    if location == 'MELB':
-      return ['05', '10', '45', '50']
-    if location == 'SBM':
-      return ['91', '92', '93']
-    if location == 'SIM':
-      return ['20', '60']
-    if location == 'UPH':
-      return ['08', '48', '20', '30', '60']
-    else:
-      print('Selection not available')
-      return None
-    
-
-    
 # Create connections
 # create sams engine this is the connection to the oracle database
 password_str = input("SAMS Password: ") ## Input password
@@ -227,7 +152,7 @@ sheet_pw = 'ADG'
 
 
 #term_cat = get_term_category(location, current_semester)
-term_code = get_term_code(location)
+term_code = term_code_ends(location)
 term_code = ['08']
 
 start = dt.datetime.now()
@@ -241,12 +166,12 @@ for i_course, r_course in df_courses.iterrows():
     sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
                                              term_code=r_course['term_code'],
                                              st_year=st_year,
-                                             get_term_code=get_term_code(location, current_semester))
+                                             get_term_code=term_code_ends(location, current_semester))
   else:
     sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
                                              term_code=r_course['term_code'],
                                              st_year=st_year,
-                                             term_codes=get_term_code(location))
+                                             term_codes=term_code_ends(location))
   try:
     df = pd.read_sql(sql=sams_qry, con=sams_engine)
     #print(tabulate(df, headers='keys'))
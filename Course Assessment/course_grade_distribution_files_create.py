@@ -6,15 +6,18 @@ import openpyxl
 import datetime as dt
 import shutil
 from tabulate import tabulate
+from sqlalchemy import create_engine
 
 import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 from general.sams_helper_functions import *
 from general.sams_queries import *
 from general.db_helper_functions import (
-  objectlist_to_text,
   get_school_name,
   get_campus_list_string)
+from general.grade_distribution import (
+  qry_grade_distribution_history
+)
 
 
 # Input parameters
@@ -43,6 +46,18 @@ sheet_pw = 'ADG'
 password_str = input("SAMS Password: ")   # Input password
 sams_engine = return_sams_engine(password_str=password_str)
 
+# create postgres engine, the grade distributions are read from courses.tbl_grade_distribution
+# (load the semester first with pipeline/update_postgres_grade_distribution.py)
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+postgres_pw = input("Postgres Password: ")
+engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                           postgres_pw,
+                                                           postgres_host,
+                                                           postgres_dbname)
+postgres_engine = create_engine(engine_string)
+
 
 def get_all_bus_courses(term_year, term_code, campus=None):
   qry = '''
@@ -78,67 +93,6 @@ def get_all_bus_courses(term_year, term_code, campus=None):
   return qry
   
 
-def get_course_grade_distribution(course_code, term_code='1850', start_year=2015, term_codes_ends=None):
-  start_term = '{}00'.format(str(int(start_year)-2000))
-
-  term_end_txt = objectlist_to_text(term_codes_ends)
-
-  qry = '''
-  SELECT
-    cls.course_code,
-    enrl.term_code,
-    term.term_name,
-    sum(enrl.nn) AS nn,
-    sum(enrl.pa) AS pa,
-    sum(enrl.cr) AS cr,
-    sum(enrl.di) AS di,
-    sum(enrl.hd) AS hd
-  
-  FROM (
-    SELECT
-      t1.CLASS_NBR,
-      t1.STRM AS term_code,
-      sum(CASE WHEN t1.GRD_PTS_PER_UNIT = 0 AND t1.CRSE_GRADE_OFF IN ('NN', 'DNS', 'NH', 'SP') THEN 1 ELSE 0 END) AS nn,
-      sum(CASE WHEN t1.GRD_PTS_PER_UNIT = 1 THEN 1 ELSE 0 END) AS pa,
-      sum(CASE WHEN t1.GRD_PTS_PER_UNIT = 2 THEN 1 ELSE 0 END) AS cr,
-      sum(CASE WHEN t1.GRD_PTS_PER_UNIT = 3 THEN 1 ELSE 0 END) AS di,
-      sum(CASE WHEN t1.GRD_PTS_PER_UNIT = 4 THEN 1 ELSE 0 END) AS hd
-  
-    FROM	PS_STDNT_ENRL t1
-    WHERE
-        t1.strm >= '{0}' AND t1.strm < '{1}' AND substr(strm,3,2) IN {4}
-        AND t1.INCLUDE_IN_GPA = 'Y'
-        AND t1.STDNT_ENRL_STATUS = 'E'
-        AND t1.ENRL_STATUS_REASON='ENRL'
-        AND t1.GRADING_BASIS_ENRL<>'NON'
-  
-    GROUP BY t1.CLASS_NBR, t1.STRM
-    ) enrl
-  
-  INNER JOIN (
-    SELECT DISTINCT
-      t2.CLASS_NBR,
-      t2.STRM AS term_code,
-      t2.SUBJECT || t2.CATALOG_NBR AS course_code
-    FROM PS_CLASS_TBL t2
-    WHERE t2.acad_group = 'BUS' AND t2.SUBJECT || t2.CATALOG_NBR = '{2}'
-    ) cls ON (cls.CLASS_NBR = enrl.CLASS_NBR AND cls.term_code = enrl.term_code)
-  
-  INNER JOIN (
-    SELECT DISTINCT
-      t3.STRM AS term_code,
-      t3.descrshort AS term_name,
-      t3.term_category,
-      t3.acad_year AS term_year
-    FROM PS_TERM_TBL t3
-    WHERE t3.acad_year >= {3}
-    ) term ON (enrl.term_code = term.term_code)
-  GROUP BY cls.course_code, enrl.term_code, term.term_name
-  ORDER BY enrl.term_code DESC
-  '''.format(start_term, term_code, course_code, start_year, term_end_txt)
-  return qry
-
-
 start = dt.datetime.now()
 
 # Get all courses
@@ -149,31 +103,26 @@ df_courses = pd.read_sql(sql=get_all_bus_courses(current_year,
                          con=sams_engine)
 print(tabulate(df_courses, headers='keys'))
 
+# Grade distributions of the earlier terms of every course, read once
+if equivalent_semesters:
+  term_codes_ends = get_term_code_ends(location, current_semester, level)
+else:
+  term_codes_ends = get_term_code_ends(location, None, level)
+df_grades = pd.read_sql(sql=qry_grade_distribution_history(term_codes_ends,
+                                                           start_year=st_year,
+                                                           end_term=term_code_final,
+                                                           course_codes=df_courses['course_code'].tolist()),
+                        con=postgres_engine)
+course_grades = {course_code: df.reset_index(drop=True) for course_code, df in df_grades.groupby('course_code')}
+
 # Iterate through courses
 for i_course, r_course in df_courses.iterrows():
   # While testing new semester turn this on
   # if i_course > 4:
   #   break
   
-  # Get course data from sams
-  if equivalent_semesters:
-    sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
-                                             term_code=r_course['term_code'],
-                                             start_year=st_year,
-                                             term_codes_ends=get_term_code_ends(location,
-                                                                                current_semester,
-                                                                                level))
-  else:
-    sams_qry = get_course_grade_distribution(course_code=r_course['course_code'],
-                                             term_code=r_course['term_code'],
-                                             start_year=st_year,
-                                             term_codes_ends=get_term_code_ends(location,
-                                                                                None,
-                                                                                level))
-  try:
-    df = pd.read_sql(sql=sams_qry, con=sams_engine)
-  except:
-    print(sams_qry)
+  # Grade distribution of the course (latest term first)
+  df = course_grades.get(r_course['course_code'], df_grades.iloc[:0])
   
   # open template
   directory = 'H:\\Projects\\CoB\\Course_Assessment_Moderation\\{}S{}\\'.format(current_year, current_semester)
@@ -12,6 +12,7 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.ces_teacher_data import load_teacher_data
 
 custom_palette = sns.color_palette([rc.RMIT_White, rc.RMIT_Blue2, rc.RMIT_Green3, rc.RMIT_White])
 custom_palette2 = sns.color_palette([rc.RMIT_White, rc.RMIT_Blue, rc.RMIT_Green, rc.RMIT_White])
@@ -80,15 +81,6 @@ postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
 '''------------------------------ Helper functions -----------------------------------'''
 
-def get_course_teacher_ces(cur, tbl='vw811_teacher_data', schema='ces'):
-  # Returns a dataframe with change in CES data for 2019
-  qry = ' SELECT \n' \
-        "    t1.*, LEFT(RIGHT(teaching_staff,7),6) AS emplid \n" \
-        ' FROM {0}.{1} t1 \n' \
-        ' WHERE t1.teacher_count > 5 \n' \
-        " ORDER BY t1.teaching_staff, t1.year, t1.semester, t1.type".format(schema, tbl)
-  return db_extract_query_to_dataframe(qry, cur, print_messages=False)
-
 def get_teachers(cur, tbl='vw810_teacher_data_agg', schema='ces'):
   # Returns a dataframe with change in CES data for 2019
   qry = ' SELECT \n' \
@@ -102,7 +94,8 @@ def get_teachers(cur, tbl='vw810_teacher_data_agg', schema='ces'):
 
 '''-------------------------------------------- Create Dataframes -------------------------------------'''
 
-df = get_course_teacher_ces(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces')
+df = load_teacher_data(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces',
+                       min_teacher_count=5)
 df2 = get_teachers(cur=postgres_cur, tbl='vw810_teacher_data_agg', schema='ces')
 step = 12
 sns.set_style("darkgrid")
@@ -12,6 +12,7 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.ces_teacher_data import load_teacher_data
 
 box_palette = sns.color_palette([rc.RMIT_Blue3, rc.RMIT_Orange3])
 swarm_palette = sns.color_palette([rc.RMIT_Blue2, rc.RMIT_Orange2])
@@ -82,15 +83,6 @@ postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
 '''------------------------------ Helper functions -----------------------------------'''
 
-def get_course_teacher_ces(cur, tbl='vw811_teacher_data', schema='ces'):
-  # Returns a dataframe with change in CES data for 2019
-  qry = ' SELECT \n' \
-        "    t1.*, LEFT(RIGHT(teaching_staff,7),6) AS emplid \n" \
-        ' FROM {0}.{1} t1 \n' \
-        " WHERE t1.teacher_count > 5 AND type IN ('Staff', 'Course') \n" \
-        " ORDER BY t1.teaching_staff, t1.year, t1.semester, t1.type".format(schema, tbl)
-  return db_extract_query_to_dataframe(qry, cur, print_messages=False)
-
 def get_teachers(cur, tbl='vw810_teacher_data_agg', schema='ces'):
   # Returns a dataframe with change in CES data for 2019
   qry = ' SELECT \n' \
@@ -127,7 +119,8 @@ if vert == False:
   legend_loc = 'lower right'
 
 
-df = get_course_teacher_ces(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces')
+df = load_teacher_data(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces',
+                       min_teacher_count=5, types=['Staff', 'Course'])
 df2 = get_teachers(cur=postgres_cur, tbl='vw810_teacher_data_agg', schema='ces')
 
 j = 0
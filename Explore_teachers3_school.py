@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 import general.RMIT_colours as rc
+from general.ces_teacher_data import load_teacher_data
 from tabulate import tabulate
 from numpy import NaN
 
@@ -75,18 +76,6 @@ postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 '''------------------------------ Helper functions -----------------------------------'''
 
 
-def get_course_teacher_ces(cur, tbl='vw811_teacher_data', schema='ces'):
-  # Returns a data frame with change in CES data for 2019
-  qry = ' SELECT \n' \
-        "    t1.*, " \
-        "    LEFT(RIGHT(teaching_staff,7),6) AS emplid, " \
-        "    LEFT(course_code,4) AS subject_area \n" \
-        ' FROM {0}.{1} t1 \n' \
-        " WHERE t1.teacher_count > 5 AND type IN ('Staff', 'Course') \n" \
-        " ORDER BY t1.teaching_staff, t1.year, t1.semester, t1.type".format(schema, tbl)
-  return db_extract_query_to_dataframe(qry, cur, print_messages=False)
-
-
 def get_teachers(cur, tbl='vw810_teacher_data_agg', schema='ces'):
   # Returns a data frame with change in CES data for 2019
   qry = ' SELECT \n' \
@@ -134,7 +123,8 @@ if not vert:
   legend_loc = 'lower right'
 
 '''-------------------------------------------- Create Dataframes -------------------------------------'''
-df = get_course_teacher_ces(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces')
+df = load_teacher_data(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces',
+                       min_teacher_count=5, types=['Staff', 'Course'], report=True)
 df2 = get_teachers(cur=postgres_cur, tbl='vw810_teacher_data_agg', schema='ces')
 
 df_school = df.loc[(df['school'] == 'EFM')]
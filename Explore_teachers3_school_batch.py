@@ -0,0 +1,79 @@
+## Batch version of Explore_teachers3_school.py
+# Renders the teacher/course GTS comparison pages for every school teacher across a process pool
+# and writes one combined pdf per school (plus the png per page used previously).
+
+import time
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  connect_to_postgres_db,
+  db_extract_query_to_dataframe
+)
+from general.ces_teacher_data import load_teacher_data
+from general.teacher_chart_export import export_teacher_pages
+
+
+def get_teachers(cur, tbl='vw810_teacher_data_agg', schema='ces'):
+  # Returns a data frame with change in CES data for 2019
+  qry = ' SELECT \n' \
+        "   LEFT(RIGHT(teaching_staff,7),6) AS emplid, teaching_staff, \n" \
+        "   avg_gts, avg_crse_gts, avg_gts-avg_crse_gts AS avg_gts_diff \n" \
+        ' FROM {0}.{1} \n' \
+        ' WHERE count_2019 > 0 AND count >= 5 \n' \
+        " ORDER BY avg_gts; \n" \
+        "".format(schema, tbl)
+  return db_extract_query_to_dataframe(qry, cur, print_messages=False)
+
+
+if __name__ == '__main__':
+  '''--------------------------------- Connect to Database  ----------------------------'''
+  postgres_pw = input("Postgres Password: ")
+  postgres_user = 'pjryan'
+  postgres_host = 'localhost'
+  postgres_dbname = 'postgres'
+
+  con_string = "host='{0}' " \
+               "dbname='{1}' " \
+               "user='{2}' " \
+               "password='{3}' " \
+               "".format(postgres_host, postgres_dbname, postgres_user, postgres_pw)
+
+  postgres_con, postgres_cur = connect_to_postgres_db(con_string)
+
+  '''-------------------------------------------- Set Parameters -------------------------------------'''
+  schools = ['EFM']
+  current_year = 2019
+  step = 10
+  vert = False
+  processes = None  # None uses every core
+  folder = 'H:\\Projects\\CoB\\CES\\Teachers\\'
+
+  '''-------------------------------------------- Create Dataframes -------------------------------------'''
+  start = time.time()
+  df = load_teacher_data(cur=postgres_cur, tbl='vw811_teacher_data', schema='ces',
+                         min_teacher_count=5, types=['Staff', 'Course'], report=True)
+  df2 = get_teachers(cur=postgres_cur, tbl='vw810_teacher_data_agg', schema='ces')
+  print('Data loaded in {:.1f}s'.format(time.time() - start))
+
+  for school in schools:
+    df_school = df.loc[(df['school'] == school)]
+    teachers_school = df_school.loc[(df_school['year'] == current_year)]['emplid'].unique().tolist()
+
+    # Teachers ordered by average gts (order of vw810_teacher_data_agg)
+    df2_school = df2.loc[(df2['emplid'].isin(teachers_school))]
+    print(tabulate(df2_school, headers='keys'))
+
+    orientation = 'vert' if vert else 'hzon'
+    export_teacher_pages(df_school,
+                         df2_school['emplid'].tolist(),
+                         pdf_filename=folder + '{0}_teacher_gts_{1}S1_{2}.pdf'.format(school, current_year, orientation),
+                         step=step,
+                         processes=processes,
+                         png_filename_format=folder + '{0}_teacher_gts_{1}S1_{2}'.format(school, current_year, orientation)
+                                             + '_n{:02d}.png',
+                         settings={'vert': vert,
+                                   'current_year': current_year,
+                                   'title': 'Teacher/Course GTS comparison (2015-{})'.format(current_year)})
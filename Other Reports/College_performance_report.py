@@ -1,9 +1,7 @@
 import base64
 
-import plotly
 import chart_studio.plotly as py
 import plotly.graph_objs as go
-import plotly.offline
 
 from tabulate import tabulate
 
@@ -11,12 +9,13 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 
 
 from general.db_helper_functions import (
-  connect_to_postgres_db,
-  db_extract_query_to_dataframe
+  connect_to_postgres_db
 )
+from general.performance_cube import PerformanceCube
 
 
 '''--------------------------------- Initialise Parameters  ----------------------------'''
@@ -44,16 +43,10 @@ postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
 
 '''-------------------------------------------- Get Data -------------------------------------'''
-qry = ' SELECT * \n' \
-      ' FROM ces.vw157_college_for_graph \n' \
-      " WHERE year >= {1} AND level = '{0}' \n" \
-      " ORDER BY college, year, semester \n" \
-      "; \n".format(acad_career, start_year)
- 
-df_college = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
+# every college, year and semester of the level in one query
+college_cube = PerformanceCube.from_db(postgres_cur, 'college', start_year, levels=[acad_career])
 
-
-print(tabulate(df_college, headers='keys'))
+print(tabulate(college_cube.frame, headers='keys'))
 
 
 def line_graph_colleges_measure(df1, level, measure='gts',
@@ -92,39 +85,34 @@ def line_graph_colleges_measure(df1, level, measure='gts',
   y = []
   label_check += 1
   
+  cube = PerformanceCube.from_frame(df1, 'college', start_year, end_year)
+  # maker size bases on population
+  size_scale = 2000 if level == 'VE' else 5000
+  
   for college_name_short in ['CoB', 'DSC', 'SEH']:
-    df_1 = df1.loc[(df1['semester'] == 1) & (df1['college_name_short'] == college_name_short)]
-    df_2 = df1.loc[(df1['semester'] == 2) & (df1['college_name_short'] == college_name_short)]
-
-    # maker size bases on population
-    size_1 = []
-    size_2 = []
-    for i, r in df_1.iterrows():
-      if level == 'VE':
-        size_1.append(r['population']/2000)
-      if level == 'HE':
-        size_1.append(r['population'] / 5000)
-    for i, r in df_2.iterrows():
-      if level == 'VE':
-        size_2.append(r['population']/2000)
-      if level == 'HE':
-        size_2.append(r['population'] / 5000)
+    colour = cube.attribute(college_name_short, level, 'colour_html')
+    y_1 = cube.series(college_name_short, level, 1, measure, start_year, end_year)
+    y_2 = cube.series(college_name_short, level, 2, measure, start_year, end_year)
+    size_1 = [0 if p is None else p / size_scale
+              for p in cube.series(college_name_short, level, 1, 'population', start_year, end_year)]
+    size_2 = [0 if p is None else p / size_scale
+              for p in cube.series(college_name_short, level, 2, 'population', start_year, end_year)]
 
     no_terms = len(xlabels)
     
     # Create Semester 1 trace (solid)
     trace_sem1 = go.Scatter(
       x=x,
-      y=df_1[measure].tolist(),
+      y=y_1,
       name='{} S1  '.format(college_name_short),
       text=None,
       textfont={'size': 14,
-                'color': df_1.iloc[0]['colour_html']},
+                'color': colour},
       line=go.scatter.Line(width=2,
-                   color=df_1.iloc[0]['colour_html'],
+                   color=colour,
                    ),
       marker=go.scatter.Marker(
-        color=df_1.iloc[0]['colour_html'],
+        color=colour,
         size=size_1,
         symbol='circle'
       ),
@@ -138,15 +126,15 @@ def line_graph_colleges_measure(df1, level, measure='gts',
     # Create Semester 2 trace (dashed)
     trace_sem2 = go.Scatter(
       x=x,
-      y=df_2[measure].tolist(),
+      y=y_2,
       name='{} S2  '.format(college_name_short),
       text=None,
       line=go.scatter.Line(
         width=2,
-        color=df_2.iloc[0]['colour_html'],
+        color=colour,
         dash='dot', ),
       marker=go.scatter.Marker(
-        color=df_2.iloc[0]['colour_html'],
+        color=colour,
         size=size_2,
         symbol='diamond'
       ),
@@ -197,14 +185,14 @@ def line_graph_colleges_measure(df1, level, measure='gts',
          )
          }
   filename = folder + '{}_{}_{}_2019S1'.format(acad_career, 'Colleges', measure)
-  plotly.offline.plot(fig, filename + '.html')
+  report_plot(fig, filename + '.html')
   py.image.save_as(fig, filename + '.png')
   return fig
 
 
 for m in ['gts', 'osi', 'gts_mean', 'osi_mean']:
   fig = line_graph_colleges_measure(
-                  df_college,
+                  college_cube,
                   acad_career,
                   measure=m,
                   start_year=start_year, end_year=end_year,
@@ -1,6 +1,5 @@
 
 
-import plotly
 import plotly.plotly as py
 import plotly.graph_objs as go
 from plotly import tools
@@ -9,20 +8,22 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 from tabulate import tabulate
 
-import plotly.offline
-
 
 
 from general.db_helper_functions import (
-  connect_to_postgres_db,
-  db_extract_query_to_dataframe
+  connect_to_postgres_db
 )
+from general.common_core_fail_rate import FailRateEngine
 
 
 
 '''--------------------------------- Initialise Parameters  ----------------------------'''
+# fail rates are read once and cached here, set refresh_cache when the table is reloaded
+fr_cache_file = 'C:\\Peter\\CoB\\common_core_fr.pkl'
+refresh_cache = False
 
 '''--------------------------------- Connect to Database  ----------------------------'''
 # create postgres engine this is the connection to the postgres database
@@ -40,55 +41,10 @@ postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
 
 '''-------------------------------------------- Get Data -------------------------------------'''
- 
-def qry_location_history(location,
-                         course_name,
-                         degree_type="('UG')",
-                         schema='projects',
-                         table='tbl_common_core_fr_cleaned'):
-  
-  qry = ' SELECT year, semester, location, course_name, fail_rate \n' \
-        ' FROM {0}.{1} \n' \
-        " WHERE degree_type IN {2} \n" \
-        "   AND location = '{3}' \n" \
-        "   AND course_name = '{4}' \n" \
-        "".format(schema, table, degree_type, location, course_name)
-  
-  qry += " ORDER BY course_name, location, year, semester\n"
-  return qry
-
-def qry_location_diff_history(course_name):
-  qry = " SELECT \n" \
-        "   year, semester, course_name, \n" \
-        "   sum(fail_rate) FILTER (WHERE location = 'SIM') AS fr_sim, \n" \
-        "   sum(fail_rate) FILTER (WHERE location = 'ONSHORE') AS fr_onshore, \n" \
-        "   sum(fail_rate) FILTER (WHERE location = 'ONSHORE') - \n" \
-        "   sum(fail_rate) FILTER (WHERE location = 'SIM') AS fr_diff \n" \
-        " FROM projects.tbl_common_core_fr_cleaned \n" \
-        " WHERE degree_type = 'UG' AND semester <> 3 AND course_name = '{}' \n" \
-        " GROUP BY year, semester, course_name \n" \
-        " ORDER BY course_name, year, semester \n" \
-        "".format(course_name)
-  
-  return qry
+# projects.tbl_common_core_fr_cleaned once, every history and location difference comes from this
+fr_engine = FailRateEngine.from_db(postgres_cur, cache_file=fr_cache_file, refresh=refresh_cache)
 
 
-def qry_course_history(course_name,
-                       location=None,
-                       degree_type=None,
-                       schema='projects',
-                       table='tbl_common_core_fr_cleaned'):
-  qry = ' SELECT year, semester, location, course_name, fail_rate \n' \
-        ' FROM {0}.{1} \n' \
-        " WHERE course_name = '{2}'".format(schema, table, course_name)
-
-  if location != None:
-      qry += "   AND degree_type IN {} \n".format(degree_type)
-  if location != None:
-      qry += "   AND location = '{}' \n".format(location)
-  qry += " ORDER BY course_name, location, year, semester\n"
-  return qry
-
 def line_trace_course_fr(course_name,
                          colour,
                          location=None,
@@ -98,14 +54,7 @@ def line_trace_course_fr(course_name,
                          show_course_name=True,
                          showlegend=True
                          ):
-  qry = qry_course_history(
-    location=location,
-    course_name=course_name,
-    degree_type=degree_type)
-  
-  df1 = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
-  if semester == 1:   df1 = df1.loc[df1['semester'] == 1]
-  elif semester == 2: df1 = df1.loc[df1['semester'] == 2]
+  df1 = fr_engine.history(course_name, location=location, degree_types=degree_type, semester=semester)
   
   x = [i/2.0 for i in range(1, 7)]
   
@@ -148,12 +97,7 @@ def line_trace_course_fr_diff(course_name,
                               semester=None,
                               dash_type=None,
                               showlegend=True):
-  qry = qry_location_diff_history(course_name)
-  df1 = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
-  if semester == 1:
-    df1 = df1.loc[df1['semester'] == 1]
-  elif semester == 2:
-    df1 = df1.loc[df1['semester'] == 2]
+  df1 = fr_engine.diff_history(course_name, semester=semester)
   
   x = [i - 0.5 for i in range(1, 7)]
   
@@ -220,7 +164,7 @@ def create_location_course_graph(
         course_name,
         colour,
         location=location,
-        degree_type="('UG')",
+        degree_type=['UG'],
         semester=semester,
         dash_type=None
       )
@@ -272,7 +216,7 @@ def create_location_course_graph(
     )
   )
   filename = folder + 'common_core_{}_graph_UG'.format(location.lower())
-  plotly.offline.plot(fig, filename+'.html')
+  report_plot(fig, filename+'.html')
   print (filename)
   return fig
 
@@ -366,7 +310,7 @@ def create_location_diff_course_graph(
   )
   filename = folder + 'common_core_location_diff_graph_UG'.format()
   print(filename)
-  plotly.offline.plot(fig, filename + '.html')
+  report_plot(fig, filename + '.html')
   return fig
 
 
@@ -390,27 +334,17 @@ def create_course_graph(
     rc.RMIT_Arctic
     ]
   
-  qry = ' SELECT DISTINCT location \n' \
-        ' FROM projects.tbl_common_core_fr_cleaned \n' \
-        " WHERE degree_type = '{}' \n" \
-        "       AND course_name = '{}' " \
-        "       AND location <> 'UPH' \n" \
-        "       AND location <> 'VIETNAM' \n" \
-        ' ORDER BY location' \
-        ''.format(degree, course_name)
-
-  df_locs = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
+  locations = fr_engine.locations(course_name, degree, exclude=['UPH', 'VIETNAM'])
   
-  for i, r in df_locs.iterrows():
+  for i, location in enumerate(locations):
     colour = colourList[i]
-    location = r.location
     
     traces.append(
       line_trace_course_fr(
         course_name,
         colour,
         location=location,
-        degree_type="('{}')".format(degree),
+        degree_type=[degree],
         semester=semester,
         dash_type=None,
         show_course_name=False
@@ -458,7 +392,7 @@ def create_course_graph(
     )
   )
   filename = folder + '{}_{}_graph.html'.format(course_name.lower(), degree)
-  plotly.offline.plot(fig, filename=filename)
+  report_plot(fig, filename=filename)
   
   print(filename)
   return fig
@@ -505,26 +439,17 @@ for degree in degList:
       rc.RMIT_Arctic
     ]
 
-    qry = ' SELECT DISTINCT location \n' \
-          ' FROM projects.tbl_common_core_fr_cleaned \n' \
-          " WHERE degree_type = '{}' \n" \
-          "       AND course_name = '{}' " \
-          "       AND location <> 'UPH' \n" \
-          ' ORDER BY location' \
-          ''.format(degree, course_name)
-
-    df_locs = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
+    locations = fr_engine.locations(course_name, degree, exclude=['UPH'])
 
-    for i, r in df_locs.iterrows():
+    for i, location in enumerate(locations):
       colour = colourList[i]
-      location = r.location
 
       fig.append_trace(
         line_trace_course_fr(
           course_name,
           colour,
           location=location,
-          degree_type="('{}')".format(degree),
+          degree_type=[degree],
           semester=None,
           dash_type=None,
           show_course_name=False,
@@ -583,7 +508,7 @@ for degree in degList:
     
   folder = 'C:\\Peter\\'
   filename = folder + 'CC_{}_graph.html'.format(degree)
-  plotly.offline.plot(fig, filename=filename)
+  report_plot(fig, filename=filename)
   
 
 '''
@@ -4,11 +4,12 @@ import plotly.graph_objs as go
 import plotly.offline
 
 
-from tabulate import tabulate
+import os
 import pandas as pd
 import numpy as np
 
 import scipy.stats as scipystats
+from joblib import Parallel, delayed
 from statsmodels.graphics.regressionplots import *
 import matplotlib.pyplot as plt
 
@@ -16,55 +17,187 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 
 
 from general.db_helper_functions import (
+  connect_to_postgres_db,
   db_extract_query_to_dataframe
 )
 
+'''--------------------------------------- Comparison engine ------------------------------------'''
+# Statistics of the change in course GTS for enhanced (ce=1) and other (ce=0) courses.
+# The statistics of every group (semester, wave or school) come from one grouped pass over the
+# evaluation data, the confidence intervals and p-values are calculated from the grouped
+# statistics as arrays, and the bootstrap intervals are calculated for the groups in parallel.
+
+ce_group_levels = {
+  'semester': ['year', 'semester'],
+  'wave': ['wave'],
+  'school': ['school_name_short'],
+  'semester_school': ['year', 'semester', 'school_name_short'],
+}
+
+
+def qry_ce_evaluation(start_year, end_year, table='vw204_ce_evaluation'):
+  # wave from the course tracking (courses that were never enhanced have no wave)
+  qry = " SELECT e.year, e.semester, e.course_code_ces, e.gts_delta::numeric, \n" \
+        "   CASE WHEN e.la=true THEN 1 ELSE 0 END AS ce, \n" \
+        "   COALESCE(t.wave::text, 'None') AS wave, \n" \
+        "   COALESCE(s.school_name_short, 'Unknown') AS school_name_short \n" \
+        " FROM course_enhancement.{0} e \n" \
+        "   LEFT JOIN (SELECT DISTINCT ON (course_code_ces) course_code_ces, wave \n" \
+        "              FROM course_enhancement.tbl_course_tracking \n" \
+        "              ORDER BY course_code_ces, cycle) t \n" \
+        "     ON e.course_code_ces = t.course_code_ces \n" \
+        "   LEFT JOIN (SELECT DISTINCT ON (course_code_ces) course_code_ces, school_name_short \n" \
+        "              FROM ces.vw2_course_summaries_fixed \n" \
+        "              ORDER BY course_code_ces, year DESC, semester DESC) s \n" \
+        "     ON e.course_code_ces = s.course_code_ces \n" \
+        " WHERE e.gts_pre IS NOT NULL AND e.gts_post IS NOT NULL \n" \
+        "   AND e.year >= {1} AND e.year <= {2} \n" \
+        "".format(table, start_year, end_year)
+  return qry
+
+
+def get_ce_evaluation(cur, start_year=2017, end_year=2019, table='vw204_ce_evaluation'):
+  df1 = db_extract_query_to_dataframe(qry_ce_evaluation(start_year, end_year, table), cur, print_messages=False)
+  df1['gts_delta'] = df1['gts_delta'].astype(float)
+  return df1
+
+
+def ce_group_stats(df1, by=('year', 'semester'), value='gts_delta', ci=0.95):
+  '''
+  n, mean, std, sem and confidence interval of enhanced and other courses for every group,
+  with the t-test p-value of enhanced vs other.
+  :param by: group columns e.g. ['year', 'semester'], ['wave'], ['school_name_short']
+  :param ci: confidence level of the t interval
+  :return: data frame, one row per group: <by>, n_ce, mean_ce, sem_ce, ci_low_ce, ci_high_ce, ... _other, pval
+  '''
+  by = list(by)
+  df_stats = df1.groupby(by + ['ce'])[value].agg(['size', 'mean', 'std']).rename(columns={'size': 'n'})
+  df_stats['sem'] = df_stats['std'] / np.sqrt(df_stats['n'])
+  t = scipystats.t.ppf((1 + ci) / 2.0, np.maximum(df_stats['n'] - 1, 1))
+  df_stats['ci_low'] = df_stats['mean'] - t * df_stats['sem']
+  df_stats['ci_high'] = df_stats['mean'] + t * df_stats['sem']
+
+  df_wide = df_stats.unstack('ce')
+  df_wide.columns = ['{0}_{1}'.format(stat, 'ce' if ce == 1 else 'other') for stat, ce in df_wide.columns]
+  for stat in ['n', 'mean', 'std', 'sem', 'ci_low', 'ci_high']:
+    for grp in ['ce', 'other']:
+      if '{0}_{1}'.format(stat, grp) not in df_wide.columns:
+        df_wide['{0}_{1}'.format(stat, grp)] = np.nan
+  df_wide[['n_ce', 'n_other']] = df_wide[['n_ce', 'n_other']].fillna(0).astype(int)
+
+  # pooled variance t-test (as ttest_ind) for every group at once (arrays, scipy does not take Series)
+  df_wide['pval'] = scipystats.ttest_ind_from_stats(df_wide['mean_ce'].to_numpy(), df_wide['std_ce'].to_numpy(),
+                                                    df_wide['n_ce'].to_numpy(), df_wide['mean_other'].to_numpy(),
+                                                    df_wide['std_other'].to_numpy(), df_wide['n_other'].to_numpy())[1]
+  return df_wide.reset_index()
+
+
+def check_ce_group_stats(seed=0):
+  '''
+  Runs ce_group_stats on a synthetic evaluation frame and checks the means and p-values of every
+  group against the raw data (scipy.stats.ttest_ind), raises AssertionError when they differ.
+  '''
+  rng = np.random.RandomState(seed)
+  df1 = pd.DataFrame({'year': np.repeat([2018, 2019], 60), 'semester': np.tile(np.repeat([1, 2], 30), 2),
+                      'ce': np.tile([1, 0, 0], 40), 'gts_delta': rng.normal(2, 5, 120)})
+  df_stats = ce_group_stats(df1)
+  assert len(df_stats) == 4
+  for r in df_stats.itertuples(index=False):
+    df_grp = df1.loc[(df1['year'] == r.year) & (df1['semester'] == r.semester)]
+    ce_values = df_grp.loc[df_grp['ce'] == 1, 'gts_delta']
+    other_values = df_grp.loc[df_grp['ce'] == 0, 'gts_delta']
+    assert (r.n_ce, r.n_other) == (len(ce_values), len(other_values))
+    assert np.isclose(r.mean_ce, ce_values.mean()) and np.isclose(r.mean_other, other_values.mean())
+    assert np.isclose(r.pval, scipystats.ttest_ind(ce_values, other_values)[1])
+  print('ce_group_stats: {} groups match ttest_ind'.format(len(df_stats)))
+
+
+def _bootstrap_group(key, values, n_boot, ci, seed, chunk=1000):
+  # percentile interval of the bootstrap means of one group (resampled in chunks of n_boot x n)
+  rng = np.random.RandomState(seed)
+  values = np.asarray(values, dtype=float)
+  if len(values) < 2:
+    return key, np.nan, np.nan
+  means = []
+  for i in range(0, n_boot, chunk):
+    idx = rng.randint(0, len(values), size=(min(chunk, n_boot - i), len(values)))
+    means.append(values[idx].mean(axis=1))
+  means = np.concatenate(means)
+  alpha = (1 - ci) / 2.0
+  return key, np.percentile(means, 100 * alpha), np.percentile(means, 100 * (1 - alpha))
+
+
+def ce_bootstrap_ci(df1, by=('year', 'semester'), value='gts_delta', n_boot=10000, ci=0.95, n_jobs=-1, seed=0):
+  '''
+  Bootstrap percentile intervals of the mean for enhanced and other courses in every group.
+  The groups are bootstrapped in parallel (joblib, one task per group).
+  :return: data frame <by>, boot_low_ce, boot_high_ce, boot_low_other, boot_high_other
+  '''
+  by = list(by)
+  groups = df1.groupby(by + ['ce'])[value]
+  results = Parallel(n_jobs=n_jobs)(delayed(_bootstrap_group)(key, grp.values, n_boot, ci, seed + i)
+                                    for i, (key, grp) in enumerate(groups))
+  df_boot = pd.DataFrame([list(key) + [low, high] for key, low, high in results],
+                         columns=by + ['ce', 'boot_low', 'boot_high']).set_index(by + ['ce']).unstack('ce')
+  df_boot.columns = ['{0}_{1}'.format(stat, 'ce' if ce == 1 else 'other') for stat, ce in df_boot.columns]
+  return df_boot.reset_index()
+
+
+def ce_comparison_stats(df1, levels=('semester', 'wave', 'school'), ci=0.95, bootstrap=False, n_boot=10000,
+                        n_jobs=-1):
+  '''
+  Enhanced vs other statistics at each level of ce_group_levels.
+  :param bootstrap: add the bootstrap intervals (boot_low_ce, boot_high_ce, ...)
+  :return: dictionary level: data frame
+  '''
+  stats = {}
+  for level in levels:
+    by = ce_group_levels[level]
+    df_stats = ce_group_stats(df1, by=by, ci=ci)
+    if bootstrap:
+      df_stats = df_stats.merge(ce_bootstrap_ci(df1, by=by, n_boot=n_boot, ci=ci, n_jobs=n_jobs), on=by, how='left')
+    stats[level] = df_stats
+  return stats
+
+
+def export_ce_comparison_csv(stats, folder, prefix='CE_vs_NCE'):
+  # One csv per level e.g. CE_vs_NCE_semester.csv
+  filenames = []
+  for level, df_stats in stats.items():
+    filename = os.path.join(folder, '{0}_{1}.csv'.format(prefix, level))
+    df_stats.round(4).to_csv(filename, index=False)
+    filenames.append(filename)
+  return filenames
+
+
+'''------------------------------------------- Charts ------------------------------------------'''
 def create_ce_comparison_chart(cur, width=800, height=600, display=False, save=False, start_year=2017, end_year=2019,
                                show_title=True,
                                show_annotations=True,
                                show_ylabel=True,
                                show_pval=True,
-                               table='vw204_ce_evaluation'
+                               table='vw204_ce_evaluation',
+                               df_stats=None
                                ):
-  qry = " SELECT year, semester, course_code_ces, gts_delta::numeric, " \
-        "  CASE WHEN la=true THEN 1 ELSE 0 END AS ce" \
-        "	FROM course_enhancement.{} \n" \
-        " WHERE gts_pre IS NOT NULL AND gts_post IS NOT NULL \n" \
-        "   AND year >= {} AND year <= {} \n" \
-        "".format(table,
-                  start_year, end_year)
-  
-  df1 = db_extract_query_to_dataframe(qry, cur, print_messages=False)
-  df1['gts_delta'] = df1['gts_delta'].astype(float)
-  
-  df1_group = df1.groupby(["year", "semester", "ce"])
-  #print(df1_group.gts_delta.agg([np.mean, np.std, scipystats.sem, len]))
-  pval = []
-  ms_mean = []
-  nms_mean = []
-  ms_sem = []
-  nms_sem = []
-  labels = []
-  
-  for sem in [[2017, 1], [2017, 2], [2018, 1], [2018, 2], [2019, 1], [2019, 2]]:
-    df_temp1 = df1.query('ce==1 & year=={} & semester=={}'.format(sem[0], sem[1]))
-    df_temp2 = df1.query('ce==0 & year=={} & semester=={}'.format(sem[0], sem[1]))
-    if show_pval == True:
-      pval.append(scipystats.ttest_ind(df_temp1.gts_delta, df_temp2.gts_delta)[1])
-      labels.append('{} S{}<br>'
-                    'p-val={}'.format(sem[0], sem[1],
-                                      '%.3f' % scipystats.ttest_ind(df_temp1.gts_delta, df_temp2.gts_delta)[1]))
-      xtick_size = 14
-    else:
-      labels.append('{} S{}'.format(sem[0], sem[1]))
-      xtick_size = 10
-    ms_mean.append(np.mean(df_temp1.gts_delta))
-    nms_mean.append(np.mean(df_temp2.gts_delta))
-    ms_sem.append(scipystats.sem(df_temp1.gts_delta))
-    nms_sem.append(scipystats.sem(df_temp2.gts_delta))
+  if df_stats is None:
+    df_stats = ce_group_stats(get_ce_evaluation(cur, start_year, end_year, table), by=['year', 'semester'])
+
+  ms_mean = df_stats['mean_ce'].tolist()
+  nms_mean = df_stats['mean_other'].tolist()
+  ms_sem = df_stats['sem_ce'].tolist()
+  nms_sem = df_stats['sem_other'].tolist()
+  pval = df_stats['pval'].tolist()
+  if show_pval == True:
+    labels = ['{} S{}<br>p-val={}'.format(yr, sem, '%.3f' % p)
+              for yr, sem, p in zip(df_stats['year'], df_stats['semester'], pval)]
+    xtick_size = 14
+  else:
+    labels = ['{} S{}'.format(yr, sem) for yr, sem in zip(df_stats['year'], df_stats['semester'])]
+    xtick_size = 10
   
   print(ms_mean)
   print(nms_mean)
@@ -158,10 +291,10 @@ def create_ce_comparison_chart(cur, width=800, height=600, display=False, save=F
   fig = go.Figure(data=data, layout=layout)
   
   if display == True:
-    plotly.offline.plot(
-            fig,
-            filename='H:\\Projects\\CoB\\CES\\Course Enhancement\\CE_vs_NCE_2019S2.html'
-            )
+    report_plot(
+      fig,
+      filename='H:\\Projects\\CoB\\CES\\Course Enhancement\\CE_vs_NCE_2019S2.html'
+    )
   if save == True:
     plotly.plotly.image.save_as(
       fig,
@@ -186,9 +319,8 @@ def create_ce_growth(cur, width=800, height=600, start_year=2017, end_year=2019,
   
   df1 = db_extract_query_to_dataframe(qry, cur, print_messages=False)
   
-  labels = []
-  for sem in [[2017, 1], [2017, 2], [2018, 1], [2018, 2], [2019, 1], [2019, 2]]:
-    labels.append('{} S{}'.format(sem[0], sem[1]))
+  df1 = df1.sort_values(['year', 'semester'])
+  labels = ['{} S{}'.format(yr, sem) for yr, sem in zip(df1['year'], df1['semester'])]
 
   trace1 = go.Bar(
     x=labels,
@@ -252,4 +384,24 @@ def create_ce_growth(cur, width=800, height=600, start_year=2017, end_year=2019,
   
   fig = go.Figure(data=data, layout=layout)
   
-  return fig
\ No newline at end of file
+  return fig
+
+
+if __name__ == '__main__':
+  check_ce_group_stats()
+
+  # Export the enhanced vs other statistics by semester, wave and school
+  folder = 'H:\\Projects\\CoB\\CES\\Course Enhancement\\'
+  postgres_pw = input("Postgres Password: ")
+  con_string = "host='localhost' dbname='postgres' user='pjryan' password='{}'".format(postgres_pw)
+  con, cur = connect_to_postgres_db(con_string)
+
+  df_eval = get_ce_evaluation(cur, start_year=2017, end_year=2019, table='vw214_ce_evaluation_reliable')
+  ce_stats = ce_comparison_stats(df_eval, bootstrap=True)
+  for level, df_level in ce_stats.items():
+    print(level)
+    print(tabulate(df_level, headers='keys', floatfmt='.2f'))
+  export_ce_comparison_csv(ce_stats, folder)
+  report_plot(create_ce_comparison_chart(cur, df_stats=ce_stats['semester']),
+              filename=folder + 'CE_vs_NCE_2019S2.html')
+  con.close()
@@ -19,6 +19,12 @@ from general.db_helper_functions import (
   db_extract_query_to_dataframe
 )
 
+# chart functions shared with the batch version (Microsurgery_one_pager_batch.py writes every school)
+from Microsurgery_one_pager_batch import (
+  create_course_improve_bar,
+  create_improve_bar
+)
+
 
 
 '''--------------------------------- Connect to Database  ----------------------------'''
@@ -83,90 +89,6 @@ def get_school_targets_improve(year, decimal_places=0):
 
 df_courses = get_course_improve()
 
-def create_course_improve_bar(x, y, width, height):
-  bar_colours = []
-  for val in y:
-    if val <= 0:
-      bar_colours.append(rc.RMIT_Red)
-    else:
-      bar_colours.append(rc.RMIT_Green)
-  
-  bar = go.Bar(
-    x=y,
-    y=x,
-    orientation='h',
-    text=None,
-    textposition='outside',
-    marker=dict(color=bar_colours,
-                line=dict(color=bar_colours)),
-  )
-  
-  layout = go.Layout(
-    paper_bgcolor=rc.RMIT_DarkBlue,
-    plot_bgcolor=rc.RMIT_DarkBlue,
-    title=None,
-    showlegend=False,
-    xaxis=dict(
-      showgrid=True,
-      zeroline=True,
-      showticklabels=True,
-      gridcolor=rc.RMIT_White,
-      zerolinecolor=rc.RMIT_White,
-      tickfont=dict(
-        size=14,
-        color=rc.RMIT_White
-      )
-    ),
-    yaxis=dict(
-      tickvals=None,
-      showgrid=False,
-      showticklabels=False,
-      ticks='',
-      zeroline=True,
-      zerolinecolor=rc.RMIT_White),
-    width=width,
-    height=height,
-    margin=dict(b=20, l=10, r=10, t=10),
-    hidesources=True,
-  )
-  return go.Figure(data=[bar], layout=layout)
-
-
-def create_improve_bar(x, y, width, height, maxy=90):
-  bar = go.Bar(
-    x=x,
-    y=y,
-    text=y,
-    textposition='outside',
-    marker=dict(
-      color=[rc.RMIT_DarkBlue, rc.RMIT_Green]),
-  )
-  
-  layout = go.Layout(
-    title=None,
-    showlegend=False,
-    xaxis=dict(
-      tickvals=None,
-      showgrid=False,
-      ticktext=None,
-      showticklabels=False,
-      ticks='',
-      zeroline=False),
-    yaxis=dict(
-      range=[0, maxy],
-      tickvals=None,
-      showgrid=False,
-      showticklabels=False,
-      ticks='',
-      zeroline=False),
-    width=width,
-    height=height,
-    margin=dict(b=0, l=10, r=0, t=10),
-    hidesources=True,
-  )
-  return go.Figure(data=[bar], layout=layout)
-
-
 def make_header():
   x = [
     # Left - Headings
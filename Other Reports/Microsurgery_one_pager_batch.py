@@ -0,0 +1,298 @@
+## MICROSURGERY ONE PAGER (BATCH)
+# Peter October 2019
+# Writes the Microsurgery outcomes one pager for CoB and every school for each microsurgery
+# semester in one run (Microsurgery_one_pager.py shows one page in a Dash app).
+# Each semester's benchmark tables are read with one query into a course level data set,
+# the page statistics of CoB and every school are computed from it in one grouped pass and the
+# pages are written as static html files sharing one plotly.js.
+
+import os
+import time
+import html
+
+import pandas as pd
+import plotly.graph_objs as go
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+import general.RMIT_colours as rc
+from general.plotly_report_output import report_page, write_report_index
+from general.db_helper_functions import (
+  connect_to_postgres_db,
+  db_extract_query_to_dataframe
+)
+
+'''--------------------------------- Microsurgery semesters  ----------------------------'''
+# bm: benchmark years of the table columns (e.g. gts_2016_2017_m), cur: microsurgery year (e.g. gts_2018_m)
+microsurgery_semesters = [
+  {'year': 2018, 'semester': 1,
+   'bm': '2016_2017', 'cur': '2018',
+   'bar_labels': ['2017', '2018'],
+   'legend': ['2016 & 2017 (average)', '2018 Semester 1'],
+   'benchmarks': 'microsurgery_2018_sem1_benchmarks_all',
+   'pe_se': 'microsurgery_2018_sem1_benchmarks_all_pe_se',
+   'targets': 'microsurgery_2018_sem1_school_targets_counts',
+   'target_years': [2017, 2018]},
+]
+measures = ['gts', 'osi', 'pe', 'sei']
+
+page_css = '''
+.heading {background-color:#E60028; color:#FFFFFF; font-size:36px; font-weight:bold; padding:5px 20px;}
+.title {text-align:center; font-size:16px; font-weight:bold; margin:10px 0 0 0;}
+.bar_title {background-color:#E60028; color:#FFFFFF; text-align:center; font-size:28px; line-height:150%;}
+.stats {background-color:#000054; color:#FFFFFF; font-size:22px; padding:10px 30px; width:330px;}
+.stats b {color:#FAC800; font-size:40px; font-weight:normal;}
+.targets {background-color:#E60028; color:#FFFFFF; font-size:20px; padding:10px;}
+.targets b {font-size:30px;}
+'''
+
+
+'''-------------------------------------------- Get Data -------------------------------------'''
+def qry_microsurgery_courses(sem, schema='ces_summaries'):
+  '''
+  Course level benchmark and microsurgery results of a semester with the course school.
+  :param sem: item of microsurgery_semesters
+  '''
+  bm, cur = sem['bm'], sem['cur']
+  qry = ' SELECT \n' \
+        '   b.survey_level, b.course_code, \n' \
+        "   COALESCE(s.school_name_short, 'Unknown') AS school_name_short, \n" \
+        '   b.gts_{2}_m AS gts_bm, b.gts_{3}_m AS gts_cur, b.gts_{3}_n AS gts_n, \n' \
+        '   b.osi_{2}_m AS osi_bm, b.osi_{3}_m AS osi_cur, b.osi_{3}_n AS osi_n, \n' \
+        '   p.pe_{2}_m AS pe_bm, p.pe_{3}_m AS pe_cur, p.pe_{3}_n AS pe_n, \n' \
+        '   p.sei_{2}_m AS sei_bm, p.sei_{3}_m AS sei_cur, p.sei_{3}_n AS sei_n \n' \
+        ' FROM {0}.{1} b \n' \
+        '   LEFT JOIN {0}.{4} p ON b.course_code = p.course_code \n' \
+        '   LEFT JOIN (SELECT DISTINCT ON (course_code_ces) course_code_ces, school_name_short \n' \
+        '              FROM ces.vw2_course_summaries_fixed \n' \
+        '              ORDER BY course_code_ces, year DESC, semester DESC) s \n' \
+        '     ON b.course_code = s.course_code_ces \n' \
+        ' ORDER BY b.course_code; \n' \
+        ''.format(schema, sem['benchmarks'], bm, cur, sem['pe_se'])
+  return qry
+
+
+def qry_microsurgery_targets(sem, schema='ces_summaries', school_col='school_name_short'):
+  qry = ' SELECT acad_year, {2} AS school_name_short, \n' \
+        '   sum(better_than_target) AS better, sum(total) AS total \n' \
+        ' FROM {0}.{1} \n' \
+        ' GROUP BY acad_year, {2}; \n' \
+        ''.format(schema, sem['targets'], school_col)
+  return qry
+
+
+def get_microsurgery_data(cur, sem):
+  # (course level data frame, school targets data frame) of a semester
+  df_courses = db_extract_query_to_dataframe(qry_microsurgery_courses(sem), cur, print_messages=False)
+  for m in measures:
+    for col in ['{}_bm'.format(m), '{}_cur'.format(m), '{}_n'.format(m)]:
+      df_courses[col] = df_courses[col].astype(float)
+  df_courses['gts_diff'] = (df_courses['gts_cur'] - df_courses['gts_bm']).round(2)
+  df_courses['osi_diff'] = (df_courses['osi_cur'] - df_courses['osi_bm']).round(2)
+  df_targets = db_extract_query_to_dataframe(qry_microsurgery_targets(sem), cur, print_messages=False)
+  df_targets['acad_year'] = df_targets['acad_year'].astype(int)
+  return df_courses, df_targets
+
+
+def school_page_stats(df_courses, df_targets, target_years, decimal_places=2):
+  '''
+  Page statistics of CoB and every school in one grouped pass.
+  A measure's means only use the courses with results for the measure (e.g. pe over pe_n > 0),
+  the course count, GTS 75+ and GTS uplift use the courses with GTS results (gts_n > 0).
+  :return: data frame indexed by school_name_short
+  '''
+  df = df_courses.copy()
+  for m in measures:
+    no_result = ~(df['{}_n'.format(m)] > 0)
+    df.loc[no_result, ['{}_bm'.format(m), '{}_cur'.format(m)]] = None
+  has_gts = df['gts_n'] > 0
+  df['gts_course'] = has_gts.astype(float)
+  df['improved'] = (df['gts_diff'] > 3).astype(float).where(has_gts)
+  df['gts_75'] = (df['gts_cur'] > 75).astype(float).where(has_gts)
+
+  df_all = pd.concat([df.assign(school_name_short='CoB'), df], ignore_index=True)
+  agg = {'courses': ('gts_course', 'sum'), 'improved': ('improved', 'mean'), 'gts_75': ('gts_75', 'mean')}
+  for m in measures:
+    agg['{}_bm'.format(m)] = ('{}_bm'.format(m), 'mean')
+    agg['{}_cur'.format(m)] = ('{}_cur'.format(m), 'mean')
+  df_stats = df_all.groupby('school_name_short').agg(**agg)
+  df_stats[['improved', 'gts_75']] = (100.0 * df_stats[['improved', 'gts_75']]).round(0)
+  df_stats = df_stats.round(decimal_places)
+
+  df_t = pd.concat([df_targets.assign(school_name_short='CoB'), df_targets], ignore_index=True)
+  df_t = df_t.groupby(['school_name_short', 'acad_year'])[['better', 'total']].sum()
+  df_t = (100.0 * df_t['better'].astype(float) / df_t['total'].astype(float)).round(0).unstack('acad_year')
+  for yr in target_years:
+    df_stats['target_{}'.format(yr)] = df_t[yr] if yr in df_t.columns else None
+  return df_stats
+
+
+'''-------------------------------------------- Charts ---------------------------------------'''
+def create_course_improve_bar(x, y, width, height):
+  bar_colours = []
+  for val in y:
+    if val <= 0:
+      bar_colours.append(rc.RMIT_Red)
+    else:
+      bar_colours.append(rc.RMIT_Green)
+
+  bar = go.Bar(
+    x=y,
+    y=x,
+    orientation='h',
+    text=None,
+    textposition='outside',
+    marker=dict(color=bar_colours,
+                line=dict(color=bar_colours)),
+  )
+
+  layout = go.Layout(
+    paper_bgcolor=rc.RMIT_DarkBlue,
+    plot_bgcolor=rc.RMIT_DarkBlue,
+    title=None,
+    showlegend=False,
+    xaxis=dict(
+      showgrid=True,
+      zeroline=True,
+      showticklabels=True,
+      gridcolor=rc.RMIT_White,
+      zerolinecolor=rc.RMIT_White,
+      tickfont=dict(
+        size=14,
+        color=rc.RMIT_White
+      )
+    ),
+    yaxis=dict(
+      tickvals=None,
+      showgrid=False,
+      showticklabels=False,
+      ticks='',
+      zeroline=True,
+      zerolinecolor=rc.RMIT_White),
+    width=width,
+    height=height,
+    margin=dict(b=20, l=10, r=10, t=10),
+    hidesources=True,
+  )
+  return go.Figure(data=[bar], layout=layout)
+
+
+def create_improve_bar(x, y, width, height, maxy=90):
+  bar = go.Bar(
+    x=x,
+    y=y,
+    text=y,
+    textposition='outside',
+    marker=dict(
+      color=[rc.RMIT_DarkBlue, rc.RMIT_Green]),
+  )
+
+  layout = go.Layout(
+    title=None,
+    showlegend=False,
+    xaxis=dict(
+      tickvals=None,
+      showgrid=False,
+      ticktext=None,
+      showticklabels=False,
+      ticks='',
+      zeroline=False),
+    yaxis=dict(
+      range=[0, maxy],
+      tickvals=None,
+      showgrid=False,
+      showticklabels=False,
+      ticks='',
+      zeroline=False),
+    width=width,
+    height=height,
+    margin=dict(b=0, l=10, r=0, t=10),
+    hidesources=True,
+  )
+  return go.Figure(data=[bar], layout=layout)
+
+
+'''-------------------------------------------- Pages ----------------------------------------'''
+def one_pager_items(sem, school, stats, df_school_courses):
+  # Page items (html blocks and figures) of one school's one pager
+  labels = sem['bar_labels']
+
+  def improve_bar(m, width):
+    return create_improve_bar(labels, [stats['{}_bm'.format(m)], stats['{}_cur'.format(m)]], width, 180, maxy=90)
+
+  heading = 'SEMESTER {0}, {1} MICROSURGERY OUTCOMES{2}'.format(
+    sem['semester'], sem['year'], '' if school == 'CoB' else ' ({})'.format(school))
+  blue_stats = '<div class="stats">' \
+               '<p><b>{0}</b> Microsurgery courses with CES data</p>' \
+               '<p>Microsurgery courses achieved a GTS of 75+ <b>{1:.0f}%</b></p>' \
+               '<p><b>{2:.0f}%</b> Microsurgery courses achieved &gt; 3% GTS uplift</p>' \
+               '</div>'.format(int(stats['courses']), stats['gts_75'], stats['improved'])
+  targets = ''.join(['<p><b>{0}: {1}</b></p>'.format(yr, '' if pd.isnull(stats['target_{}'.format(yr)])
+                                                     else '{:.0f}%'.format(stats['target_{}'.format(yr)]))
+                     for yr in sem['target_years']])
+  df_c = df_school_courses.sort_values('course_code')
+
+  return [
+    '<div class="heading">{}</div>'.format(html.escape(heading)),
+    '<div class="title" style="width:381px">Mean Course GTS Improvement</div>',
+    [improve_bar('gts', 381), blue_stats],
+    ['<div class="title" style="width:400px">Mean GTS Item Factor (HE) Improvement</div>',
+     '<div class="title" style="width:381px">Mean Course OSI Improvement</div>'],
+    [improve_bar('pe', 200), improve_bar('sei', 200), improve_bar('osi', 381)],
+    ['<div class="title" style="width:200px">Perceived Effort</div>',
+     '<div class="title" style="width:200px">Student Engagement</div>'],
+    '<div class="bar_title">Percentage Change in Microsurgery Courses GTS</div>',
+    create_course_improve_bar(x=df_c['course_code'].tolist(), y=df_c['gts_diff'].tolist(), width=780, height=400),
+    '<div class="targets">Microsurgery Courses with GTS Above School Targets{0}'
+    '<p>Graphs Legend: {1} (blue), {2} (green)</p></div>'.format(targets, *sem['legend']),
+  ]
+
+
+def microsurgery_batch(cur, report_dir, semesters=None, schools=None):
+  '''
+  Writes the one pager of CoB and every school for each microsurgery semester.
+  :param semesters: items of microsurgery_semesters, None for all
+  :param schools: schools to write (CoB is always written), None for every school with microsurgery courses
+  :return: list of html files written
+  '''
+  start = time.time()
+  if semesters is None:
+    semesters = microsurgery_semesters
+  pages = []
+  for sem in semesters:
+    df_courses, df_targets = get_microsurgery_data(cur, sem)
+    df_stats = school_page_stats(df_courses, df_targets, sem['target_years'])
+    df_courses = df_courses.loc[df_courses['gts_n'] > 0]
+    page_schools = ['CoB'] + [s for s in df_stats.index if s != 'CoB' and df_stats.loc[s, 'courses'] > 0 and
+                              (schools is None or s in schools)]
+    for school in page_schools:
+      df_school_courses = df_courses if school == 'CoB' else df_courses.loc[df_courses['school_name_short'] == school]
+      filename = 'Microsurgery_{0}S{1}_{2}.html'.format(sem['year'], sem['semester'], school)
+      pages.append(report_page(one_pager_items(sem, school, df_stats.loc[school], df_school_courses),
+                               filename, report_dir=report_dir, css=page_css,
+                               title='Microsurgery {0} S{1} {2}'.format(sem['year'], sem['semester'], school)))
+  write_report_index(report_dir, title='Microsurgery Outcomes')
+  print('{0} one pagers written to {1} in {2:.1f}s'.format(len(pages), report_dir, time.time() - start))
+  return pages
+
+
+if __name__ == '__main__':
+  report_dir = 'H:\\Projects\\CoB\\CES\\Microsurgery\\One pagers\\'
+
+  postgres_pw = input("Postgres Password: ")
+  postgres_user = 'pjryan'
+  postgres_host = 'localhost'
+  postgres_dbname = 'postgres'
+
+  con_string = "host='{0}' " \
+               "dbname='{1}' " \
+               "user='{2}' " \
+               "password='{3}' " \
+               "".format(postgres_host, postgres_dbname, postgres_user, postgres_pw)
+  con, cur = connect_to_postgres_db(con_string)
+
+  if not os.path.exists(report_dir):
+    os.makedirs(report_dir)
+  microsurgery_batch(cur, report_dir)
+  con.close()
@@ -1,9 +1,7 @@
 import base64
 
-import plotly
 import plotly.plotly as py
 import plotly.graph_objs as go
-import plotly.offline
 
 from tabulate import tabulate
 
@@ -12,10 +10,14 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 
 from general.db_helper_functions import (
-  connect_to_postgres_db,
-  db_extract_query_to_dataframe
+  connect_to_postgres_db
+)
+from general.performance_cube import PerformanceCube
+from general.term_metadata import (
+  term_axis
 )
 
 '''--------------------------------- Initialise Parameters  ----------------------------'''
@@ -40,15 +42,10 @@ con_string = "host='{0}' " \
 postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
 '''-------------------------------------------- Get Data -------------------------------------'''
-qry = ' SELECT * \n' \
-      ' FROM sim_ces.vw202_program \n' \
-      "   WHERE year >= {}" \
-      " ORDER BY school, year, semester, staff_type" \
-      "; \n".format(start_year)
-
-df_prg_data = db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
+# every program, staff type, year and semester in one query
+prg_cube = PerformanceCube.from_db(postgres_cur, 'program_sim', start_year)
 
-print(tabulate(df_prg_data, headers='keys'))
+print(tabulate(prg_cube.frame, headers='keys'))
 
 '''-------------------------------------------- Functions ------------------------------------'''
 def get_colour(measure):
@@ -91,22 +88,14 @@ def line_graph_prg_measure_sim(df1, prg, measures=['subject_content'],
                                start_year=2017, end_year=2019,
                                height=400,
                                width=800):
-  f_df = df1.loc[df1['program_code'] == prg]
-  print(tabulate(f_df, headers='keys'))
-  print('\n')
+  cube = PerformanceCube.from_frame(df1, 'program_sim', start_year, end_year)
   
   # all traces for plotly
   traces = []
-  xlabels = []
-
-  for year in range(int(start_year), int(end_year) + 1):
-    xlabels.append('{}<br> S1'.format(year))
-    xlabels.append('{}<br> S2'.format(year))
-    semesters = [1, 2]
-
-  no_terms = len(xlabels)
-  
-  x = [i - 0.5 for i in range(1, no_terms + 1)]
+  axis = term_axis(start_year, end_year)
+  xlabels = axis.labels
+  no_terms = axis.no_terms
+  x = axis.x
   
 
   graph_title = '<b>{0}: </b>'.format(prg)
@@ -118,20 +107,7 @@ def line_graph_prg_measure_sim(df1, prg, measures=['subject_content'],
     #graph_title += '{}, '.format(get_name(measure))
     for staff_type in ['Local', 'RMIT']:
       data_label = []
-      y = []
-
-      for year in range(int(start_year), int(end_year) + 1):
-        for sem in semesters:
-          try:
-            val = f_df.loc[(f_df['year'] == int(year)) & (f_df['semester'] == int(sem)) & (
-              f_df['staff_type'] == staff_type)]
-
-            val = val.iloc[0][measure]
-            #print(prg, year, sem, staff_type, measure, val)
-
-          except:
-            val = None
-          y.append(val)
+      y = cube.term_series(prg, staff_type, measure, start_year, end_year)
 
       trace = go.Scatter(
         x=x,
@@ -193,7 +169,7 @@ def line_graph_prg_measure_sim(df1, prg, measures=['subject_content'],
   
   filename = folder + '{}_SIM_2019S1'.format(prg)
   
-  plotly.offline.plot(fig, filename + '.html')
+  report_plot(fig, filename + '.html')
   py.image.save_as(fig, filename + '.png')
   return fig
 
@@ -203,7 +179,7 @@ for prg in ["BP217", "BP251", "BP252", "BP253", "BP254", "BP255", "CC000"]:
   print('\n')
 
   fig = line_graph_prg_measure_sim(
-      df_prg_data,
+      prg_cube,
       prg,
       measures=['course_satisfaction', 'lecturer_effectiveness', 'subject_content'],
       start_year=start_year,
@@ -0,0 +1,373 @@
+## SCHOOL CES RESULTS REPORT
+# Peter October 2019
+# One report engine for the School CES results pages, replacing the per semester copies of the
+# Dash app (School_CES_results_2018S2_v2/v3, 2019S1, 2019S1_early, 2019S1_v2, 2019S1_v2_one_school,
+# 2019S1_v2_one_school_mean, coursemean_2019S1).
+# The school and course data for the year range are read once, the course mean aggregates for every
+# school, level, year and semester are computed in one grouped pass, each measure is pivoted once
+# and every page (all schools, and each school against CoB) is written as a static html page.
+#
+# stat:
+#   'agree'       percent agree of all student responses (gts, osi)
+#   'mean'        mean of all student responses, Strongly Disagree: 1 ... Strongly Agree: 5 (mgts, mosi)
+#   'course_mean' average of the course percent agree values, reliable courses only (cgts, cosi)
+
+import os
+import time
+import html
+
+import pandas as pd
+import plotly.graph_objs as go
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+import general.RMIT_colours as rc
+from general.plotly_report_output import report_page, write_report_index
+from general.performance_cube import PerformanceCube
+
+from general.db_helper_functions import (
+  connect_to_postgres_db,
+  db_extract_query_to_dataframe
+)
+
+from School_performance_report import (
+  create_school_RMIT_graph
+)
+
+'''------------------------------------- Report settings --------------------------------'''
+# (school_name_short, level) in the order they appear on the all schools page
+all_school_columns = [('ACCT', 'HE'), ('BITL', 'HE'), ('EFM', 'HE'), ('GSBL', 'HE'), ('MGT', 'HE'),
+                      ('VBE', 'HE'), ('VBE', 'VE'), ('CoB', 'HE'), ('CoB', 'NA')]
+report_schools = ['ACCT', 'BITL', 'EFM', 'GSBL', 'MGT', 'VBE']
+
+# column prefix, table label and title for each stat
+stat_settings = {
+  'agree': {'prefix': '', 'label': '%Agr', 'title': '{} Percent Agree'},
+  'mean': {'prefix': 'm', 'label': 'mean', 'title': 'm{}'},
+  'course_mean': {'prefix': 'c', 'label': 'c%Agr', 'title': '{} Course Average Percent Agree'},
+}
+# stat shown next to the report stat on the one school pages
+alternate_stat = {'agree': 'mean', 'mean': 'agree', 'course_mean': 'agree'}
+
+stat_notes = {
+  'agree': ['The values presented are the {} Percent Agree.',
+            'This is the percentage of all student responses, for the school,'
+            ' that were an Agree or Strongly Agree.',
+            'This methodology treats all student responses equally.',
+            'Hence the larger the course the more influence it has on the overall school result.'],
+  'mean': ['The values presented are the m{}.',
+           'This is the mean value of all student responses, for the school,'
+           ' Strongly Disagree: 1 ... Strongly Agree: 5.',
+           'This methodology treats all student responses equally.',
+           'Hence the larger the course the more influence it has on the overall school result.'],
+  'course_mean': ['The values presented are the {} Course Average Percent Agree for the school.',
+                  'The Course Percent Agree is the percentage of all student responses, for the course,'
+                  ' that were an Agree or Strongly Agree.',
+                  'The average of all course values with a Reliability of G (Good) or S (Sufficient).',
+                  'This methodology treats all reliable courses equally.'],
+}
+
+page_css = '''
+.heading {background-color:#E60028; color:#FFFFFF; font-size:36px; font-weight:bold; text-align:center; padding:10px;}
+.measure {background-color:#000054; color:#FFFFFF; font-size:28px; text-align:center; margin:4px; padding:2px;}
+.notes {color:#000054; font-size:16px; width:330px; padding-top:40px; padding-left:15px;}
+.semester {background-color:#0078FF; color:#FFFFFF; font-size:16px; font-weight:bold; text-align:center;
+           width:520px; margin:2px 5px;}
+'''
+
+
+'''-------------------------------------------- Get Data -------------------------------------'''
+def qry_school_ces_data(start_year, end_year, early=False):
+  '''
+  School and college results for the year range in one query.
+  :param early: use the school results calculated from the course summaries
+                (ces.vw998_school_from_course_summaries_for_graph), for results released before the
+                school views are filled. There are no mean values for early results.
+  '''
+  if early:
+    qry = ' SELECT \n' \
+          '   year, semester, level, school_name_short, colour, colour_html, \n' \
+          '   population, gts, osi, NULL::numeric AS mgts, NULL::numeric AS mosi \n' \
+          ' FROM ces.vw998_school_from_course_summaries_for_graph \n' \
+          " WHERE  \n" \
+          "   year >= {0} AND year <= {1} \n" \
+          " ORDER BY year, semester, level, school_name_short \n" \
+          "".format(start_year, end_year)
+  else:
+    qry = ' SELECT \n' \
+          '   year, semester, level, school_name_short, colour, colour_html, \n' \
+          '   population, gts, osi, mgts, mosi \n' \
+          ' FROM ces.vw146_school_bus_for_graph \n' \
+          " WHERE  \n" \
+          "   year >= {0} AND year <= {1} \n" \
+          " UNION \n" \
+          ' SELECT \n' \
+          '   year, semester, level, college_name_short, colour, colour_html, \n' \
+          '   population, gts, osi, mgts, mosi \n' \
+          ' FROM ces.vw157_college_for_graph \n' \
+          " WHERE  \n" \
+          "   year >= {0} AND year <= {1} \n" \
+          " ORDER BY year, semester, level, school_name_short \n" \
+          "".format(start_year, end_year)
+  return qry
+
+
+def qry_course_ces_data(start_year, end_year):
+  qry = ' SELECT \n' \
+        '   year, semester, level, school_name_short, colour_html, \n' \
+        '   course_code_ces, population, reliability, gts, osi \n' \
+        ' FROM ces.vw2_course_summaries_fixed \n' \
+        " WHERE  \n" \
+        "   year >= {0} AND year <= {1} \n" \
+        "".format(start_year, end_year)
+  return qry
+
+
+def course_mean_aggregates(df_course, reliable_only=True):
+  '''
+  Course mean results for every school and level, CoB by level and CoB overall (level 'NA')
+  in one grouped pass over the course summaries.
+  :param df_course: course summaries (qry_course_ces_data)
+  :param reliable_only: only average the courses with a reliability of G or S
+  :return: data frame year, semester, school_name_short, level, courses, g_count, s_count, n_count, cgts, cosi
+  '''
+  df = df_course[['year', 'semester', 'school_name_short', 'level', 'reliability', 'gts', 'osi']].copy()
+  df['gts'] = df['gts'].astype(float)
+  df['osi'] = df['osi'].astype(float)
+  for r in ['G', 'S', 'N']:
+    df['{}_count'.format(r.lower())] = (df['reliability'] == r).astype(int)
+  if reliable_only:
+    df.loc[~df['reliability'].isin(['G', 'S']), ['gts', 'osi']] = None
+
+  # every course is counted for its school, for CoB at its level and for CoB overall
+  df_keys = pd.concat([df,
+                       df.assign(school_name_short='CoB'),
+                       df.assign(school_name_short='CoB', level='NA')], ignore_index=True)
+  df_agg = df_keys.groupby(['year', 'semester', 'school_name_short', 'level']).agg(
+    courses=('reliability', 'size'),
+    g_count=('g_count', 'sum'),
+    s_count=('s_count', 'sum'),
+    n_count=('n_count', 'sum'),
+    cgts=('gts', 'mean'),
+    cosi=('osi', 'mean'),
+  ).reset_index()
+  return df_agg.round({'cgts': 1, 'cosi': 1})
+
+
+def get_report_data(cur, start_year, end_year, early=False, course_mean=True):
+  '''
+  Returns one data frame with every stat for every school, level, year and semester.
+  :param course_mean: add the course mean results (cgts, cosi)
+  '''
+  start = time.time()
+  df = db_extract_query_to_dataframe(qry_school_ces_data(start_year, end_year, early), cur,
+                                     print_messages=False)
+  for col in ['gts', 'osi', 'mgts', 'mosi']:
+    df[col] = df[col].astype(float)
+  if course_mean:
+    df_course = db_extract_query_to_dataframe(qry_course_ces_data(start_year, end_year), cur,
+                                              print_messages=False)
+    df = df.merge(course_mean_aggregates(df_course), how='left',
+                  on=['year', 'semester', 'school_name_short', 'level'])
+  df = df.sort_values(['year', 'semester', 'school_name_short', 'level']).reset_index(drop=True)
+  print('Report data ({0} rows) loaded in {1:.1f}s'.format(len(df), time.time() - start))
+  return df
+
+
+'''--------------------------------------- Report pages --------------------------------------'''
+def page_columns(school=None):
+  # (school_name_short, level) columns of a page, all schools when school is None
+  if school is None:
+    return all_school_columns
+  elif school == 'VBE':
+    return [('VBE', 'HE'), ('VBE', 'VE'), ('CoB', 'HE')]
+  return [(school, 'HE'), ('CoB', 'HE')]
+
+
+def measure_pivots(df, measures, stats):
+  '''
+  Pivots each measure column once (index year, semester; columns school_name_short, level)
+  so every page table is a column selection.
+  '''
+  pivots = {}
+  for stat in stats:
+    for measure in measures:
+      col = '{0}{1}'.format(stat_settings[stat]['prefix'], measure)
+      if col in df.columns:
+        pivots[col] = df.pivot_table(index=['year', 'semester'], columns=['school_name_short', 'level'],
+                                     values=col, aggfunc='first').round(1)
+  return pivots
+
+
+def school_colours(df):
+  # colour_html of every (school_name_short, level)
+  df_colour = df.drop_duplicates(['school_name_short', 'level'])
+  return {(s, l): c for s, l, c in zip(df_colour['school_name_short'], df_colour['level'], df_colour['colour_html'])}
+
+
+def column_header(school, level, label=None):
+  if school in ['VBE', 'CoB']:
+    name = '{0}<br>({1})'.format(school, 'All' if level == 'NA' else level)
+  else:
+    name = ' <br>{}'.format(school)
+  line = ' .... ' if level == 'VE' else ' ___ '
+  if label is not None:
+    return '{0}<br>{1}<br>'.format(name, label)
+  return '{0}<br>{1}<br>'.format(name, line)
+
+
+def ces_table(pivots, colours, measure, stat, school=None, width=None):
+  '''
+  Table of the stat for the page columns by year and semester.
+  The one school pages also show the alternate stat for each column.
+  '''
+  columns = page_columns(school)
+  col = '{0}{1}'.format(stat_settings[stat]['prefix'], measure)
+  df_pivot = pivots[col]
+
+  headers = [' <br>Year<br><br>', ' <br>S<br><br>']
+  values = [df_pivot.index.get_level_values('year'), df_pivot.index.get_level_values('semester')]
+  header_colours = [rc.RMIT_White, rc.RMIT_White]
+  header_fill = [rc.RMIT_DarkBlue, rc.RMIT_DarkBlue]
+  cell_colours = [rc.RMIT_White, rc.RMIT_White]
+  cell_fill = [rc.RMIT_DarkBlue, rc.RMIT_DarkBlue]
+
+  alt_col = '{0}{1}'.format(stat_settings[alternate_stat[stat]]['prefix'], measure)
+  show_alt = school is not None and alt_col in pivots and pivots[alt_col].notnull().any().any()
+
+  for i, key in enumerate(columns):
+    colour = colours.get(key, rc.RMIT_Black)
+    cob = key[0] == 'CoB'
+    fills = [colour if cob else [rc.RMIT_Arctic, rc.RMIT_Azure][(i // 2) % 2]]
+    items = [(df_pivot, column_header(key[0], key[1], stat_settings[stat]['label'] if show_alt else None))]
+    if show_alt:
+      items.append((pivots[alt_col].reindex(df_pivot.index), column_header(key[0], key[1], stat_settings[alternate_stat[stat]]['label'])))
+      fills.append(fills[0])
+    for (df_values, header), fill in zip(items, fills):
+      headers.append(header)
+      values.append(df_values[key] if key in df_values.columns else [None] * len(df_values))
+      header_colours.append(colour)
+      header_fill.append(rc.RMIT_White if cob else rc.RMIT_DarkBlue)
+      cell_colours.append(rc.RMIT_White if cob else rc.RMIT_Black)
+      cell_fill.append(fill)
+
+  trace = go.Table(
+    columnwidth=[20, 10] + [20] * (len(headers) - 2),
+    header=dict(values=headers,
+                align='center',
+                line=dict(color=rc.RMIT_White),
+                font=dict(size=18, color=header_colours),
+                height=40,
+                fill=dict(color=header_fill)),
+    cells=dict(values=values,
+               line=dict(color=rc.RMIT_White),
+               font=dict(size=12, color=cell_colours),
+               height=28,
+               fill=dict(color=cell_fill)),
+  )
+  if width is None:
+    width = 600 if school is None else 120 + 70 * (len(headers) - 2)
+  layout = go.Layout(width=width,
+                     height=355,
+                     margin=dict(b=10, l=10, r=10, t=10))
+  return dict(data=[trace], layout=layout)
+
+
+def measure_section(cube, pivots, colours, measure, stat, start_year, end_year, school=None):
+  # Page items for one measure: title, table and notes, semester titles, semester graphs
+  title = 'Course Experience Survey - {}'.format(stat_settings[stat]['title'].format(measure.upper()))
+  title += ' (CoB Schools)' if school is None else ' ({})'.format(school)
+  notes = ''.join(['<p>{}</p>'.format(html.escape(note.format(measure.upper()))) for note in stat_notes[stat]])
+  col = '{0}{1}'.format(stat_settings[stat]['prefix'], measure)
+
+  graphs = [create_school_RMIT_graph(df1=cube,
+                                     measure=col,
+                                     start_year=start_year, end_year=end_year,
+                                     semester=semester,
+                                     height=340,
+                                     width=530,
+                                     background='#FFFFFF',
+                                     school=school,
+                                     mean=(stat == 'mean'))
+            for semester in [1, 2]]
+
+  return [
+    '<div class="measure">{}</div>'.format(html.escape(title)),
+    [ces_table(pivots, colours, measure, stat, school), '<div class="notes">{}</div>'.format(notes)],
+    ['<div class="semester">Semester 1</div>', '<div class="semester">Semester 2</div>'],
+    graphs,
+  ]
+
+
+def school_ces_report(cur, year, semester, start_year=2015, end_year=None, measures=('osi', 'gts'),
+                      schools=None, stats=('agree',), early=False, report_dir='.'):
+  '''
+  Writes the School CES results pages for a semester in one run.
+  :param year: report year (the page heading)
+  :param semester: report semester (the page heading)
+  :param start_year: first year of the tables and graphs
+  :param end_year: last year of the tables and graphs, defaults to the report year
+  :param measures: CES measures e.g. ('osi', 'gts')
+  :param schools: pages to write, None is the all schools page, a school name a one school page.
+                  Defaults to the all schools page and a page for every school
+  :param stats: 'agree', 'mean' and/or 'course_mean', one set of pages for each
+  :param early: use the early school results calculated from the course summaries
+  :param report_dir: folder for the html pages
+  :return: list of the html pages written
+  '''
+  start = time.time()
+  if end_year is None:
+    end_year = year
+  if schools is None:
+    schools = [None] + report_schools
+
+  df = get_report_data(cur, start_year, end_year, early=early, course_mean='course_mean' in stats)
+  pivots = measure_pivots(df, measures, set(stats) | set(alternate_stat[s] for s in stats))
+  colours = school_colours(df)
+  cube = PerformanceCube.from_frame(df, 'school', start_year, end_year)
+
+  pages = []
+  for stat in stats:
+    for school in schools:
+      name = 'CoB Schools' if school is None else school
+      heading = '<div class="heading">{0}    CES Results {1} S{2}</div>'.format(html.escape(name), year, semester)
+      items = [heading]
+      for measure in measures:
+        items += measure_section(cube, pivots, colours, measure, stat, start_year, end_year, school)
+      filename = 'School_CES_results_{0}S{1}_{2}_{3}.html'.format(year, semester, name.replace(' ', '_'), stat)
+      pages.append(report_page(items, filename, report_dir=report_dir, css=page_css,
+                               title='{0} CES Results {1} S{2}'.format(name, year, semester)))
+
+  write_report_index(report_dir, title='School CES Results {0} S{1}'.format(year, semester))
+  print('{0} pages written to {1} in {2:.1f}s'.format(len(pages), report_dir, time.time() - start))
+  return pages
+
+
+if __name__ == '__main__':
+  '''------------------------------------- Set Inputs  --------------------------------'''
+  year = 2019
+  semester = 2
+  start_year = 2015
+  stats = ['agree', 'mean', 'course_mean']
+  early = False  # True before the school views have the semester's results
+  report_dir = 'H:\\Projects\\CoB\\CES\\School Reporting\\{0} S{1}\\'.format(year, semester)
+
+  '''--------------------------------- Connect to Database  ----------------------------'''
+  postgres_pw = input("Postgres Password: ")
+  postgres_user = 'pjryan'
+  postgres_host = 'localhost'
+  postgres_dbname = 'postgres'
+
+  con_string = "host='{0}' " \
+               "dbname='{1}' " \
+               "user='{2}' " \
+               "password='{3}' " \
+               "".format(postgres_host, postgres_dbname, postgres_user, postgres_pw)
+  con, postgres_cur = connect_to_postgres_db(con_string)
+
+  if not os.path.exists(report_dir):
+    os.makedirs(report_dir)
+  school_ces_report(postgres_cur, year, semester, start_year=start_year, stats=stats, early=early,
+                    report_dir=report_dir)
+  con.close()
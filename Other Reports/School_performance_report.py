@@ -1,6 +1,4 @@
-import plotly
 import plotly.graph_objs as go
-import plotly.offline
 import numpy as np
 import scipy.stats as scipystats
 from tabulate import tabulate
@@ -10,11 +8,16 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 
 from general.db_helper_functions import (
   connect_to_postgres_db,
   db_extract_query_to_dataframe
 )
+from general.performance_cube import PerformanceCube
+from general.term_metadata import (
+  term_axis
+)
 
 '''--------------------------------- Initialise Parameters  ----------------------------'''
 
@@ -46,6 +49,11 @@ def get_school_data(start_year, postgres_cur):
         "; \n".format(start_year)
 
   return db_extract_query_to_dataframe(qry, postgres_cur, print_messages=False)
+
+
+def get_school_cube(start_year, postgres_cur, end_year=None):
+  # every school, level, year and semester in one query, the graph functions take the cube or a data frame
+  return PerformanceCube.from_db(postgres_cur, 'school', start_year, end_year)
   
 #df_schools_data = get_school_data(start_year, postgres_cur)
 
@@ -54,31 +62,21 @@ def line_graph_school_measure(df1, school, level='HE', measure='gts',
                               height=400,
                               width=800,
                               show_targets=True):
-  df_school = df1.loc[df1['school_name_short'] == school]
-  df_targets = df_school[['year', 'gts_target']].drop_duplicates()
-  df_school = df_school.loc[df_school['level'] == level]
-  
-  df_1 = df_school.loc[df_school['semester'] == 1]
-  df_2 = df_school.loc[df_school['semester'] == 2]
-  
-  # print(tabulate(df_school, headers='keys'))
-  # print(tabulate(df_targets, headers='keys'))
-  # print(end_year)
+  cube = PerformanceCube.from_frame(df1, 'school', start_year, end_year)
+  colour = cube.attribute(school, level, 'colour_html')
+  y_1 = cube.series(school, level, 1, measure, start_year, end_year)
+  y_2 = cube.series(school, level, 2, measure, start_year, end_year)
   
   # all traces for plotly
   traces = []
-  xlabels = []
-  
-  for year in range(int(start_year), int(end_year) + 1):
-    xlabels.append('{}<br>'.format(year))
-  
-  no_terms = len(xlabels)
-  
-  x = [i - 0.5 for i in range(1, no_terms + 1)]
+  axis = term_axis(start_year, end_year, by_year=True)
+  xlabels = axis.labels
+  no_terms = axis.no_terms
+  x = axis.x
   
   label_check = 0
   
-  graph_title = '<b>CES ({2}):</b> {1} School {0}'.format(measure.upper(), df_school.iloc[0]['school_name'], level)
+  graph_title = '<b>CES ({2}):</b> {1} School {0}'.format(measure.upper(), cube.attribute(school, level, 'school_name'), level)
   
   data_label = []
   y = []
@@ -86,23 +84,23 @@ def line_graph_school_measure(df1, school, level='HE', measure='gts',
   
   # Create Semester 1 text
   sem1_text = [None for j in range(len(x) - 1)]
-  sem1_text.append(df_1.iloc[-1][measure])
+  sem1_text.append(y_1[-1])
   #print(sem1_text)
   
   # Create Semester 1 trace (solid)
   trace_sem1 = go.Scatter(
     x=x,
-    y=df_1[measure].tolist(),
+    y=y_1,
     name='Semester 1  ',
     text=None,
     textfont={'size': 14,
-              'color': df_1.iloc[0]['colour_html']},
+              'color': colour},
     line=go.scatter.Line(
       width=2,
-      color=df_1.iloc[0]['colour_html'],
+      color=colour,
       dash=sem1_text, ),
     marker=go.scatter.Marker(
-      color=df_1.iloc[0]['colour_html'],
+      color=colour,
       size=8,
       symbol='circle'
     ),
@@ -116,15 +114,15 @@ def line_graph_school_measure(df1, school, level='HE', measure='gts',
   # Create Semester 2 trace (dashed)
   trace_sem2 = go.Scatter(
     x=x,
-    y=df_2[measure].tolist(),
+    y=y_2,
     name='Semester 2  ',
     text=None,
     line=go.scatter.Line(
       width=2,
-      color=df_2.iloc[0]['colour_html'],
+      color=colour,
       dash='dot', ),
     marker=go.scatter.Marker(
-      color=df_2.iloc[0]['colour_html'],
+      color=colour,
       size=8,
       symbol='diamond'
     ),
@@ -136,11 +134,12 @@ def line_graph_school_measure(df1, school, level='HE', measure='gts',
   traces.append(trace_sem2)
   
   if show_targets == True and measure == 'gts':
+    targets = cube.year_series(school, 'gts_target', start_year, end_year)
     trace_target = go.Scatter(
       x=x,
-      y=df_targets['gts_target'].tolist(),
+      y=targets,
       name='Target',
-      text=df_targets['gts_target'].tolist(),
+      text=targets,
       textfont={'size': 14,
                 'color': rc.RMIT_Black},
       line=go.scatter.Line(width=2, color=rc.RMIT_Black),
@@ -196,11 +195,11 @@ def line_graph_school_measure(df1, school, level='HE', measure='gts',
          )
          }
   
-  filename = folder + '{}_{}_{}_2018'.format(df_2.iloc[0]['school_name_short'], level, measure)
+  filename = folder + '{}_{}_{}_2018'.format(school, level, measure)
   
   if show_targets == True and measure == 'gts':
-    filename = folder + '{}_{}_{}_2018_targets'.format(df_2.iloc[0]['school_name_short'], level, measure)
-  plotly.offline.plot(fig, filename + '.html')
+    filename = folder + '{}_{}_{}_2018_targets'.format(school, level, measure)
+  report_plot(fig, filename + '.html')
   py.image.save_as(fig, filename + '.png')
   return fig
 
@@ -214,38 +213,21 @@ def line_trace_school_measure(df1,
                               dash_type=None,
                               line_color=None,
                               df_cob=None):
-  df_school = df1.loc[df1['school_name_short'] == school]
-  if level != 'All':
-    df_school = df_school.loc[df_school['level'] == level]
-  else:
-    df_school = df_school.loc[df_school['level'] == 'NA']
-  
-  #print(tabulate(df_school, headers='keys'))
-  
-  if semester == 1:
-    df_sem = df_school.loc[df1['semester'] == 1]
-  elif semester == 2:
-    df_sem = df_school.loc[df1['semester'] == 2]
-  #print(tabulate(df_sem, headers='keys'))
+  cube = PerformanceCube.from_frame(df1, 'school', start_year, end_year)
+  level_key = 'NA' if level == 'All' else level
   
   x = [i - 0.5 for i in range(1, int(end_year) - int(start_year) + 2)]
   
+  colour = cube.attribute(school, level_key, 'colour_html')
   if line_color != None:
     colour = line_color
-  else:
-    try: colour = df_sem.iloc[0]['colour_html']
-    except: pass
-  
-  #print(len(df_sem))
+  y = cube.series(school, level_key, semester, measure, start_year, end_year)
   
-  if len(df_sem) == 0 and school == 'CoB':
+  # CoB results from the college data when the school data has no CoB rows
+  if not cube.has(school, level_key) and school == 'CoB' and df_cob is not None:
     colour = rc.RMIT_Black
-    if semester == 1:
-      df_sem = df_cob.loc[df_cob['semester'] == 1]
-    elif semester == 2:
-      df_sem = df_cob.loc[df_cob['semester'] == 2]
-    
-    #print(df_sem)
+    cob_cube = PerformanceCube.from_frame(df_cob, 'college', start_year, end_year)
+    y = cob_cube.series('CoB', level_key, semester, measure, start_year, end_year)
     
   if school in ['VBE', 'CoB']:
     name = '<span style="color: {0}">{1} ({2})</span>'.format(colour, school, level)
@@ -257,7 +239,7 @@ def line_trace_school_measure(df1,
   # Create Semester trace (solid)
   trace = go.Scatter(
     x=x,
-    y=df_sem[measure].tolist(),
+    y=y,
     name=name,
     text=None,
     textfont={'size': 14,
@@ -332,12 +314,11 @@ def line_trace_school_course_mean_measure(
     name = '<span style="color: {0}">{1}</span>'.format(colour, school)
 
   # print(school, colour, name)
-  means=[]
-  errs=[]
-  for yr in range(start_year, end_year + 1):
-    df_sem.loc[df_sem['year'] == yr]
-    means.append(np.mean(df_sem.loc[df_sem['year'] == yr][measure]))
-    errs.append(scipystats.sem(df_sem.loc[df_sem['year'] == yr][measure]))
+  # course mean and standard error for every year in one grouped pass
+  df_year = df_sem.groupby('year')[measure].agg(['mean', scipystats.sem]).reindex(
+    range(int(start_year), int(end_year) + 1))
+  means = [None if np.isnan(v) else v for v in df_year['mean'].tolist()]
+  errs = [None if np.isnan(v) else v for v in df_year['sem'].tolist()]
     
   if err==False:
     errs=None
@@ -399,6 +380,7 @@ def create_school_RMIT_graph(
     ytickvals = [70, 72.5, 75, 77.5, 80, 82.5, 85, 87.5]
     yticktext = [70, '', 75, '', 80, '', 85, '']
 
+  cube = PerformanceCube.from_frame(df1, 'school', start_year, end_year)
   traces = []
   x = [i + 0.5 for i in range(0, (int(end_year) - int(start_year) + 1))]
   xlabels = ['{}'.format(i) for i in range(int(start_year), int(end_year) + 1)]
@@ -431,7 +413,7 @@ def create_school_RMIT_graph(
       dash_type = None
     
     traces.append(line_trace_school_measure(
-      df1,
+      cube,
       school[0],
       level=school[1],
       measure=measure,
@@ -595,6 +577,7 @@ def create_CoB_graph(
   else:
     line_col = None
   
+  cube = PerformanceCube.from_frame(df1, 'school', start_year, end_year)
   traces = []
   x = [i + 0.5 for i in range(0, (int(end_year) - int(start_year) + 1))]
   xlabels = ['{}'.format(i) for i in range(int(start_year), int(end_year) + 1)]
@@ -618,7 +601,7 @@ def create_CoB_graph(
     #print(school, color)
     
     traces.append(line_trace_school_measure(
-      df1,
+      cube,
       school[0],
       level=school[1],
       measure=measure,
@@ -675,7 +658,7 @@ def create_CoB_graph(
   )
 
   filename = 'H:\\Projects\\CoB\\CES\\School Reporting\\2019 S1\\' + 'CoB_{}_2019S1'.format(measure)
-  plotly.offline.plot(fig, filename + '.html')
+  report_plot(fig, filename + '.html')
   py.image.save_as(fig, filename + '.png')
   return fig
 
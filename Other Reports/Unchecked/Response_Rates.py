@@ -16,6 +16,7 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.plotly_report_output import report_plot
 
 
 from general.db_helper_functions import (
@@ -117,7 +118,7 @@ def graphRRline(df1):
          )
          }
 
-  plotly.offline.plot(fig, filename='C:\\Peter\\CoB\\CES Response Rates\\rr.html')
+  report_plot(fig, filename='C:\\Peter\\CoB\\CES Response Rates\\rr.html')
   return fig
 
 def graphRRbar(df1):
@@ -184,7 +185,7 @@ def graphRRbar(df1):
            'layout': layout,
            }
 
-    plotly.offline.plot(fig, filename='C:\\Peter\\CoB\\CES Response Rates\\graphs\\rr_{}.html'.format(r['intervention']))
+    report_plot(fig, filename='C:\\Peter\\CoB\\CES Response Rates\\graphs\\rr_{}.html'.format(r['intervention']))
   return
 
 
@@ -307,8 +308,8 @@ def graphDRRbar(df1):
          'layout': layout,
          }
     
-  plotly.offline.plot(fig,
-                      filename='C:\\Peter\\CoB\\CES Response Rates\\graphs\\rdr.html')
+  report_plot(fig,
+              filename='C:\\Peter\\CoB\\CES Response Rates\\graphs\\rdr.html')
   return
 
 
@@ -1,14 +1,29 @@
 ## Creates course assessment files for CAC purposes
 # Peter Ryan Nov 2018
+# The PLOs_to_CLOs sheet is every CLO x PLO combination of the program, built with one cross join.
+# Cells share one named style (wrap_text) and row heights are computed from the text lengths.
+# With write_only = True each program file is streamed (openpyxl write-only workbook): the template
+# rows are copied as values (no template formatting) and memory stays flat for a full college run.
+# Leave it False for the files sent to the schools (template formatting kept), set it True for a
+# full college regeneration (e.g. after a template change) when the run runs out of memory.
+# Requires openpyxl 2.6 or later (iter_rows(values_only=True), WriteOnlyCell).
 
 import pandas as pd
 import openpyxl
-from openpyxl.styles import Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, NamedStyle
 from tabulate import tabulate
 
 import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
+from general.program_manifest import (
+  ProgramManifest,
+  program_hashes,
+  program_key,
+  file_hash
+)
+
 
 def adjust_excel_rows(ws, skip_rows=0, max_rows=False, default_col='A', default_height=15):
   width = ws.column_dimensions[default_col].width
@@ -23,19 +38,84 @@ def adjust_excel_rows(ws, skip_rows=0, max_rows=False, default_col='A', default_
             mul += int(len(v)/width) + 1
           if mul > 0:
             multiples_of_font_size.append(mul)
-          
+
         cell.alignment = Alignment(wrap_text=True)
-      
+
       new_height = max(multiples_of_font_size) * default_height
       ws.row_dimensions[i_row + 1].height = new_height
 
 
+def text_lines(s, width):
+  # Number of wrapped lines of each text at a column width (same rule as adjust_excel_rows)
+  return s.fillna('').astype(str).str.split('\n').apply(lambda lines: sum(int(len(v)/width) + 1 for v in lines))
+
+
+def plo_clo_pairs(df_prg_clos, df_prg_plos):
+  '''
+  Every CLO x PLO combination of a program (cross join) in course, CLO, PLO order.
+  :param df_prg_clos: course_code, clo_nbr, clo_text of the program courses
+  :param df_prg_plos: plo_nbr, plo_text of the program
+  '''
+  df = df_prg_clos[['course_code', 'clo_nbr', 'clo_text']].assign(_key=1).merge(
+    df_prg_plos[['plo_nbr', 'plo_text']].assign(_key=1), on='_key', how='left').drop(columns='_key')
+  return df[['course_code', 'clo_nbr', 'plo_nbr', 'clo_text', 'plo_text']]
+
+
+def write_sheet(ws, df, start_row=2, wrap_cols=(), width=80, default_height=15, style='wrap_text'):
+  '''
+  Writes the data frame rows from start_row, the wrap_cols (1 based) use the shared named style and
+  set the row height. Normal worksheets are written cell by cell, worksheets of a write-only workbook
+  are appended.
+  '''
+  heights = pd.Series(1, index=df.index)
+  for col in wrap_cols:
+    heights = heights.combine(text_lines(df.iloc[:, col - 1], width), max)
+  heights = (heights * default_height).tolist()
+  rows = df.astype(object).where(df.notnull(), None).values.tolist()
+
+  if ws.parent.write_only:
+    for i, values in enumerate(rows):
+      ws.row_dimensions[start_row + i].height = heights[i]
+      cells = []
+      for j, value in enumerate(values):
+        cell = WriteOnlyCell(ws, value=value)
+        if j + 1 in wrap_cols:
+          cell.style = style
+        cells.append(cell)
+      ws.append(cells)
+  else:
+    for i, values in enumerate(rows):
+      for j, value in enumerate(values):
+        cell = ws.cell(row=start_row + i, column=j + 1, value=value)
+        if j + 1 in wrap_cols:
+          cell.style = style
+      ws.row_dimensions[start_row + i].height = heights[i]
+
+
+def template_rows(filename):
+  # Values of every template sheet (formulas as text) for the write-only workbooks
+  wb = openpyxl.load_workbook(filename, read_only=True)
+  rows = {ws.title: [list(r) for r in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+  wb.close()
+  return rows
+
+
 # open template
 directory = 'H:\\Projects\\CoB\\Program Transformation\\CLO mapping\\'
 plo_clo_filename = 'PLOs_CLOs_manually_editted.xlsx'
 
 template = 'PLO_CLO_alignment_template_1.xlsx'
 
+# stream the program files (template values only, no template formatting)
+write_only = False
+
+# data sheets, header rows of the template and the column widths
+data_sheets = {'PLOs': {'H': 80},
+               'Program_course_mapping': {},
+               'CLOs': {'G': 80},
+               'PLOs_to_CLOs': {'D': 80, 'E': 80}}
+wrap_style = NamedStyle(name='wrap_text', alignment=Alignment(wrap_text=True))
+
 # Get Dataframes
 df_plo = pd.read_excel(directory+plo_clo_filename, sheet_name='PLOs')
 df_clo = pd.read_excel(directory+plo_clo_filename, sheet_name='CLOs', converters={'course_id': str})
@@ -45,114 +125,91 @@ df_mapping = pd.read_excel(directory+plo_clo_filename, sheet_name='Mapping', con
 df_programs = df_mapping[['program_code', 'plan_code', 'career', 'school_code',
                           'school_abbr', 'campus', 'program_name']].drop_duplicates()
 
+# Only programs whose PLOs, mapping, CLOs or the template changed since the last run are generated
+manifest = ProgramManifest(directory + 'Done\\manifest.json')
+prg_hashes = program_hashes(df_plo, df_clo, df_mapping, extra=file_hash(directory + template))
+df_programs = df_programs.assign(program_key=[program_key(p, c) for p, c in zip(df_programs['program_code'],
+                                                                         df_programs['plan_code'])])
+df_programs = df_programs.loc[df_programs['program_key'].isin(manifest.changed(prg_hashes, directory))]
+
+# CLO count of every course
+clo_counts = df_clo.groupby('course_id').size()
+
+if write_only:
+  template_values = template_rows(directory + template)
+
 # iterate through programs
 for i_prg, prg in df_programs.iterrows():
   print(prg)
-  # open template
-  wb = openpyxl.load_workbook(directory + template)
 
-  # Update PLO sheet
-  # Open PLO sheet
-  ws = wb["PLOs"]
-  
+  # Program data frames, one per data sheet
   df_prg_plos = df_plo.loc[(df_plo['program_code'] == prg['program_code']) & (df_plo['plan_code'] == prg['plan_code'])]
-  
-  j = 2
-  for i, r in df_prg_plos.iterrows():
-    ws.cell(row=j, column=1).value = prg['program_code']
-    ws.cell(row=j, column=2).value = prg['plan_code']
-    ws.cell(row=j, column=3).value = prg['program_name']
-    ws.cell(row=j, column=4).value = r['career']
-    ws.cell(row=j, column=5).value = r['school_code']
-    ws.cell(row=j, column=6).value = r['school_abbr']
-    ws.cell(row=j, column=7).value = r['plo_nbr']
-    ws.cell(row=j, column=8).alignment = Alignment(wrapText=True)
-    ws.cell(row=j, column=8).value = r['plo_text']
-    ws.cell(row=j, column=9).value = r['status']
-    ws.cell(row=j, column=10).value = r['updated']
-    j += 1
-
-  # Update mapping sheet
-  # Open Mapping sheet
-  ws = wb["Program_course_mapping"]
-
   df_prg_mapping = df_mapping.loc[(df_mapping['program_code'] == prg['program_code']) & (df_mapping['plan_code'] == prg['plan_code'])]
-  
-  j=2
-  for i, r in df_prg_mapping.iterrows():
-    df_prg_crse_clos = df_clo.loc[(df_clo['course_id'] == r['course_id'])]
-    
-    ws.cell(row=j, column=1).value = prg['program_code']
-    ws.cell(row=j, column=2).value = prg['plan_code']
-    ws.cell(row=j, column=3).value = prg['program_name']
-    ws.cell(row=j, column=4).value = r['course_id']
-    ws.cell(row=j, column=5).value = r['course_code']
-    ws.cell(row=j, column=6).value = r['course_name']
-    ws.cell(row=j, column=7).value = r['course_list_name']
-    ws.cell(row=j, column=8).value = len(df_prg_crse_clos)
-    j += 1
-
-  # Update CLO & PLOS to CLOs sheets
-  # Open sheets
-  ws1 = wb["CLOs"]
-  ws2 = wb["PLOs_to_CLOs"]
-  # Get courses
   df_prg_courses = df_prg_mapping[['course_id', 'course_code', 'course_name']].drop_duplicates()
-  
-  j = 2
-  k = 2
-  for i_crse, crse in df_prg_courses.iterrows():
-    df_prg_crse_clos = df_clo.loc[(df_clo['course_id'] == crse['course_id'])]
-
-    for i, clo in df_prg_crse_clos.iterrows():
-      ws1.cell(row=j, column=1).value = crse['course_id']
-      ws1.cell(row=j, column=2).value = crse['course_code']
-      ws1.cell(row=j, column=3).value = crse['course_name']
-      ws1.cell(row=j, column=4).value = clo['school_code']
-      ws1.cell(row=j, column=5).value = clo['school_abbr']
-      ws1.cell(row=j, column=6).value = clo['clo_nbr']
-      ws1.cell(row=j, column=7).alignment = Alignment(wrapText=True)
-      ws1.cell(row=j, column=7).value = clo['clo_text']
-      ws1.cell(row=j, column=8).value = clo['status']
-      ws1.cell(row=j, column=9).value = clo['updated']
-      j += 1
-      # put all PLO combination in PLOs to CLOs
-      for i_plo, plo in df_prg_plos.iterrows():
-        ws2.cell(row=k, column=1).value = crse['course_code']
-        ws2.cell(row=k, column=2).value = clo['clo_nbr']
-        ws2.cell(row=k, column=3).value = plo['plo_nbr']
-        ws2.cell(row=k, column=4).alignment = Alignment(wrapText=True)
-        ws2.cell(row=k, column=4).value = clo['clo_text']
-        ws2.cell(row=k, column=5).alignment = Alignment(wrapText=True)
-        ws2.cell(row=k, column=5).value = plo['plo_text']
-        k += 1
-  
-  # Adjust row heights and column widths
-  ws = wb["Program Summary"]
-  ws.column_dimensions['B'].width = 60
-  adjust_excel_rows(ws, skip_rows=3, default_col='B', default_height=15)
-
-  ws = wb["All Course Summaries"]
-  ws.row_dimensions[2].height = 200
-  for col in ['E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q']:
-    ws.column_dimensions[col].width = 16
-  for row in range(3, 2000):
-    ws.row_dimensions[row].height = 50
-
-  ws = wb["PLOs"]
-  ws.column_dimensions['H'].width = 80
-  adjust_excel_rows(ws, skip_rows=1, default_col='H', default_height=15)
-  
-  ws = wb["CLOs"]
-  ws.column_dimensions['G'].width = 80
-  adjust_excel_rows(ws, skip_rows=1, default_col='G', default_height=15)
-  
-  ws = wb["PLOs_to_CLOs"]
-  ws.column_dimensions['D'].width = 80
-  ws.column_dimensions['E'].width = 80
-  adjust_excel_rows(ws, skip_rows=1, default_col='D', default_height=16)
-  
-  
-  
+  df_prg_clos = df_prg_courses.merge(df_clo.drop(columns=['course_code', 'course_name'], errors='ignore'),
+                                     on='course_id', how='inner')
+
+  sheets = {
+    'PLOs': (df_prg_plos.assign(program_code=prg['program_code'], plan_code=prg['plan_code'],
+                                program_name=prg['program_name'])
+             [['program_code', 'plan_code', 'program_name', 'career', 'school_code', 'school_abbr',
+               'plo_nbr', 'plo_text', 'status', 'updated']], [8], 15),
+    'Program_course_mapping': (df_prg_mapping.assign(program_code=prg['program_code'], plan_code=prg['plan_code'],
+                                                     program_name=prg['program_name'],
+                                                     clo_count=df_prg_mapping['course_id'].map(clo_counts).fillna(0).astype(int))
+                               [['program_code', 'plan_code', 'program_name', 'course_id', 'course_code',
+                                 'course_name', 'course_list_name', 'clo_count']], [], 15),
+    'CLOs': (df_prg_clos[['course_id', 'course_code', 'course_name', 'school_code', 'school_abbr',
+                          'clo_nbr', 'clo_text', 'status', 'updated']], [7], 15),
+    # put all PLO combination in PLOs to CLOs
+    'PLOs_to_CLOs': (plo_clo_pairs(df_prg_clos, df_prg_plos), [4, 5], 16),
+  }
+
+  if write_only:
+    wb = openpyxl.Workbook(write_only=True)
+    wb.add_named_style(wrap_style)
+    for sheet_name, values in template_values.items():
+      ws = wb.create_sheet(sheet_name)
+      if sheet_name in sheets:
+        df_sheet, wrap_cols, height = sheets[sheet_name]
+        for col, width in data_sheets[sheet_name].items():
+          ws.column_dimensions[col].width = width
+        if values:
+          ws.append(values[0])
+        write_sheet(ws, df_sheet, start_row=2, wrap_cols=wrap_cols, default_height=height)
+      else:
+        if sheet_name == 'Program Summary':
+          ws.column_dimensions['B'].width = 60
+        elif sheet_name == 'All Course Summaries':
+          for col in ['E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q']:
+            ws.column_dimensions[col].width = 16
+          ws.row_dimensions[2].height = 200
+          for row in range(3, len(values) + 1):
+            ws.row_dimensions[row].height = 50
+        for row in values:
+          ws.append(row)
+  else:
+    # open template
+    wb = openpyxl.load_workbook(directory + template)
+    wb.add_named_style(wrap_style)
+    for sheet_name, (df_sheet, wrap_cols, height) in sheets.items():
+      ws = wb[sheet_name]
+      for col, width in data_sheets[sheet_name].items():
+        ws.column_dimensions[col].width = width
+      write_sheet(ws, df_sheet, start_row=2, wrap_cols=wrap_cols, default_height=height)
+
+    # Adjust row heights and column widths
+    ws = wb["Program Summary"]
+    ws.column_dimensions['B'].width = 60
+    adjust_excel_rows(ws, skip_rows=3, default_col='B', default_height=15)
+
+    ws = wb["All Course Summaries"]
+    ws.row_dimensions[2].height = 200
+    for col in ['E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q']:
+      ws.column_dimensions[col].width = 16
+    for row in range(3, ws.max_row + 1):
+      ws.row_dimensions[row].height = 50
+
   save_filename = '\\Done\\PL0_CLO_alignment_{}_{}.xlsx'.format(prg['school_abbr'], prg['program_code'])
-  wb.save(directory+save_filename)
\ No newline at end of file
+  wb.save(directory+save_filename)
+  manifest.record(prg['program_key'], prg_hashes[prg['program_key']], save_filename)
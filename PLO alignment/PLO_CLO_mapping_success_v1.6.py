@@ -20,6 +20,13 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.outcome_similarity import OutcomeSimilarity
+from general.program_manifest import (
+  ProgramManifest,
+  program_hashes,
+  program_key,
+  file_hash
+)
 
 from datetime import datetime
 startTime = datetime.now()
@@ -96,6 +103,21 @@ df_mapping = pd.read_excel(directory+plo_clo_filename, sheet_name='Program_cours
 # get program list
 df_programs = df_mapping[['program_code', 'plan_code', 'program_name']].drop_duplicates()
 
+# Suggested alignments: PLO x CLO text similarity of every program, computed once for the catalogue
+# Written to columns J (score) and K (suggested 0/1) of PLOs_to_CLOs, column I is left for the academics
+df_scores = OutcomeSimilarity().fit(df_plo, df_clo).program_scores(df_mapping)
+pair_suggestions = df_scores.set_index(['program_code', 'plan_code', 'plo_nbr', 'course_id', 'clo_nbr'])[
+  ['score', 'suggested']].to_dict('index')
+
+# Only programs whose PLOs, mapping, CLOs, suggestion scores or the template changed since the last run
+# are generated (the scores are fitted on the whole catalogue, so a text edit in one program can change
+# the scores of another)
+manifest = ProgramManifest(directory + 'v1.6\\manifest.json')
+prg_hashes = program_hashes(df_plo, df_clo, df_mapping, extra=file_hash(directory + template), df_scores=df_scores)
+df_programs = df_programs.assign(program_key=[program_key(p, c) for p, c in zip(df_programs['program_code'],
+                                                                         df_programs['plan_code'])])
+df_programs = df_programs.loc[df_programs['program_key'].isin(manifest.changed(prg_hashes, directory))]
+
 # Matching column data validation
 dv_match = DataValidation(type="list", formula1='"0,1"', allow_blank=True)
 
@@ -187,7 +209,7 @@ dv_clear2.error ='You have entered free text'
 dv_clear2.errorTitle = 'Free Text'
 dv_clear2.errorStyle = 'warning'
 
-for i_prg, prg in df_programs[40:].iterrows():
+for i_prg, prg in df_programs.iterrows():
   # initiate counters
   j_plo = 2
   j_mapping = 2
@@ -203,6 +225,8 @@ for i_prg, prg in df_programs[40:].iterrows():
   ws_clo = wb["CLOs"]
   ws_align = wb["PLOs_to_CLOs"]
   ws_all_courses = wb['All Course Summaries']
+  ws_align.cell(row=1, column=10).value = 'Suggested Score'
+  ws_align.cell(row=1, column=11).value = 'Suggested'
   
   # Add the data-validation object to the align worksheet
   ws_align.add_data_validation(dv_match)
@@ -366,6 +390,11 @@ for i_prg, prg in df_programs[40:].iterrows():
         ws_align.cell(row=j_align, column=8).value = clo['Clear and usable']
         
         ws_align.cell(row=j_align, column=9).protection = Protection(locked=False)
+        suggestion = pair_suggestions.get((plo['program_code'], plo['plan_code'], plo['plo_nbr'],
+                                           crse['course_id'], clo['clo_nbr']))
+        if suggestion is not None:
+          ws_align.cell(row=j_align, column=10).value = float(suggestion['score'])
+          ws_align.cell(row=j_align, column=11).value = int(suggestion['suggested'])
         dv_match.add(ws_align.cell(row=j_align, column=9))
         j_align += 1
 
@@ -461,6 +490,7 @@ for i_prg, prg in df_programs[40:].iterrows():
     
   save_filename = 'v1.6\\PLO_CLO_alignment_{}_28Feb2019.xlsx'.format(prg['program_code'])
   wb.save(directory+save_filename)
+  manifest.record(prg['program_key'], prg_hashes[prg['program_key']], save_filename)
 
   print('File Saved')
   intTime1 = datetime.now()
@@ -3,82 +3,22 @@
 
 import pandas as pd
 import openpyxl
+from sqlalchemy import create_engine
 from openpyxl.styles import Alignment
 from tabulate import tabulate
 
 import sys
-import re
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
+from general.outcomes_parser import (
+  parse_outcomes,
+  outcome_rows,
+  load_outcomes
+)
+from general.term_metadata import (
+  map_school_abbreviations
+)
 
-def get_school_name(school_code):
-  if school_code == '610P':
-    return 'CBO'
-  if school_code == '615H':
-    return 'ACCT'
-  if school_code == '620H':
-    return 'BITL'
-  if school_code == '625H':
-    return 'EFM'
-  if school_code == '630H':
-    return 'MGT'
-  if school_code == '650T':
-    return 'VBE'
-  if school_code == '660H':
-    return 'GSBL'
-  if school_code == 'VN':
-    return 'SBM'
-  return None
-
-
-def cleanhtml(raw_html):
-  cleanr = re.compile('<.*?>')
-  cleantext = re.sub(cleanr, '', raw_html)
-  return cleantext
-
-def get_PLOs(text, prog=None):
-  try:
-    if 'BP141' in prog:
-      print(text)
-      text = cleanhtml(text)
-      print(text)
-    PLOs = (text.split('\n'))
-    PLOs_2 = []
-    for lo in PLOs:
-      lo = lo.strip()
-      lo = lo.rstrip()
-      lo = lo.strip('-')
-      lo = lo.strip('•')
-      lo = lo.strip('*')
-      lo = lo.strip('1')
-      lo = lo.strip('2')
-      lo = lo.strip('3')
-      lo = lo.strip('4')
-      lo = lo.strip('5')
-      lo = lo.strip('6')
-      lo = lo.strip('7')
-      lo = lo.strip('8')
-      lo = lo.strip('9')
-      lo = lo.strip('.')
-      if lo.startswith(":"):
-        return lo[1:]
-      lo = lo.strip(')')
-      lo = lo.strip('\uf0a7')
-      lo = lo.strip()
-      
-      if len(lo) > 10:
-        PLOs_2.append(lo)
-    
-    while PLOs_2[0][-1] != ':':
-      PLOs_2 = PLOs_2[1:]
-    PLOs_2 = PLOs_2[1:]
-    return(PLOs_2)
-  
-  except Exception as e:
-    print(e)
-    print(prog)
-    #print(text)
-    return['']
 
 # open template
 directory = 'H:\\Projects\\CoB\\Program Transformation\\CLO mapping\\'
@@ -87,34 +27,57 @@ template = 'PLO_template.xlsx'
 savefile = 'PLO_cob.xlsx'
 
 
-# open template
-wb = openpyxl.load_workbook(directory+template)
+# write the PLOs to postgres as well as the spreadsheet
+load_to_postgres = False
+
+
+# the statements are split in a process pool, so the script runs under __main__
+if __name__ == '__main__':
+  # open template
+  wb = openpyxl.load_workbook(directory+template)
+  wrap = Alignment(wrapText=True)
 
-# fill CLOs worksheet
-plo_df = pd.read_excel(open(directory+clo_filename, 'rb'))
-plo_ws = wb.active
+  # fill CLOs worksheet
+  plo_df = pd.read_excel(open(directory+clo_filename, 'rb'))
+  plo_ws = wb.active
 
-j = 2
-for i, r in plo_df.iterrows():
-  if r['Status'] in ['Republished', 'Published']:
-    school_code = r['Owning School'].split('(')[1][:-1]
-    PLO_list = get_PLOs(r['Statement of Capabilities'], '{} {}'.format(r['Program Code'], r['Plan Code']))
-    k = 1
-    for plo in PLO_list:
-      plo_ws.cell(row=j, column=1).value = r['Program Code']
-      plo_ws.cell(row=j, column=2).value = r['Plan Code']
-      plo_ws.cell(row=j, column=3).value = r['Program Name']
-      plo_ws.cell(row=j, column=4).value = r['Career']
-      plo_ws.cell(row=j, column=5).value = school_code
-      plo_ws.cell(row=j, column=6).value = get_school_name(school_code)
-      plo_ws.cell(row=j, column=7).value = 'PLO{}'.format(k)
-      plo_ws.cell(row=j, column=8).alignment = Alignment(wrapText=True)
-      plo_ws.cell(row=j, column=8).value = plo
-      plo_ws.cell(row=j, column=9).value = r['Status']
-      plo_ws.cell(row=j, column=10).value = r['Created Date']
-      j += 1
-      k += 1
-wb.save(directory+savefile)
+  plo_df = plo_df.loc[plo_df['Status'].isin(['Republished', 'Published'])]
+  plo_df = plo_df.assign(school_code=plo_df['Owning School'].str.split('(').str[1].str[:-1])
+  plo_df['school_abbr'] = map_school_abbreviations(plo_df['school_code'], overrides={'VN': 'SBM'}).values
 
+  # Split every statement of capabilities in one pass (process pool for large catalogues)
+  df_plos = parse_outcomes(plo_df['Statement of Capabilities'],
+                           (plo_df['Program Code'].astype(str) + ' ' + plo_df['Plan Code'].astype(str)).tolist(),
+                           kind='plo', processes=None)
+  df_plos = outcome_rows(plo_df, df_plos, ['Program Code', 'Plan Code', 'Program Name', 'Career', 'school_code',
+                                           'school_abbr', 'Status', 'Created Date'])
 
+  for j, r in enumerate(df_plos.itertuples(index=False), start=2):
+    plo_ws.cell(row=j, column=1).value = r[0]
+    plo_ws.cell(row=j, column=2).value = r[1]
+    plo_ws.cell(row=j, column=3).value = r[2]
+    plo_ws.cell(row=j, column=4).value = r[3]
+    plo_ws.cell(row=j, column=5).value = r[4]
+    plo_ws.cell(row=j, column=6).value = r[5]
+    plo_ws.cell(row=j, column=7).value = 'PLO{}'.format(r.outcome_nbr)
+    plo_ws.cell(row=j, column=8).alignment = wrap
+    plo_ws.cell(row=j, column=8).value = r.outcome_text
+    plo_ws.cell(row=j, column=9).value = r[6]
+    plo_ws.cell(row=j, column=10).value = r[7]
+  wb.save(directory+savefile)
 
+  # Load the PLOs into postgres
+  if load_to_postgres:
+    postgres_user = 'pjryan'
+    postgres_host = 'localhost'
+    postgres_dbname = 'postgres'
+    postgres_pw = input("Postgres Password: ")
+    engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                               postgres_pw,
+                                                               postgres_host,
+                                                               postgres_dbname)
+    postgres_engine = create_engine(engine_string)
+    df_load = df_plos.rename(columns={'Program Code': 'program_code', 'Plan Code': 'plan_code',
+                                      'outcome_nbr': 'plo_nbr', 'outcome_text': 'plo_text'})
+    load_outcomes(df_load[['program_code', 'plan_code', 'plo_nbr', 'plo_text']],
+                  postgres_engine, 'programs', 'tbl_plo', text_col='plo_text', replace_col='program_code')
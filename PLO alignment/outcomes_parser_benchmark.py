@@ -0,0 +1,125 @@
+## Benchmark and golden output check of the learning outcomes parser (general/outcomes_parser.py)
+# Peter Ryan Nov 2018
+#   - times the parse of the PLO and CLO source columns in this process and in a process pool
+#     (the columns are repeated to give a catalogue sized input)
+#   - compares the outcomes with the files the original get_PLOs / get_CLOs scripts produced
+#     (PLO_cob.xlsx, CLOs_cob_success_2_extra.xlsx) and lists the rows that differ
+#   - exits with status 1 when any outcome differs, other than in the programs with a PLO line starting
+#     with ':' (documented behaviour change of general/outcomes_parser.py) and the courses listed in
+#     clo_expected_differences
+# The original CLO output was written on Python < 3.7, where re.split ignored the empty alternative
+# at the end of the <li> pattern, so every course (including the <li> text) is compared.
+
+import time
+import pandas as pd
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.outcomes_parser import (
+  parse_outcomes,
+  clean_html,
+  html_programs,
+  plo_strip_chars
+)
+
+plo_directory = 'H:\\Projects\\CoB\\Program Transformation\\CLO mapping\\'
+plo_source = 'PLOs_cob_unedited.xlsx'
+plo_golden = 'PLO_cob.xlsx'
+
+clo_directory = 'H:\\Projects\\CoB\\Program Transformation\\CLO mapping\\Success\\'
+clo_source = 'CLOs_cob_success.xlsx'
+clo_golden = 'CLOs_cob_success_2_extra.xlsx'
+
+# Course ID: reason, courses confirmed to differ from the original output for a known reason
+clo_expected_differences = {}
+
+# times the source columns are repeated for the timings
+repeats = 20
+
+
+def time_parse(texts, labels, kind):
+  for processes in [1, None]:
+    start = time.time()
+    df = parse_outcomes(texts * repeats, labels * repeats, kind=kind, processes=processes)
+    print('{0}\tprocesses={1}\t{2} outcomes\t{3:.2f}s'.format(kind, processes, len(df), time.time() - start))
+
+
+def golden_differences(df_new, df_golden, keys):
+  # Outcomes only in the new parse (new) or only in the original output (golden)
+  df = df_new.merge(df_golden, on=keys, how='outer', suffixes=('_new', '_golden'), indicator=True)
+  return df.loc[(df['_merge'] != 'both') | (df['outcome_text_new'] != df['outcome_text_golden'])]
+
+
+def plo_colon_line(text, prog):
+  # get_PLOs returned the rest of a line starting with ':' (after the strip characters) as the PLO list
+  if not isinstance(text, str):
+    return False
+  if any(p in prog for p in html_programs):
+    text = clean_html(text)
+  for lo in text.split('\n'):
+    lo = lo.strip()
+    for c in plo_strip_chars:
+      lo = lo.strip(c)
+    if lo.startswith(':'):
+      return True
+  return False
+
+
+def expected_differences(df_diff, df_source, keys, changed):
+  # Differences in the rows of the source whose outcomes the documented behaviour changes alter
+  changed_keys = df_source.loc[changed, keys].drop_duplicates().assign(_changed=True)
+  df = df_diff.drop(columns='_merge').merge(changed_keys, on=keys, how='left')
+  return df['_changed'].fillna(False).astype(bool).to_numpy()
+
+
+if __name__ == '__main__':
+  # PLOs (published programs, as PLO_separation.py)
+  plo_df = pd.read_excel(plo_directory + plo_source)
+  plo_df = plo_df.loc[plo_df['Status'].isin(['Republished', 'Published'])].reset_index(drop=True)
+  texts = plo_df['Statement of Capabilities'].tolist()
+  labels = (plo_df['Program Code'].astype(str) + ' ' + plo_df['Plan Code'].astype(str)).tolist()
+  time_parse(texts, labels, 'plo')
+
+  df_plos = parse_outcomes(texts, labels, kind='plo')
+  df_plos = plo_df[['Program Code', 'Plan Code']].iloc[df_plos['row']].reset_index(drop=True).join(
+    df_plos[['outcome_nbr', 'outcome_text']])
+  df_golden = pd.read_excel(plo_directory + plo_golden).iloc[:, [0, 1, 6, 7]]
+  df_golden.columns = ['Program Code', 'Plan Code', 'outcome_nbr', 'outcome_text']
+  df_golden['outcome_nbr'] = df_golden['outcome_nbr'].str[3:].astype(int)
+  df_diff = golden_differences(df_plos, df_golden, ['Program Code', 'Plan Code', 'outcome_nbr'])
+  expected = expected_differences(df_diff, plo_df, ['Program Code', 'Plan Code'],
+                                  [plo_colon_line(t, l) for t, l in zip(texts, labels)])
+  plo_unexpected = df_diff.loc[~expected]
+  print('PLOs: {0} outcomes, {1} differ from {2} ({3} in programs with a line starting with \':\')'.format(
+    len(df_plos), len(df_diff), plo_golden, expected.sum()))
+  print(tabulate(plo_unexpected[:20], headers='keys'))
+
+  # CLOs (as CLO_separation.py)
+  clo_df = pd.read_excel(clo_directory + clo_source, converters={'Course ID': str})
+  texts = clo_df['Learning Outcomes'].tolist()
+  labels = clo_df['Course ID'].tolist()
+  time_parse(texts, labels, 'clo')
+
+  df_clos = parse_outcomes(texts, labels, kind='clo')
+  df_clos = clo_df[['Course ID']].iloc[df_clos['row']].reset_index(drop=True).join(
+    df_clos[['outcome_nbr', 'outcome_text']])
+  df_golden = pd.read_excel(clo_directory + clo_golden, converters={0: str}).iloc[:, [0, 4, 5]]
+  df_golden.columns = ['Course ID', 'outcome_nbr', 'outcome_text']
+  df_golden['outcome_nbr'] = df_golden['outcome_nbr'].str[3:].astype(int)
+  df_diff = golden_differences(df_clos, df_golden, ['Course ID', 'outcome_nbr'])
+  expected = expected_differences(df_diff, clo_df, ['Course ID'],
+                                  clo_df['Course ID'].isin(list(clo_expected_differences)).tolist())
+  clo_unexpected = df_diff.loc[~expected]
+  print('CLOs: {0} outcomes, {1} differ from {2} ({3} in the courses of clo_expected_differences)'.format(
+    len(df_clos), len(df_diff), clo_golden, expected.sum()))
+  for course_id, reason in clo_expected_differences.items():
+    print('  {0}: {1}'.format(course_id, reason))
+  print(tabulate(clo_unexpected[:20], headers='keys'))
+
+  if len(plo_unexpected) > 0 or len(clo_unexpected) > 0:
+    print('FAILED: {0} PLO and {1} CLO outcomes differ from the original output'.format(
+      len(plo_unexpected), len(clo_unexpected)))
+    sys.exit(1)
+  print('OK')
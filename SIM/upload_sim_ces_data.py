@@ -8,6 +8,11 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.materialised_views import refresh_materialised_views
+from general.comment_cleaning import clean_comments
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -73,19 +78,8 @@ def upload_sim_ces_data_from_excel(directory, filename, engine,
     'comment_type', 'comment_text'
   ]]
   
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != '-']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'nil']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'nil.']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != '-nil-']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'NIL']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != '-NIL-']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'Nil']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'NA']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'na']
-  df_ces_com = df_ces_com[df_ces_com['comment_text'] != 'Na']
-  df_ces_com = df_ces_com[df_ces_com.comment_text.notnull()]
-  df_ces_com = df_ces_com[df_ces_com.comment_type.notnull()]
-  df_ces_com = df_ces_com[df_ces_com['comment_type'] != '-']
+  df_ces_com = clean_comments(df_ces_com, ['comment_text'])
+  df_ces_com = df_ces_com[df_ces_com['comment_type'].notnull() & (df_ces_com['comment_type'] != '-')]
   
   print (df_ces_com)
   
@@ -112,3 +106,5 @@ filename = 'SIM CES Jul 2019.xlsx'
 print(os.path.join(directory, filename))
 upload_sim_ces_data_from_excel(directory, filename, postgres_engine)
 
+# Refresh the materialised views built on the uploaded tables
+refresh_materialised_views(postgres_engine, schemas=['sim_ces'])
@@ -37,6 +37,11 @@ from general.postgres_queries import (
   qry_course_enhancement_list_2019s2
 )
 
+from general.index_advisor import (
+  QueryCaptureCursor,
+  save_captured_queries
+)
+
 '''
 This script is designed to produce the Course Enhancement Data Packs.
   On running it produces a weblink with two dropdown menus
@@ -146,6 +151,12 @@ con_string = "host='{0}' " \
 
 postgres_con, postgres_cur = connect_to_postgres_db(con_string)
 
+# Record the queries sent to postgres for the index advisor (pipeline/index_advisor_report.py)
+capture_queries = False
+captured_queries_file = 'H:\\Projects\\CoB\\Database\\captured_queries.json'
+if capture_queries:
+  postgres_cur = QueryCaptureCursor(postgres_cur, script='CES_Datapacks_2020s1_all')
+
 '''------------------------Get Images---------------------'''
 # header image
 image_filename = 'C:\\Peter\\CoB\\logos\\L&T_Transparent_200.png'  # replace with your own image
@@ -199,15 +210,14 @@ def make_comments_rows(df1, empty_statement='No comments provided'):
   # creates a Dash table of comments from a panda data frame
   ## df should have 3 columns {program_code, best, improve}
   ## Empty df is empty: the empty_stement is placed in middle column
-  ##    Postrges does not handle apostrophe and single quote marks well, they are often converted to a ?
-  ##    hence all ? are converted to ', this is not perfect but creates less errors overall
+  ##    Comments are cleaned when loaded (general.comment_cleaning), including apostrophes stored as ?
   df1 = df1[['program_code', 'best', 'improve']]
   try:
     if len(df1) > 0:
       rows = [
         html.Tr(
-          [html.Td(df1.iloc[i][col].replace("?", "'")) for col in df1.columns]
-        ) for i in range(len(df1))
+          [html.Td(value) for value in row]
+        ) for row in df1.itertuples(index=False)
       ]
     else:
       rows = [html.Tr([html.Td(''), html.Td(empty_statement), html.Td('')])]
@@ -1200,4 +1210,9 @@ def static_file(path):
 
 
 if __name__ == '__main__':
-  app.run_server(port=8050, host='127.0.0.2', debug=False)
+  # the course callbacks query postgres while the server runs, so the queries are saved when it stops
+  try:
+    app.run_server(port=8050, host='127.0.0.2', debug=False)
+  finally:
+    if capture_queries:
+      save_captured_queries(postgres_cur, captured_queries_file)
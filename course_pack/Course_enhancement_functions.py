@@ -5,6 +5,9 @@ import pandas as pd
 import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 import general.RMIT_colours as rc
+from general.term_metadata import (
+  term_name
+)
 
 colourList = [rc.RMIT_Red,
               rc.RMIT_Green,
@@ -26,62 +29,9 @@ colourList = [rc.RMIT_Red,
 def get_term_name(term_code, year=None, semester=None, level=None, short=False):
   '''
   :param term_code: RMIT term code
-  :return: string 'Year Term_name'
+  :return: string 'Year Term_name' (general/term_metadata.py)
   '''
-  txt = ''
-  try:    year = '20{}'.format(term_code[:2])
-  except: year = ''
-
-  try:
-    term_txt = ''
-    term = term_code[2:]
-    if short == False:
-      if term == '00':
-          term_txt = 'Summer Semester'
-      elif term in ['01', '03']:
-          term_txt = 'Academic Year'
-      elif term == '02':
-          term_txt = 'Flexible Term'
-      elif term in ['05', '10']:
-          term_txt = 'Semester 1'
-      elif term in ['45', '50']:
-          term_txt = 'Semester 2'
-      elif term == '20':
-          term_txt = 'Offshore Semester 1'
-      elif term == '30':
-          term_txt = 'Offshore Semester 2'
-      elif term == '60':
-          term_txt = 'Offshore Semester 3'
-      elif term == '70':
-          term_txt = 'Offshore Semester 4'
-      elif term == '78':
-          term_txt = 'Spring Semester'
-      elif term == '91':
-          term_txt = 'Vietnam Semester 1'
-      elif term == '92':
-          term_txt = 'Vietnam Semester 2'
-      elif term == '93':
-          term_txt = 'Vietnam Semester 3'
-  
-    if short == True:
-      if term in ['05', '10', '91', '20']:
-        term_txt = 'S1'
-      elif term in ['45', '50', '92', '60']:
-        term_txt = 'S2'
-      elif term in ['93']:
-        term_txt = 'S3'
-      else:
-        term_txt = 'Irregular offering'
-       
-  except:
-    term_txt = ''
-  
-  output = ''
-  output += year
-  
-  if term_txt != '':
-    output += ' {}'.format(term_txt)
-  return output
+  return term_name(term_code, short=short)
 
 def get_colour(measure, level = 'HE'):
   if measure == 'osi':
@@ -9,6 +9,9 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
+from general.term_metadata import (
+  term_axis
+)
 
 colourList = [rc.RMIT_Red,
               rc.RMIT_Green,
@@ -75,21 +78,11 @@ def sim_line_graph_measure_surveys(df1,
   # all traces for plotly
   traces = []
   
-  xlabels = []
-  
-  for year in range(int(start_year), int(end_year) + 1):
-    if semester == 1 or semester == 2:
-      xlabels.append('{}<br> S{}'.format(year, semester))
-      semesters = [semester]
-    
-    else:
-      xlabels.append('{}<br> S1'.format(year))
-      xlabels.append('{}<br> S2'.format(year))
-      semesters = [1, 2]
-  
-  no_terms = len(xlabels)
-  
-  x = [i - 0.5 for i in range(1, no_terms + 1)]
+  axis = term_axis(start_year, end_year, semester)
+  xlabels = axis.labels
+  semesters = axis.semesters
+  no_terms = axis.no_terms
+  x = axis.x
   
   label_check = 0
   
@@ -179,21 +172,11 @@ def sim_line_graph_measure_surveys_mulitiple(df1,
   # all traces for plotly
   traces = []
   
-  xlabels = []
-  
-  for year in range(int(start_year), int(end_year)+1):
-    if semester == 1 or semester == 2:
-      xlabels.append('{}<br> S{}'.format(year, semester))
-      semesters = [semester]
-    
-    else:
-      xlabels.append('{}<br> S1'.format(year))
-      xlabels.append('{}<br> S2'.format(year))
-      semesters = [1, 2]
-    
-  no_terms = len(xlabels)
-  
-  x = [i - 0.5 for i in range(1, no_terms + 1)]
+  axis = term_axis(start_year, end_year, semester)
+  xlabels = axis.labels
+  semesters = axis.semesters
+  no_terms = axis.no_terms
+  x = axis.x
   
   label_check = 0
   
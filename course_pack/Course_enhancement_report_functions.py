@@ -73,16 +73,15 @@ def make_comments_rows(df1, empty_statement='No comments provided'):
   # creates a Dash table of comments from a panda data frame
   ## df should have 3 columns {program_code, best, improve}
   ## Empty df is empty: the empty_stement is placed in middle column
-  ##    Postrges does not handle apostrophe and single quote marks well, they are often converted to a ?
-  ##    hence all ? are converted to ', this is not perfect but creates less errors overall
+  ##    Comments are cleaned when loaded (general.comment_cleaning), including apostrophes stored as ?
   
   df1 = df1[['program_code', 'best', 'improve']]
   try:
     if len(df1) > 0:
       rows = [
         html.Tr(
-          [html.Td(df1.iloc[i][col].replace("?", "'")) for col in df1.columns]
-        ) for i in range(len(df1))
+          [html.Td(value) for value in row]
+        ) for row in df1.itertuples(index=False)
       ]
     else:
       rows = [html.Tr([html.Td(''), html.Td(empty_statement), html.Td('')])]
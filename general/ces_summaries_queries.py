@@ -0,0 +1,197 @@
+## Queries for the partitioned ces_summaries table
+# Peter October 2019
+# The whole of college class summaries were loaded into one table per level/year/semester
+# (ces_summaries.tbl_{level}_{year}_sem{n}) and combined with a UNION view.
+# They are now stored in one declaratively partitioned table ces_summaries.tbl_summaries
+# (partitioned by survey_year, then survey_semester, then survey_level) so cross year teacher
+# queries get partition pruning and vw_summaries_combined no longer sorts every row to dedupe.
+# New semesters are loaded into a staging table and attached as a partition.
+
+summaries_schema = 'ces_summaries'
+summaries_table = 'tbl_summaries'
+
+# Columns in the whole of college summaries csv files (in file order)
+summaries_csv_columns = [
+  ('course_code', 'text'),
+  ('all_flag', 'text'),
+  ('class_nbr', 'text'),
+  ('term_code', 'text'),
+  ('section_code', 'text'),
+  ('course_name', 'text'),
+  ('teaching_staff', 'text'),
+  ('course_coordinator', 'text'),
+  ('career', 'text'),
+  ('survey_population', 'integer'),
+  ('osi_response_count', 'integer'),
+  ('gts_response_count', 'integer'),
+  ('reliability', 'text'),
+  ('campus', 'text'),
+  ('gts', 'numeric'),
+  ('gts_mean', 'numeric'),
+  ('osi', 'numeric'),
+  ('osi_mean', 'numeric'),
+  ('international_count', 'integer'),
+  ('domestic_count', 'integer'),
+  ('ft_count', 'integer'),
+  ('pt_count', 'integer'),
+  ('gts1', 'numeric'),
+  ('gts2', 'numeric'),
+  ('gts3', 'numeric'),
+  ('gts4', 'numeric'),
+  ('gts5', 'numeric'),
+  ('gts6', 'numeric'),
+]
+
+# Partition keys, survey_year stays text to match vw_summaries_combined
+summaries_key_columns = [
+  ('survey_year', 'text'),
+  ('survey_semester', 'integer'),
+  ('survey_level', 'text'),
+]
+
+
+def summaries_partition_name(year, semester=None, level=None, table=summaries_table):
+  name = '{0}_{1}'.format(table, year)
+  if semester is not None:
+    name += '_sem{}'.format(semester)
+  if level is not None:
+    name += '_{}'.format(level.lower())
+  return name
+
+
+def _column_definitions():
+  cols = []
+  for col, col_type in summaries_key_columns + summaries_csv_columns:
+    if col_type == 'text':
+      cols.append('    {0} text COLLATE pg_catalog."default"'.format(col))
+    else:
+      cols.append('    {0} {1}'.format(col, col_type))
+  return ', \n'.join(cols)
+
+
+def qry_create_summaries_table(schema=summaries_schema, table=summaries_table):
+  qry = " CREATE TABLE IF NOT EXISTS {0}.{1} \n" \
+        " ( \n" \
+        "{2} \n" \
+        " ) PARTITION BY LIST (survey_year); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_teaching_staff ON {0}.{1} (teaching_staff); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_course_code ON {0}.{1} (course_code); \n" \
+        "".format(schema, table, _column_definitions())
+  return qry
+
+
+def qry_create_year_partition(year, schema=summaries_schema, table=summaries_table):
+  # A year partition, sub partitioned by semester
+  qry = " CREATE TABLE IF NOT EXISTS {0}.{1} \n" \
+        "   PARTITION OF {0}.{2} FOR VALUES IN ('{3}') \n" \
+        "   PARTITION BY LIST (survey_semester); \n" \
+        "".format(schema, summaries_partition_name(year, table=table), table, year)
+  return qry
+
+
+def qry_create_semester_partition(year, semester, schema=summaries_schema, table=summaries_table):
+  # A semester partition, sub partitioned by level (leaf partitions are attached by the loader)
+  qry = " CREATE TABLE IF NOT EXISTS {0}.{1} \n" \
+        "   PARTITION OF {0}.{2} FOR VALUES IN ({3}) \n" \
+        "   PARTITION BY LIST (survey_level); \n" \
+        "".format(schema, summaries_partition_name(year, semester, table=table),
+                  summaries_partition_name(year, table=table), semester)
+  return qry
+
+
+def qry_create_staging_table(year, semester, level, schema=summaries_schema, table=summaries_table):
+  # Staging table with the partition keys defaulted so the csv can be copied straight in.
+  # The check constraint matches the partition bounds so ATTACH PARTITION skips the validation scan.
+  staging = summaries_partition_name(year, semester, level, table=table)
+  qry = " DROP TABLE IF EXISTS {0}.{1}; \n" \
+        " CREATE TABLE {0}.{1} (LIKE {0}.{2} INCLUDING DEFAULTS); \n" \
+        " ALTER TABLE {0}.{1} \n" \
+        "   ALTER COLUMN survey_year SET DEFAULT '{3}', \n" \
+        "   ALTER COLUMN survey_semester SET DEFAULT {4}, \n" \
+        "   ALTER COLUMN survey_level SET DEFAULT '{5}', \n" \
+        "   ADD CONSTRAINT chk_{1} CHECK (survey_year IS NOT NULL AND survey_year = '{3}' \n" \
+        "     AND survey_semester IS NOT NULL AND survey_semester = {4} \n" \
+        "     AND survey_level IS NOT NULL AND survey_level = '{5}'); \n" \
+        "".format(schema, staging, table, year, semester, level.upper())
+  return qry
+
+
+def qry_copy_csv_to_staging(year, semester, level, filename, schema=summaries_schema, table=summaries_table):
+  # The csv is copied into a temp table first, DISTINCT keeps the dedupe the UNION view used to do on every query
+  staging = summaries_partition_name(year, semester, level, table=table)
+  cols = ', '.join([col for col, col_type in summaries_csv_columns])
+  qry = " DROP TABLE IF EXISTS tmp_{1}; \n" \
+        " CREATE TEMP TABLE tmp_{1} ( \n" \
+        "    {2} \n" \
+        "   ); \n" \
+        " COPY tmp_{1}({3}) \n" \
+        " FROM '{4}' delimiter ',' csv header; \n" \
+        " INSERT INTO {0}.{1} ({3}) \n" \
+        "   SELECT DISTINCT {3} \n" \
+        "   FROM tmp_{1}; \n" \
+        " DROP TABLE tmp_{1}; \n" \
+        "".format(schema, staging,
+                  ', \n    '.join(['{0} {1}'.format(col, col_type) for col, col_type in summaries_csv_columns]),
+                  cols, filename)
+  return qry
+
+
+def qry_insert_old_table_to_staging(year, semester, level, schema=summaries_schema, table=summaries_table):
+  # Migrates an old per semester table, DISTINCT keeps the dedupe the UNION view used to do on every query
+  cols = ', '.join([col for col, col_type in summaries_csv_columns])
+  qry = " INSERT INTO {0}.{1} ({2}) \n" \
+        "   SELECT DISTINCT {2} \n" \
+        "   FROM {0}.tbl_{3}_{4}_sem{5}; \n" \
+        "".format(schema, summaries_partition_name(year, semester, level, table=table), cols,
+                  level.lower(), year, semester)
+  return qry
+
+
+def qry_attach_partition(year, semester, level, schema=summaries_schema, table=summaries_table):
+  # Replaces an existing leaf partition (reloading a semester) and attaches the staging table
+  leaf = summaries_partition_name(year, semester, level, table=table)
+  qry = " ALTER TABLE {0}.{1} ATTACH PARTITION {0}.{2} FOR VALUES IN ('{3}'); \n" \
+        " ALTER TABLE {0}.{2} DROP CONSTRAINT chk_{2}; \n" \
+        " ANALYZE {0}.{2}; \n" \
+        "".format(schema, summaries_partition_name(year, semester, table=table), leaf, level.upper())
+  return qry
+
+
+def qry_detach_partition(year, semester, level, schema=summaries_schema, table=summaries_table):
+  leaf = summaries_partition_name(year, semester, level, table=table)
+  qry = " DO $$ BEGIN \n" \
+        "   IF EXISTS (SELECT 1 FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid \n" \
+        "              JOIN pg_namespace n ON n.oid = c.relnamespace \n" \
+        "              WHERE n.nspname = '{0}' AND c.relname = '{2}') THEN \n" \
+        "     ALTER TABLE {0}.{1} DETACH PARTITION {0}.{2}; \n" \
+        "   END IF; \n" \
+        " END $$; \n" \
+        "".format(schema, summaries_partition_name(year, semester, table=table), leaf)
+  return qry
+
+
+def qry_load_summaries_partition(year, semester, level, filename=None, from_old_table=False,
+                                 schema=summaries_schema, table=summaries_table):
+  '''
+  Returns the queries to load one level/year/semester into the partitioned table.
+  Either copies the csv file (filename) or migrates the old per semester table (from_old_table).
+  '''
+  qry = qry_create_year_partition(year, schema=schema, table=table)
+  qry += qry_create_semester_partition(year, semester, schema=schema, table=table)
+  qry += qry_detach_partition(year, semester, level, schema=schema, table=table)
+  qry += qry_create_staging_table(year, semester, level, schema=schema, table=table)
+  if from_old_table:
+    qry += qry_insert_old_table_to_staging(year, semester, level, schema=schema, table=table)
+  else:
+    qry += qry_copy_csv_to_staging(year, semester, level, filename, schema=schema, table=table)
+  qry += qry_attach_partition(year, semester, level, schema=schema, table=table)
+  return qry
+
+
+def qry_create_summaries_combined_view(schema=summaries_schema, table=summaries_table):
+  # Same columns as the old UNION view so vw_teacher_performance_* keep working
+  qry = " CREATE OR REPLACE VIEW {0}.vw_summaries_combined AS \n" \
+        "   SELECT * \n" \
+        "   FROM {0}.{1}; \n" \
+        "".format(schema, table)
+  return qry
@@ -0,0 +1,158 @@
+## CES TEACHER DATA LOADER
+# Peter October 2019
+# Loads the teacher level CES views (ces.vw811_teacher_data, ces.vw8501_teacher_efm_clean, ...)
+# into dictionary encoded (categorical) data frames.
+# The long repeated strings (teaching_staff, school, type, course_code) are stored once as
+# categories and each row only holds an integer code, so all years of teacher data fit in
+# memory and groupbys run on the integer codes.
+# emplid and subject_area are derived from the categories (one string operation per distinct
+# value) rather than per row in SQL.
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  convert_list_string_for_sql,
+  db_extract_query_to_dataframe
+)
+
+# Columns that are stored as categories when present in the view
+teacher_category_cols = ['teaching_staff', 'school', 'school_code', 'type', 'course_code', 'course_code_ces',
+                         'course_name', 'level', 'campus', 'location', 'program_code', 'emplid', 'subject_area']
+
+# Small integer columns that are downcast when present in the view
+teacher_integer_cols = ['year', 'semester', 'teacher_count', 'gts_count', 'osi_count', 'population', 'reliable']
+
+
+def qry_teacher_data(tbl='vw811_teacher_data', schema='ces', min_teacher_count=None, types=None, school=None,
+                     order_by=('teaching_staff', 'year', 'semester', 'type')):
+  # Returns the raw rows of a teacher view, emplid and subject_area are derived after loading
+  qry = ' SELECT t1.* \n' \
+        ' FROM {0}.{1} t1 \n' \
+        ' WHERE 1 = 1 \n'.format(schema, tbl)
+  if min_teacher_count is not None:
+    qry += ' AND t1.teacher_count > {} \n'.format(min_teacher_count)
+  if types is not None:
+    qry += ' AND t1.type IN {} \n'.format(convert_list_string_for_sql(types))
+  if school is not None:
+    qry += " AND t1.school = '{}' \n".format(school)
+  if order_by:
+    qry += ' ORDER BY {}'.format(', '.join(['t1.{}'.format(col) for col in order_by]))
+  return qry
+
+
+def derive_categorical(series, func):
+  '''
+  Applies a string function to the categories of a categorical series and returns
+  a new categorical series that shares the integer codes.
+  Several categories may map to the same derived value (e.g. course codes to subject area).
+  :param series: categorical pandas series
+  :param func: function applied to a pandas Index of strings (e.g. lambda s: s.str[:4])
+  :return: categorical pandas series
+  '''
+  if not isinstance(series.dtype, pd.CategoricalDtype):
+    series = series.astype('category')
+  derived = pd.Index(func(series.cat.categories.astype(str)))
+  new_categories = pd.Index(derived.unique())
+  lookup = new_categories.get_indexer(derived)
+  codes = series.cat.codes.to_numpy()
+  new_codes = np.where(codes >= 0, lookup[codes], -1)
+  return pd.Series(pd.Categorical.from_codes(new_codes, categories=new_categories),
+                   index=series.index, name=series.name)
+
+
+def get_emplid(teaching_staff):
+  # teaching_staff is 'Name (1234567)', emplid is LEFT(RIGHT(teaching_staff,7),6)
+  return derive_categorical(teaching_staff, lambda s: s.str[-7:-1]).rename('emplid')
+
+
+def get_subject_area(course_code):
+  # subject area is the 4 letter prefix of the course code (e.g. BAFI)
+  return derive_categorical(course_code, lambda s: s.str[:4]).rename('subject_area')
+
+
+def encode_teacher_frame(df, category_cols=None, integer_cols=None, derive=True):
+  '''
+  Converts an object dtype teacher data frame into a dictionary encoded frame.
+  :param df: data frame returned from a teacher view
+  :param category_cols: columns to store as categories (default teacher_category_cols)
+  :param integer_cols: columns to downcast to the smallest integer type (default teacher_integer_cols)
+  :param derive: add emplid and subject_area columns derived from the categories
+  :return: encoded data frame
+  '''
+  if category_cols is None:
+    category_cols = teacher_category_cols
+  if integer_cols is None:
+    integer_cols = teacher_integer_cols
+
+  df1 = df.copy()
+  for col in category_cols:
+    if col in df1.columns and not isinstance(df1[col].dtype, pd.CategoricalDtype):
+      df1[col] = df1[col].astype('category')
+
+  for col in integer_cols:
+    if col in df1.columns and df1[col].notnull().all():
+      df1[col] = pd.to_numeric(df1[col], downcast='integer')
+
+  # Remaining numeric object columns (postgres numeric comes back as Decimal)
+  for col in df1.columns:
+    if df1[col].dtype == object:
+      converted = pd.to_numeric(df1[col], errors='coerce')
+      if converted.notnull().sum() == df1[col].notnull().sum():
+        df1[col] = pd.to_numeric(converted, downcast='float')
+
+  if derive:
+    if 'teaching_staff' in df1.columns and 'emplid' not in df1.columns:
+      df1['emplid'] = get_emplid(df1['teaching_staff'])
+    if 'course_code' in df1.columns and 'subject_area' not in df1.columns:
+      df1['subject_area'] = get_subject_area(df1['course_code'])
+  return df1
+
+
+def memory_footprint_report(df_raw, df_encoded):
+  '''
+  Compares the memory used by each column before and after encoding.
+  :param df_raw: data frame as returned from the database
+  :param df_encoded: data frame returned from encode_teacher_frame
+  :return: data frame with one row per column plus a total row (bytes and MB)
+  '''
+  raw = df_raw.memory_usage(index=False, deep=True)
+  enc = df_encoded.memory_usage(index=False, deep=True)
+  df_report = pd.DataFrame({'dtype_raw': df_raw.dtypes.astype(str),
+                            'dtype_encoded': df_encoded.dtypes.astype(str),
+                            'bytes_raw': raw,
+                            'bytes_encoded': enc})
+  df_report.loc['total'] = ['', '', raw.sum(), enc.sum()]
+  df_report['bytes_raw'] = df_report['bytes_raw'].fillna(0).astype('int64')
+  df_report['bytes_encoded'] = df_report['bytes_encoded'].fillna(0).astype('int64')
+  df_report['mb_raw'] = (df_report['bytes_raw'] / 2**20).round(2)
+  df_report['mb_encoded'] = (df_report['bytes_encoded'] / 2**20).round(2)
+  df_report['ratio'] = (df_report['bytes_raw'] / df_report['bytes_encoded'].replace(0, np.nan)).round(1)
+  return df_report
+
+
+def load_teacher_data(cur, tbl='vw811_teacher_data', schema='ces',
+                      min_teacher_count=None, types=None, school=None,
+                      order_by=('teaching_staff', 'year', 'semester', 'type'), report=False):
+  '''
+  Loads a teacher view into a dictionary encoded data frame.
+  :param cur: cursor with connection to the postgres database
+  :param report: print the memory footprint report
+  :return: encoded data frame (False if the query fails, as db_extract_query_to_dataframe)
+  '''
+  df_raw = db_extract_query_to_dataframe(qry_teacher_data(tbl=tbl, schema=schema,
+                                                          min_teacher_count=min_teacher_count,
+                                                          types=types, school=school,
+                                                          order_by=order_by),
+                                         cur, print_messages=False)
+  if df_raw is False:
+    return df_raw
+
+  df = encode_teacher_frame(df_raw)
+  if report:
+    print('Memory footprint {0}.{1}'.format(schema, tbl))
+    print(memory_footprint_report(df_raw, df).to_string())
+  return df
@@ -0,0 +1,102 @@
+## COMMENT CLEANING
+# Peter October 2019
+# Normalises student comments once when they are loaded (CES, SES, OUA and SIM comment loaders)
+# so the comments are stored clean and the packs do not need to fix them on every render.
+#   - encoding repair: utf-8 read as cp1252 (e.g. â€™) and apostrophes stored as ? (e.g. don?t)
+#   - html tags and entities removed, whitespace collapsed
+#   - null comments ('-', 'nil', 'NA', 'n/a', ...) found with one lower case set membership test
+
+import re
+import html
+
+import numpy as np
+import pandas as pd
+
+# Comments that mean no comment (compared after lower case and stripping spaces . - ! and quotes)
+null_comments = set(['', 'nil', 'na', 'n/a', 'n.a', 'none', 'null', 'no comment', 'no comments', 'nan'])
+
+# utf-8 text that was decoded as cp1252
+mojibake = [
+  ('â€™', "'"), ('â€˜', "'"),
+  ('â€œ', '"'), ('â€\u009d', '"'), ('â€\x9d', '"'),
+  ('â€“', '-'), ('â€”', '-'), ('â€¦', '...'),
+  ('Ã©', 'é'), ('Â ', ' '), ('Â', ''),
+]
+
+# Typographic characters replaced with plain text
+typographic = [('’', "'"), ('‘', "'"), ('“', '"'), ('”', '"'),
+               ('–', '-'), ('—', '-'), ('…', '...'), (' ', ' ')]
+
+# Postgres / excel exports often store apostrophes as ?, only replace ? inside words (don?t, course?s)
+question_apostrophe = re.compile(r"(?<=[A-Za-z])\?(?=(?:s|t|re|ve|ll|d|m)\b)")
+html_tag = re.compile(r'<[^>]+>')
+html_entity = re.compile(r'&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);')
+whitespace = re.compile(r'\s+')
+null_strip = ' .-!"\'_*'
+
+
+def normalise_for_null(series):
+  # lower case, stripped version of the comments used to test for null comments
+  return series.astype(str).str.strip().str.lower().str.strip(null_strip).str.strip()
+
+
+def is_null_comment(series):
+  '''
+  Returns a boolean series, True where the comment is missing or means no comment.
+  :param series: pandas series of comment text
+  '''
+  return series.isnull() | normalise_for_null(series.fillna('')).isin(null_comments)
+
+
+def clean_comment_text(series):
+  '''
+  Cleans a column of comments (vectorised string operations, no per row python).
+  Missing values stay missing.
+  :param series: pandas series of comment text
+  :return: cleaned series
+  '''
+  notnull = series.notnull()
+  text = series[notnull].astype(str)
+
+  for bad, good in mojibake + typographic:
+    text = text.str.replace(bad, good, regex=False)
+  text = text.str.replace(question_apostrophe, "'", regex=True)
+
+  text = text.str.replace(html_tag, ' ', regex=True)
+  has_entity = text.str.contains(html_entity, regex=True)
+  if has_entity.any():
+    text[has_entity] = text[has_entity].map(html.unescape)
+
+  text = text.str.replace(whitespace, ' ', regex=True).str.strip()
+
+  cleaned = series.copy().astype(object)
+  cleaned[notnull] = text
+  return cleaned
+
+
+def clean_comments(df, text_cols, drop_null=True, how='all', null_value=np.nan):
+  '''
+  Comment normalisation stage for the comment loaders.
+  Cleans the text columns, replaces null comments with null_value and drops rows with no comments.
+  :param df: data frame of comments
+  :param text_cols: comment columns e.g. ['best', 'improve'] or ['comment_text']
+  :param drop_null: drop the rows where the comments are null
+  :param how: 'all' drops a row when every text column is null, 'any' when any is null
+  :param null_value: value stored for a null comment (np.nan or '')
+  :return: cleaned data frame
+  '''
+  df1 = df.copy()
+  null_mask = pd.DataFrame(index=df1.index)
+  for col in text_cols:
+    df1[col] = clean_comment_text(df1[col])
+    null_mask[col] = is_null_comment(df1[col])
+
+  if drop_null:
+    drop = null_mask.all(axis=1) if how == 'all' else null_mask.any(axis=1)
+    df1 = df1.loc[~drop]
+    null_mask = null_mask.loc[~drop]
+
+  for col in text_cols:
+    df1[col] = df1[col].astype(object)
+    df1.loc[null_mask[col], col] = null_value
+  return df1
@@ -0,0 +1,267 @@
+## COMMENT SEARCH
+# Peter October 2019
+# One searchable index over the student comments loaded by
+#   pipeline/upload_ces_comments.py      ces.tbl_course_comments
+#   pipeline/upload_ses_comments.py      ses.tbl_comments
+#   pipeline/upload_ces_oua_comments.py  ces_oua.tbl_course_comments
+#   SIM/upload_sim_ces_data.py           sim_ces.tbl_course_teacher_comments
+# In postgres the comments are copied into comment_search.tbl_comments (one row per comment)
+# with a tsvector column and a GIN index, and searched with ranked keyword or phrase queries.
+# CommentIndex is a local inverted index over the same rows for use without the database
+# (e.g. on an exported csv/pickle while preparing packs).
+
+import re
+import math
+import pickle
+from collections import defaultdict
+
+import numpy as np
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  convert_list_string_for_sql,
+  db_extract_query_to_dataframe
+)
+
+search_schema = 'comment_search'
+search_table = 'tbl_comments'
+
+comment_columns = ['source', 'year', 'semester', 'period', 'level', 'school_code', 'program_code',
+                   'course_code', 'course_code_ces', 'section_code', 'comment_type', 'comment_text']
+
+# Source queries, each returns comment_columns
+comment_sources = {
+  'ces': """
+    SELECT 'CES'::text AS source, year::integer, semester::integer, NULL::text AS period, career::text AS level,
+      school_code::text, program_code::text, SPLIT_PART(classkey, '-', 3) AS course_code, NULL::text AS course_code_ces,
+      NULL::text AS section_code, c.comment_type, c.comment_text
+    FROM ces.tbl_course_comments t1
+    CROSS JOIN LATERAL (VALUES ('best', t1.best::text), ('improve', t1.improve::text)) c(comment_type, comment_text)
+  """,
+  'ses': """
+    SELECT 'SES'::text, year::integer, NULL::integer, NULL::text, level::text,
+      school_code::text, program_code::text, NULL::text, NULL::text, NULL::text,
+      c.comment_type, c.comment_text
+    FROM ses.tbl_comments t1
+    CROSS JOIN LATERAL (VALUES ('best', t1.best::text), ('improve', t1.improve::text)) c(comment_type, comment_text)
+  """,
+  'oua': """
+    SELECT 'OUA'::text, year::integer, NULL::integer, period::text, level::text,
+      NULL::text, NULL::text, course::text, NULL::text, NULL::text,
+      c.comment_type, c.comment_text
+    FROM ces_oua.tbl_course_comments t1
+    CROSS JOIN LATERAL (VALUES ('best', t1.best::text), ('improve', t1.improve::text)) c(comment_type, comment_text)
+  """,
+  'sim': """
+    SELECT 'SIM'::text, year::integer, semester::integer, NULL::text, NULL::text,
+      NULL::text, NULL::text, course_code::text, NULL::text, section_code::text,
+      comment_type::text, comment_text::text
+    FROM sim_ces.tbl_course_teacher_comments
+  """,
+}
+
+
+def qry_create_comment_search_table(schema=search_schema, table=search_table):
+  qry = " CREATE SCHEMA IF NOT EXISTS {0}; \n" \
+        " CREATE TABLE IF NOT EXISTS {0}.{1} ( \n" \
+        "   comment_id serial PRIMARY KEY, \n" \
+        "   source text, \n" \
+        "   year integer, \n" \
+        "   semester integer, \n" \
+        "   period text, \n" \
+        "   level text, \n" \
+        "   school_code text, \n" \
+        "   program_code text, \n" \
+        "   course_code text, \n" \
+        "   course_code_ces text, \n" \
+        "   section_code text, \n" \
+        "   comment_type text, \n" \
+        "   comment_text text, \n" \
+        "   tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', coalesce(comment_text, ''))) STORED \n" \
+        " ); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_tsv ON {0}.{1} USING GIN (tsv); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_year_semester ON {0}.{1} (year, semester); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_school_code ON {0}.{1} (school_code); \n" \
+        " CREATE INDEX IF NOT EXISTS ix_{1}_program_code ON {0}.{1} (program_code); \n" \
+        "".format(schema, table)
+  return qry
+
+
+def qry_rebuild_comment_search_table(sources=None, schema=search_schema, table=search_table):
+  # Reloads the comments of each source (blank and null comments are skipped)
+  if sources is None:
+    sources = list(comment_sources.keys())
+  qry = ''
+  for source in sources:
+    qry += " DELETE FROM {0}.{1} WHERE source = '{2}'; \n" \
+           " INSERT INTO {0}.{1} ({3}) \n" \
+           "   SELECT * FROM ({4}) s \n" \
+           "   WHERE NULLIF(btrim(s.comment_text), '') IS NOT NULL; \n" \
+           "".format(schema, table, source.upper(), ', '.join(comment_columns), comment_sources[source])
+  qry += " ANALYZE {0}.{1}; \n".format(schema, table)
+  return qry
+
+
+def qry_search_comments(terms, phrase=False, years=None, semesters=None, schools=None, programs=None,
+                        courses=None, sources=None, comment_type=None, limit=200,
+                        schema=search_schema, table=search_table):
+  '''
+  Ranked full text search over the comment index.
+  :param terms: search text, keywords (web search syntax: "quoted phrase", or, -exclude) or a phrase
+  :param phrase: treat terms as one phrase
+  :return: query string, results ordered by rank with a highlighted extract
+  '''
+  terms = terms.replace("'", "''")
+  tsquery = "phraseto_tsquery('english', '{}')".format(terms) if phrase \
+    else "websearch_to_tsquery('english', '{}')".format(terms)
+
+  qry = " SELECT \n" \
+        "   {0} \n" \
+        "   , ts_rank_cd(t1.tsv, q.query) AS rank \n" \
+        "   , ts_headline('english', t1.comment_text, q.query, 'MaxFragments=2, MinWords=5, MaxWords=20') AS extract \n" \
+        " FROM {1}.{2} t1, {3} AS q(query) \n" \
+        " WHERE t1.tsv @@ q.query \n" \
+        "".format(', '.join(['t1.{}'.format(col) for col in ['comment_id'] + comment_columns]),
+                  schema, table, tsquery)
+  filters = [('year', years), ('semester', semesters), ('school_code', schools), ('program_code', programs),
+             ('course_code', courses), ('source', sources)]
+  for col, values in filters:
+    if values is not None:
+      qry += "   AND t1.{0} IN {1} \n".format(col, convert_list_string_for_sql(values))
+  if comment_type is not None:
+    qry += "   AND t1.comment_type = '{}' \n".format(comment_type)
+  qry += " ORDER BY rank DESC, t1.year DESC \n" \
+         " LIMIT {};".format(limit)
+  return qry
+
+
+def search_comments(cur, terms, phrase=False, **kwargs):
+  # Returns a data frame of the matching comments ordered by rank
+  return db_extract_query_to_dataframe(qry_search_comments(terms, phrase=phrase, **kwargs), cur, print_messages=False)
+
+
+def get_comments(cur, schema=search_schema, table=search_table):
+  # Returns every comment in the index (to build a local CommentIndex)
+  qry = ' SELECT comment_id, {0} FROM {1}.{2};'.format(', '.join(comment_columns), schema, table)
+  return db_extract_query_to_dataframe(qry, cur, print_messages=False)
+
+
+'''------------------------------ Local inverted index -----------------------------------'''
+token_pattern = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+stop_words = set(['a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'if', 'in', 'into', 'is', 'it',
+                  'its', 'of', 'on', 'or', 'so', 'such', 'that', 'the', 'their', 'then', 'there', 'these',
+                  'they', 'this', 'to', 'was', 'were', 'will', 'with', 'i', 'we', 'you', 'me', 'my', 'our'])
+
+
+def stem(word):
+  # Light suffix stripping so 'lectures' and 'lecture', 'explained' and 'explain' match
+  for suffix in ('ingly', 'edly', 'ing', 'ers', 'er', 'ed', 'ly', 'es', 's'):
+    if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+      return word[:-len(suffix)]
+  return word
+
+
+def tokenise(text):
+  # Returns the (position, stemmed term) pairs of a comment, stop words keep their position
+  if not isinstance(text, str):
+    return []
+  return [(i, stem(w)) for i, w in enumerate(token_pattern.findall(text.lower())) if w not in stop_words]
+
+
+class CommentIndex(object):
+  '''
+  Local inverted index over comments (term -> {row: [positions]}) with BM25 ranking and phrase search.
+  Built from a data frame with the comment_columns (e.g. get_comments, or the comment loaders' frames).
+  '''
+  def __init__(self, df, text_col='comment_text', k1=1.2, b=0.75):
+    self.df = df.reset_index(drop=True)
+    self.text_col = text_col
+    self.k1 = k1
+    self.b = b
+    self.postings = defaultdict(dict)
+    lengths = np.zeros(len(self.df), dtype=np.int32)
+    for row, text in enumerate(self.df[text_col].values):
+      tokens = tokenise(text)
+      lengths[row] = len(tokens)
+      for pos, term in tokens:
+        self.postings[term].setdefault(row, []).append(pos)
+    self.postings = dict(self.postings)
+    self.lengths = lengths
+    self.avg_length = lengths.mean() if len(lengths) > 0 else 0
+
+  def _bm25(self, term, rows):
+    docs = self.postings.get(term, {})
+    n = len(self.df)
+    idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+    scores = {}
+    for row in rows:
+      tf = len(docs.get(row, []))
+      if tf == 0:
+        continue
+      norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[row] / max(self.avg_length, 1))
+      scores[row] = idf * tf * (self.k1 + 1) / norm
+    return scores
+
+  def _phrase_rows(self, terms):
+    # Rows where the terms appear next to each other (in order)
+    rows = set(self.postings.get(terms[0][1], {}))
+    for offset, term in terms[1:]:
+      rows &= set(self.postings.get(term, {}))
+    matched = set()
+    for row in rows:
+      starts = set(self.postings[terms[0][1]][row])
+      for offset, term in terms[1:]:
+        starts &= set([p - (offset - terms[0][0]) for p in self.postings[term][row]])
+        if not starts:
+          break
+      if starts:
+        matched.add(row)
+    return matched
+
+  def search(self, terms, phrase=False, any_term=False, limit=200, **filters):
+    '''
+    Ranked search of the comments.
+    :param terms: search text
+    :param phrase: only match the terms as a phrase
+    :param any_term: match comments with any of the terms (default all terms)
+    :param filters: column=list of values e.g. year=[2018, 2019], school_code=['625H']
+    :return: data frame of the matching rows with a rank column, ordered by rank
+    '''
+    query = tokenise(terms)
+    if not query:
+      return self.df.iloc[0:0].assign(rank=[])
+
+    if phrase:
+      rows = self._phrase_rows(query)
+    else:
+      row_sets = [set(self.postings.get(term, {})) for pos, term in query]
+      rows = set.union(*row_sets) if any_term else set.intersection(*row_sets)
+
+    if filters and rows:
+      mask = np.ones(len(self.df), dtype=bool)
+      for col, values in filters.items():
+        if values is not None:
+          mask &= self.df[col].isin(values).values
+      rows = set([row for row in rows if mask[row]])
+
+    scores = defaultdict(float)
+    for pos, term in query:
+      for row, score in self._bm25(term, rows).items():
+        scores[row] += score
+
+    ranked = sorted(scores.items(), key=lambda x: -x[1])[:limit]
+    df_result = self.df.iloc[[row for row, score in ranked]].copy()
+    df_result['rank'] = [score for row, score in ranked]
+    return df_result
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
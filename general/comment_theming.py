@@ -0,0 +1,197 @@
+## COMMENT THEMING
+# Peter October 2019
+# Automatic theming of CES comments, replacing the hand produced theme spreadsheets
+# (e.g. Comment_themes_2018S2_Wave3_VBE_S1_leftovers.xlsx) loaded by pipeline/upload_ces_comments_themes.py.
+# Comments are vectorised with TF-IDF into a sparse matrix and factorised with NMF into themes.
+# Each theme is labelled with its top terms, each comment gets a weight for every theme and the
+# weights are summed per course to give the themes shown in the packs
+# (course_enhancement.tbl_course_thematic: year, semester, course_code, course_code_ces, themes).
+# A fitted model is saved so later semesters can be themed with the same themes (batch) or the
+# themes updated with the new comments (incremental, MiniBatchNMF.partial_fit).
+# Everything runs locally on the CPU, the sparse transforms are split across cores with joblib.
+
+import time
+import pickle
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import NMF, MiniBatchNMF
+from scipy import sparse
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  db_extract_query_to_dataframe
+)
+
+# Words common to almost every CES comment that do not separate themes
+ces_stop_words = ['course', 'subject', 'class', 'classes', 'really', 'good', 'great', 'lot', 'bit', 'just',
+                  'like', 'make', 'think', 'would', 'could', 'also', 'much', 'well', 'get', 'nothing', 'n/a']
+
+
+def qry_semester_comments(year, semester, tbl='vw202_course_comments', schema='ces'):
+  qry = ' SELECT year, semester, course_code, course_code_ces, program_code, best, improve \n' \
+        ' FROM {0}.{1} \n' \
+        ' WHERE year = {2} AND semester = {3} \n' \
+        ''.format(schema, tbl, year, semester)
+  return qry
+
+
+def get_semester_comments(cur, year, semester, tbl='vw202_course_comments', schema='ces'):
+  '''
+  Returns one row per comment (best and improve comments are separate rows with comment_type).
+  '''
+  df = db_extract_query_to_dataframe(qry_semester_comments(year, semester, tbl=tbl, schema=schema), cur)
+  df = df.melt(id_vars=['year', 'semester', 'course_code', 'course_code_ces', 'program_code'],
+               value_vars=['best', 'improve'], var_name='comment_type', value_name='comment_text')
+  df = df.loc[df['comment_text'].fillna('').str.strip() != '']
+  return df.reset_index(drop=True)
+
+
+def _transform_chunk(vectoriser, texts):
+  return vectoriser.transform(texts)
+
+
+def parallel_tfidf(vectoriser, texts, n_jobs=-1, chunk_size=5000):
+  # Transforms texts into the sparse TF-IDF matrix, chunks are transformed on separate cores
+  texts = list(texts)
+  if len(texts) <= chunk_size:
+    return vectoriser.transform(texts)
+  chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+  mats = Parallel(n_jobs=n_jobs)(delayed(_transform_chunk)(vectoriser, chunk) for chunk in chunks)
+  return sparse.vstack(mats).tocsr()
+
+
+def theme_labels(nmf, terms, n_terms=4):
+  # Label each theme with its top terms e.g. 'feedback / assessment / marks / timely'
+  top = np.argsort(-nmf.components_, axis=1)[:, :n_terms]
+  return [' / '.join(terms[idx]) for idx in top]
+
+
+class ThemeModel(object):
+  '''
+  TF-IDF vectoriser + NMF theme model.
+  fit: learn the themes from a set of comments (batch)
+  partial_fit: update the themes with new comments (incremental, uses MiniBatchNMF)
+  transform: theme weights for comments (n_comments x n_themes)
+  '''
+  def __init__(self, n_themes=20, max_features=20000, min_df=3, max_df=0.5, ngram_range=(1, 2),
+               incremental=False, random_state=0, n_jobs=-1):
+    self.n_themes = n_themes
+    self.incremental = incremental
+    self.n_jobs = n_jobs
+    stop_words = list(TfidfVectorizer(stop_words='english').get_stop_words()) + ces_stop_words
+    self.vectoriser = TfidfVectorizer(stop_words=stop_words, max_features=max_features,
+                                      min_df=min_df, max_df=max_df, ngram_range=ngram_range,
+                                      sublinear_tf=True, dtype=np.float32)
+    if incremental:
+      self.nmf = MiniBatchNMF(n_components=n_themes, init='nndsvda', batch_size=2048,
+                              random_state=random_state)
+    else:
+      self.nmf = NMF(n_components=n_themes, init='nndsvda', max_iter=400, random_state=random_state)
+    self.labels = None
+
+  def fit(self, texts):
+    start = time.time()
+    self.vectoriser.fit(texts)
+    x = parallel_tfidf(self.vectoriser, texts, n_jobs=self.n_jobs)
+    self.nmf.fit(x)
+    self.labels = theme_labels(self.nmf, self.vectoriser.get_feature_names_out())
+    print('Theme model fitted on {0} comments ({1} terms) in {2:.1f}s'.format(x.shape[0], x.shape[1],
+                                                                            time.time() - start))
+    return self
+
+  def partial_fit(self, texts):
+    # Vocabulary stays as fitted, the themes are updated with the new comments
+    if not self.incremental:
+      raise ValueError('partial_fit needs a model created with incremental=True')
+    x = parallel_tfidf(self.vectoriser, texts, n_jobs=self.n_jobs)
+    self.nmf.partial_fit(x)
+    self.labels = theme_labels(self.nmf, self.vectoriser.get_feature_names_out())
+    return self
+
+  def transform(self, texts):
+    x = parallel_tfidf(self.vectoriser, texts, n_jobs=self.n_jobs)
+    return self.nmf.transform(x)
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
+
+
+def assign_comment_themes(df_comments, weights, labels, min_weight=0.01):
+  '''
+  Adds the main theme of each comment.
+  :param weights: theme weights from ThemeModel.transform
+  :return: data frame with theme, theme_weight columns (theme is None when no theme has min_weight)
+  '''
+  df = df_comments.copy()
+  best = weights.argmax(axis=1)
+  best_weight = weights[np.arange(len(best)), best]
+  df['theme'] = np.where(best_weight >= min_weight, np.asarray(labels, dtype=object)[best], None)
+  df['theme_weight'] = best_weight.round(4)
+  return df
+
+
+def course_themes(df_comments, weights, labels, top_n=3, by_type=True):
+  '''
+  Sums the theme weights of a course's comments and returns the top themes per course.
+  One grouped sum over the weight matrix, no per course loop.
+  :param by_type: list the best and improve themes separately
+  :return: data frame year, semester, course_code, course_code_ces, themes (tbl_course_thematic shape)
+  '''
+  keys = ['year', 'semester', 'course_code', 'course_code_ces']
+  df_w = pd.DataFrame(weights, columns=range(weights.shape[1]), index=df_comments.index)
+  group_cols = keys + (['comment_type'] if by_type else [])
+  df_sum = df_w.groupby([df_comments[col] for col in group_cols]).sum()
+
+  values = df_sum.to_numpy()
+  top = np.argsort(-values, axis=1)[:, :top_n]
+  top_weight = np.take_along_axis(values, top, axis=1)
+  labels = np.asarray(labels, dtype=object)
+  theme_txt = [', '.join(labels[idx][w > 0]) for idx, w in zip(top, top_weight)]
+
+  df_top = df_sum.index.to_frame(index=False)
+  df_top['themes'] = theme_txt
+  if by_type:
+    df_top['themes'] = df_top['comment_type'].str.capitalize() + ': ' + df_top['themes']
+    df_top = df_top.groupby(keys)['themes'].agg('; '.join).reset_index()
+  return df_top[keys + ['themes']]
+
+
+def theme_semester(cur, year, semester, model=None, n_themes=20, top_n=3, incremental=False):
+  '''
+  Themes every comment in ces.vw202_course_comments for a semester.
+  :param model: fitted ThemeModel to reuse (batch), None fits a new model on the semester's comments
+  :param incremental: update the model's themes with this semester's comments before assigning
+  :return: (model, comment level data frame, course level data frame in tbl_course_thematic shape)
+  '''
+  start = time.time()
+  df_comments = get_semester_comments(cur, year, semester)
+  texts = df_comments['comment_text'].astype(str).tolist()
+  print('{0} comments for {1} semester {2}'.format(len(texts), year, semester))
+
+  if model is None:
+    model = ThemeModel(n_themes=n_themes, incremental=incremental).fit(texts)
+  elif incremental:
+    model.partial_fit(texts)
+
+  weights = model.transform(texts)
+  df_comment_themes = assign_comment_themes(df_comments, weights, model.labels)
+  df_course_themes = course_themes(df_comments, weights, model.labels, top_n=top_n)
+  print('Themed {0} comments in {1} courses in {2:.1f}s'.format(len(texts), len(df_course_themes),
+                                                                time.time() - start))
+  return model, df_comment_themes, df_course_themes
+
+
+def qry_delete_semester_themes(year, semester, tbl='tbl_course_thematic', schema='course_enhancement'):
+  qry = ' DELETE FROM {0}.{1} WHERE year = {2} AND semester = {3};'.format(schema, tbl, year, semester)
+  return qry
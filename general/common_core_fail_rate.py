@@ -0,0 +1,130 @@
+## COMMON CORE FAIL RATE ENGINE
+# Peter October 2019
+# Fail rate data for the common core charts (Other Reports/Common_core_fail_rate.py).
+# projects.tbl_common_core_fr_cleaned is read once. The location history of every
+# degree type, course and location and the ONSHORE - SIM differences of every course are
+# computed from that one data frame (an indexed frame and one pivot) instead of one query per
+# location / course pair, and the engine can be saved to a cache file so the charts can be
+# redrawn without reading the table again.
+#
+# Usage:
+#   fr = FailRateEngine.from_db(postgres_cur, cache_file='C:\\Peter\\CoB\\common_core_fr.pkl')
+#   fr.history('Commercial Law', location='SIM', degree_types=['UG'])
+#   fr.diff_history('Commercial Law')
+
+import os
+import time
+import pickle
+
+import numpy as np
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  db_extract_query_to_dataframe
+)
+
+
+def qry_common_core_fail_rates(schema='projects', table='tbl_common_core_fr_cleaned'):
+  qry = ' SELECT degree_type, course_name, location, year, semester, fail_rate \n' \
+        ' FROM {0}.{1} \n' \
+        ' ORDER BY degree_type, course_name, location, year, semester \n' \
+        ''.format(schema, table)
+  return qry
+
+
+class FailRateEngine(object):
+  '''
+  Common core fail rates held in memory.
+  history: fail rate by year and semester for a course (and location / degree types)
+  locations: locations with results for a course and degree type
+  location_diffs: fail rate of each location and the difference of two locations for every course
+  diff_history: the location difference by year and semester for a course
+  '''
+  def __init__(self, df):
+    df = df.copy()
+    df['fail_rate'] = df['fail_rate'].astype(float)
+    self.df = df.sort_values(['degree_type', 'course_name', 'location', 'year', 'semester']).reset_index(drop=True)
+    # row positions of every (course_name, location) and course_name, so a history is a lookup not a filter
+    self._course_location_rows = self.df.groupby(['course_name', 'location']).indices
+    self._course_rows = self.df.groupby('course_name').indices
+    self._diffs = {}
+
+  @classmethod
+  def from_db(cls, cur, schema='projects', table='tbl_common_core_fr_cleaned', cache_file=None, refresh=False):
+    '''
+    Reads the fail rate table once.
+    :param cache_file: load the engine from this file when it exists, otherwise save it there
+    :param refresh: read the table even when there is a cache file
+    '''
+    if cache_file is not None and os.path.exists(cache_file) and not refresh:
+      return cls.load(cache_file)
+    start = time.time()
+    df = db_extract_query_to_dataframe(qry_common_core_fail_rates(schema, table), cur, print_messages=False)
+    engine = cls(df)
+    engine.location_diffs()  # the ONSHORE - SIM differences are precomputed and saved with the cache
+    print('{0}.{1}: {2} fail rates loaded in {3:.1f}s'.format(schema, table, len(df), time.time() - start))
+    if cache_file is not None:
+      engine.save(cache_file)
+    return engine
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
+
+  def history(self, course_name, location=None, degree_types=None, semester=None):
+    '''
+    Fail rate history of a course ordered by location, year, semester.
+    :param location: one location, None for all
+    :param degree_types: list of degree types e.g. ['UG'], None for all
+    :param semester: 1 or 2, None for all semesters
+    '''
+    if location is None:
+      rows = self._course_rows.get(course_name, [])
+    else:
+      rows = self._course_location_rows.get((course_name, location), [])
+    df = self.df.iloc[rows]
+    if degree_types is not None:
+      df = df.loc[df['degree_type'].isin(degree_types)]
+    if semester is not None:
+      df = df.loc[df['semester'] == semester]
+    return df.sort_values(['location', 'year', 'semester'])
+
+  def locations(self, course_name, degree_type, exclude=()):
+    # Locations with results for the course and degree type, in name order
+    df = self.df.iloc[self._course_rows.get(course_name, [])]
+    locs = df.loc[(df['degree_type'] == degree_type) & ~df['location'].isin(exclude), 'location']
+    return sorted(locs.unique().tolist())
+
+  def location_diffs(self, base='ONSHORE', other='SIM', degree_type='UG'):
+    '''
+    Fail rate of every location and base - other for every course, year and semester (semester 3 excluded).
+    Computed with one pivot the first time and cached.
+    :return: data frame year, semester, course_name, fr_<location> ..., fr_diff
+    '''
+    key = (base, other, degree_type)
+    if key not in self._diffs:
+      df = self.df.loc[(self.df['degree_type'] == degree_type) & (self.df['semester'] != 3)]
+      df_diff = df.pivot_table(index=['course_name', 'year', 'semester'], columns='location',
+                               values='fail_rate', aggfunc='sum')
+      df_diff.columns = ['fr_{}'.format(loc.lower()) for loc in df_diff.columns]
+      for loc in [base, other]:
+        if 'fr_{}'.format(loc.lower()) not in df_diff.columns:
+          df_diff['fr_{}'.format(loc.lower())] = np.nan
+      df_diff['fr_diff'] = df_diff['fr_{}'.format(base.lower())] - df_diff['fr_{}'.format(other.lower())]
+      self._diffs[key] = df_diff.reset_index()
+    return self._diffs[key]
+
+  def diff_history(self, course_name, semester=None, base='ONSHORE', other='SIM', degree_type='UG'):
+    # base - other fail rate history of a course ordered by year, semester
+    df = self.location_diffs(base, other, degree_type)
+    df = df.loc[df['course_name'] == course_name]
+    if semester is not None:
+      df = df.loc[df['semester'] == semester]
+    return df.sort_values(['year', 'semester'])
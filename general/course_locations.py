@@ -0,0 +1,137 @@
+## COURSE LOCATION INDEX
+# Peter Ryan Nov 2018
+# Course code of a course at every campus (e.g. the SIM or SBM code of a Melbourne course).
+# Replaces the PIVOT query (qry_sams_course_locations) that was run against SAMS each time.
+# PS_CLASS_TBL is read once into a local index (course_id -> campus -> latest course code),
+# saved to a cache file and refreshed from the last term loaded, and the lookups are dictionary
+# lookups in python.
+#
+# Usage:
+#   cl = CourseLocationIndex.from_sams(sams_engine, cache_file='C:\\Peter\\CoB\\course_locations.pkl')
+#   cl.equivalent('ACCT1046', 'SIM')
+#   cl.update(sams_engine)
+
+import os
+import time
+import pickle
+
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.sams_queries import (
+  qry_class_course_campuses
+)
+
+# SAMS campus codes and the column names of the old pivot (ms.course_locations cc_ columns)
+campus_columns = [('AUSCY', 'city'), ('AUSBR', 'brunswick'), ('AUSBU', 'bundoora'), ('AUSOL', 'aus_online'),
+                  ('SGPIM', 'singapore_im'), ('SGPKP', 'singapore_kp'), ('CHNSI', 'china_shanghai'),
+                  ('CHNBJ', 'china_beijing'), ('HKGAC', 'hongkong_ac'), ('HKGVT', 'hongkong_vt'),
+                  ('AUSVN', 'ausvn'), ('VNMRI', 'veitnam_ri'), ('VNMPA', 'veitnam_pa'),
+                  ('VNMRH', 'veitnam_rh'), ('IDNUP', 'uph'), ('ONLOU', 'www_ou'), ('ONLKP', 'www_kp')]
+
+# Campuses of the locations used in the reports (first campus with the course is used)
+location_campuses = {
+  'MELB': ['AUSCY', 'AUSBU', 'AUSBR'],
+  'SIM': ['SGPIM'],
+  'SBM': ['VNMRH', 'VNMRI', 'VNMPA'],
+  'VN': ['VNMRH', 'VNMRI', 'VNMPA'],
+  'UPH': ['IDNUP'],
+  'OUA': ['ONLOU'],
+  'CSI': ['CHNSI'],
+  'SUIBE': ['CHNSI'],
+}
+
+
+class CourseLocationIndex(object):
+  '''
+  Latest course code of every course id and campus.
+  campuses: campus -> course code of a course id
+  course_ids: course ids of a course code
+  equivalent: course code of a course code at another campus / location
+  wide: one row per course code and campus with a column per campus (the old pivot)
+  '''
+  def __init__(self, df):
+    df = df.copy()
+    df['course_id'] = df['course_id'].astype(str)
+    df['last_term'] = df['last_term'].astype(str)
+    # keep the latest term of each course id, course code and campus
+    df = df.sort_values('last_term').drop_duplicates(['course_id', 'course_code', 'campus'], keep='last')
+    self.df = df.reset_index(drop=True)
+    self.last_term = self.df['last_term'].max() if len(self.df) > 0 else None
+
+    self._campuses = {}
+    for course_id, campus, course_code in zip(self.df['course_id'], self.df['campus'], self.df['course_code']):
+      # rows are in term order, so the latest code of a course id and campus is kept
+      self._campuses.setdefault(course_id, {})[campus] = course_code
+    self._course_ids = {code: sorted(ids) for code, ids in self.df.groupby('course_code')['course_id'].unique().items()}
+    self._code_rows = {}
+    for course_code, course_id, campus in zip(self.df['course_code'], self.df['course_id'], self.df['campus']):
+      self._code_rows.setdefault(course_code, []).append((course_id, campus))
+
+  @classmethod
+  def from_sams(cls, sams_engine, st_term='1800', cache_file=None, refresh=False):
+    '''
+    Reads the index from the cache file, or from SAMS when there is no cache file (or refresh).
+    :param st_term: first term read from SAMS
+    '''
+    if cache_file is not None and os.path.exists(cache_file) and not refresh:
+      return cls.load(cache_file)
+    start = time.time()
+    index = cls(pd.read_sql(sql=qry_class_course_campuses(st_term=st_term), con=sams_engine))
+    print('{0} course locations loaded in {1:.1f}s'.format(len(index.df), time.time() - start))
+    if cache_file is not None:
+      index.save(cache_file)
+    return index
+
+  def update(self, sams_engine, cache_file=None):
+    # Refresh from the last term loaded (the last term is read again as it may have changed)
+    df_new = pd.read_sql(sql=qry_class_course_campuses(st_term=self.last_term), con=sams_engine)
+    self.__init__(pd.concat([self.df, df_new], ignore_index=True))
+    print('{0} course locations read from term {1}'.format(len(df_new), self.last_term))
+    if cache_file is not None:
+      self.save(cache_file)
+    return self
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
+
+  def campuses(self, course_id):
+    # dictionary campus: latest course code of a course id
+    return self._campuses.get(str(course_id), {})
+
+  def course_ids(self, course_code):
+    return self._course_ids.get(course_code, [])
+
+  def equivalent(self, course_code, location):
+    '''
+    Course code of a course at another campus or location (None when not offered there).
+    :param location: campus code (e.g. 'SGPIM') or location (e.g. 'SIM', 'SBM', 'UPH', 'OUA')
+    '''
+    campuses = location_campuses.get(location, [location])
+    for course_id in self.course_ids(course_code):
+      codes = self.campuses(course_id)
+      for campus in campuses:
+        if campus in codes:
+          return codes[campus]
+    return None
+
+  def wide(self, course_codes):
+    '''
+    The old qry_sams_course_locations pivot from the index.
+    :return: data frame course_id, course_code_ms, campus_ms and a course code column per campus
+    '''
+    rows = []
+    for course_code in course_codes:
+      for course_id, campus_ms in self._code_rows.get(course_code, []):
+        codes = self.campuses(course_id)
+        rows.append([course_id, course_code, campus_ms] + [codes.get(campus) for campus, col in campus_columns])
+    return pd.DataFrame(rows, columns=['course_id', 'course_code_ms', 'campus_ms'] +
+                                      [col for campus, col in campus_columns]).drop_duplicates()
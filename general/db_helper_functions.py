@@ -2,9 +2,18 @@
 # Peter November 2018
 # I am putting together Database function from different places
 
+import io
 import traceback
 import pandas as pd
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.term_metadata import (
+  school_abbreviation,
+  campus_list_string
+)
+
 
 def objectlist_to_text(obList):
   # converts a list of object into a string list for sql IN statement
@@ -69,34 +78,35 @@ def db_extract_query_to_dataframe(sql_query, cur, print_messages=False):
     return result
 
 def get_school_name(school_code):
-  if school_code == '610P':
-    return 'CBO'
-  if school_code == '615H':
-    return 'ACCT'
-  if school_code == '620H':
-    return 'BITL'
-  if school_code == '625H':
-    return 'EFM'
-  if school_code == '630H':
-    return 'MGT'
-  if school_code == '650T':
-    return 'VBE'
-  if school_code == '660H':
-    return 'GSBL'
-  if school_code == 'VN':
-    return 'Not CoB'
-  return None
+  # school abbreviation of a school code (general/term_metadata.py)
+  return school_abbreviation(school_code)
 
 def get_campus_list_string(location):
-  if location == 'MELB':
-    return None
-  
-  if location == 'SIM':
-    return "('SGPIM')"
-  
-  if location in ('CSI', 'SUIBE'):
-    return "('CHNSI')"
-  
-  if location in ('SBM', 'VN'):
-    return "('VNMRH', 'VNMRI')"
-  
\ No newline at end of file
+  # SAMS IN list of the campuses of a location (general/term_metadata.py)
+  return campus_list_string(location)
+
+
+def copy_dataframe(df, schema, table, engine, replace_col=None):
+  """
+  Bulk loads a data frame with COPY, creating the table from the data frame when it does not exist.
+  :param replace_col: rows with the values of this column in df are deleted first (same transaction)
+  """
+  df.head(0).to_sql(name=table, con=engine, schema=schema, if_exists='append', index=False)
+  buffer = io.StringIO()
+  df.to_csv(buffer, index=False, header=False)
+  buffer.seek(0)
+
+  con = engine.raw_connection()
+  try:
+    cur = con.cursor()
+    if replace_col is not None:
+      cur.execute('DELETE FROM {0}.{1} WHERE {2} = ANY(%s)'.format(schema, table, replace_col),
+                  (df[replace_col].dropna().unique().tolist(),))
+    cur.copy_expert('COPY {0}.{1} ({2}) FROM STDIN WITH CSV'.format(
+      schema, table, ', '.join(df.columns)), buffer)
+    con.commit()
+  except Exception:
+    con.rollback()
+    raise
+  finally:
+    con.close()
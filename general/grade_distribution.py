@@ -0,0 +1,102 @@
+## GRADE DISTRIBUTION CUBE
+# Peter Ryan Jan 2020
+# Grade distribution (NN, PA, CR, DI, HD) of every course, location and term, computed in SAMS in one
+# set based query (qry_grade_distribution over qry_std_class_grades) once a semester and stored in
+# postgres (courses.tbl_grade_distribution), with the pass rate, mean mark and distribution percentages.
+# The course assessment moderation workbooks, fail rate reports and dashboards read the stored rows
+# (qry_grade_distribution_history) instead of querying SAMS course by course.
+#
+# Usage:
+#   df = load_grade_cube(sams_engine, postgres_engine, st_term='1900', end_term='2000')
+#   df = pd.read_sql(sql=qry_grade_distribution_history(['91', '92', '93'], start_year=2016, end_term='1992'),
+#                    con=postgres_engine)
+
+import time
+
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.sams_queries import (
+  qry_grade_distribution
+)
+from general.db_helper_functions import (
+  copy_dataframe
+)
+from general.course_locations import (
+  location_campuses
+)
+
+grade_columns = ['nn', 'pa', 'cr', 'di', 'hd']
+
+
+def _campus_locations():
+  # campus -> location of the reports (first location listing the campus)
+  locations = {}
+  for location, campuses in location_campuses.items():
+    for campus in campuses:
+      locations.setdefault(campus, location)
+  return locations
+
+
+campus_locations = _campus_locations()
+
+
+def grade_cube(df):
+  '''
+  Rows of qry_grade_distribution (course, campus, term) rolled up to course, location and term.
+  :return: data frame course_code, location, term_code, term_name, term_year, school_code, enrolments,
+           nn .. hd, graded, nn_pct .. hd_pct, pass_rate, mean_mark
+  '''
+  df = df.assign(location=df['campus'].map(campus_locations).fillna(df['campus']))
+  agg = {'term_name': 'first', 'term_year': 'first', 'school_code': 'first', 'enrolments': 'sum',
+         'mark_sum': 'sum', 'marked': 'sum'}
+  agg.update({g: 'sum' for g in grade_columns})
+  df = df.groupby(['course_code', 'location', 'term_code'], as_index=False).agg(agg)
+
+  graded = df[grade_columns].sum(axis=1)
+  df['graded'] = graded
+  for g in grade_columns:
+    df['{}_pct'.format(g)] = (100 * df[g] / graded).round(1)
+  df['pass_rate'] = (100 * (graded - df['nn']) / graded).round(1)
+  df['mean_mark'] = (df['mark_sum'] / df['marked']).round(1)
+  return df.drop(columns=['mark_sum', 'marked'])
+
+
+def load_grade_cube(sams_engine, postgres_engine, st_term='1900', end_term='2000', acad_group='BUS',
+                    schema='courses', table='tbl_grade_distribution'):
+  '''
+  Computes the cube of the terms after st_term and before end_term and replaces those terms in postgres.
+  '''
+  start = time.time()
+  df = grade_cube(pd.read_sql(sql=qry_grade_distribution(st_term, end_term, acad_group), con=sams_engine))
+  print('{0} course, location and term rows read in {1:.1f}s'.format(len(df), time.time() - start))
+  copy_dataframe(df, schema, table, postgres_engine, replace_col='term_code')
+  print('{0}.{1}: terms {2} loaded'.format(schema, table, ', '.join(sorted(df['term_code'].unique()))))
+  return df
+
+
+def qry_grade_distribution_history(term_codes_ends, start_year=2015, end_term='1950', location=None,
+                                   course_codes=None, schema='courses', table='tbl_grade_distribution'):
+  '''
+  Grade counts of each course and term (as get_course_grade_distribution of the moderation scripts)
+  :param term_codes_ends: term code suffixes (e.g. get_term_code_ends(location, semester, level))
+  :param end_term: terms before this term are returned
+  :param location: one location, None for every location
+  '''
+  where = ''
+  if location is not None:
+    where += " AND location = '{}' \n".format(location)
+  if course_codes is not None:
+    where += " AND course_code IN ('{}') \n".format("', '".join(course_codes))
+  qry = ' SELECT course_code, term_code, term_name, \n' \
+        '   SUM(nn) AS nn, SUM(pa) AS pa, SUM(cr) AS cr, SUM(di) AS di, SUM(hd) AS hd \n' \
+        ' FROM {0}.{1} \n' \
+        " WHERE term_code >= '{2}00' AND term_code < '{3}' \n" \
+        "   AND substr(term_code, 3, 2) IN ('{4}') \n" \
+        '{5}' \
+        ' GROUP BY course_code, term_code, term_name \n' \
+        ' ORDER BY course_code, term_code DESC \n' \
+        ''.format(schema, table, int(start_year) - 2000, end_term, "', '".join(term_codes_ends), where)
+  return qry
@@ -0,0 +1,265 @@
+## INDEX ADVISOR
+# Peter October 2019
+# Captures the queries the course pack, program pack and SIM scripts send to postgres,
+# runs EXPLAIN on them and proposes the B-tree and expression indexes that would remove the
+# sequential scans on the CES lookup columns (course_code_ces, year/semester, program_code,
+# teaching_staff and the SPLIT_PART(course_code,'-',1) join to lookups.vw_course_details_recent).
+# The proposed indexes can be created and the captured queries re-timed, the before/after timings
+# are returned as a data frame to save as a report.
+#
+# Capturing queries in a script:
+#   postgres_cur = QueryCaptureCursor(postgres_cur, script='CES_Datapacks_2020s1_all')
+#   ... run the script ...
+#   save_captured_queries(postgres_cur, 'H:\\Projects\\CoB\\Database\\captured_queries.json')
+# For a Dash app save in a finally around app.run_server, the callbacks query after the server starts.
+
+import re
+import json
+import time
+import traceback
+import pandas as pd
+
+# Columns the CES scripts filter and join on, these are the only columns indexes are proposed for
+advisor_columns = ['course_code_ces', 'year', 'semester', 'program_code', 'teaching_staff',
+                   'course_code', 'school_code', 'term_code']
+
+# Columns that are always filtered together and are indexed as one composite index
+advisor_composites = [['year', 'semester']]
+
+split_part_pattern = re.compile(r"split_part\(\(?(?:(\w+)\.)?(\w+)\)?(?:::\w+(?: \w+)?)?, '-'(?:::text)?, 1\)",
+                                re.IGNORECASE)
+word_pattern = re.compile(r'\b([a-z_][a-z0-9_]*)\b')
+
+
+class QueryCaptureCursor(object):
+  '''
+  Wraps a database cursor and records every SELECT sent through execute.
+  Everything else is passed through to the wrapped cursor, so it can be used anywhere a cursor is used
+  (e.g. db_extract_query_to_dataframe).
+  '''
+  def __init__(self, cur, script=None):
+    self._cur = cur
+    self.script = script
+    self.captured = []
+
+  def execute(self, query, *args, **kwargs):
+    txt = query if isinstance(query, str) else str(query)
+    if txt.lstrip().upper().startswith(('SELECT', 'WITH')):
+      self.captured.append({'script': self.script, 'query': txt})
+    return self._cur.execute(query, *args, **kwargs)
+
+  def __getattr__(self, name):
+    return getattr(self._cur, name)
+
+  def __iter__(self):
+    return iter(self._cur)
+
+
+def save_captured_queries(capture_cur, filename, append=True):
+  # Saves the captured queries to a json file (distinct queries only)
+  queries = []
+  if append:
+    try:
+      with open(filename, 'r') as f:
+        queries = json.load(f)
+    except (IOError, ValueError):
+      queries = []
+  seen = set([q['query'] for q in queries])
+  for q in capture_cur.captured:
+    if q['query'] not in seen:
+      queries.append(q)
+      seen.add(q['query'])
+  with open(filename, 'w') as f:
+    json.dump(queries, f, indent=1)
+  return len(queries)
+
+
+def load_captured_queries(filename):
+  with open(filename, 'r') as f:
+    return json.load(f)
+
+
+def qry_relation_columns(schema, table):
+  qry = " SELECT a.attname \n" \
+        " FROM pg_attribute a \n" \
+        " WHERE a.attrelid = '{0}.{1}'::regclass AND a.attnum > 0 AND NOT a.attisdropped;".format(schema, table)
+  return qry
+
+
+def qry_create_index(schema, table, columns=None, expression=None):
+  # B-tree index on columns, or on an expression e.g. SPLIT_PART(course_code, '-', 1)
+  if expression is not None:
+    name = 'ix_{0}_{1}'.format(table, re.sub(r'\W+', '_', expression.lower()).strip('_'))
+    target = '({})'.format(expression)
+  else:
+    name = 'ix_{0}_{1}'.format(table, '_'.join(columns))
+    target = ', '.join(columns)
+  qry = 'CREATE INDEX IF NOT EXISTS {0} ON {1}.{2} ({3});'.format(name[:63], schema, table, target)
+  return qry
+
+
+def explain_query(cur, query, analyze=False):
+  '''
+  Runs EXPLAIN (FORMAT JSON) on a query.
+  :param analyze: also run the query (EXPLAIN ANALYZE) to get the actual time
+  :return: (plan dict, execution time in ms or None) or (None, None) if the query fails
+  '''
+  options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+  try:
+    cur.execute('EXPLAIN ({0}) {1}'.format(options, query))
+    result = cur.fetchone()[0]
+    if isinstance(result, str):
+      result = json.loads(result)
+    plan = result[0]
+    return plan['Plan'], plan.get('Execution Time')
+  except Exception:
+    traceback.print_exc()
+    cur.connection.rollback()
+    return None, None
+
+
+def walk_plan(node):
+  # Yields every node in an EXPLAIN plan
+  yield node
+  for child in node.get('Plans', []):
+    for sub in walk_plan(child):
+      yield sub
+
+
+def _conditions(node):
+  return [node[key] for key in ('Filter', 'Index Cond', 'Hash Cond', 'Merge Cond', 'Join Filter', 'Recheck Cond')
+          if key in node]
+
+
+def find_index_candidates(cur, plan, columns_cache=None):
+  '''
+  Finds the sequential scans in a plan whose filters or joins use the advisor columns.
+  :return: list of dicts {schema, table, columns or expression}
+  '''
+  if columns_cache is None:
+    columns_cache = {}
+
+  nodes = list(walk_plan(plan))
+  aliases = {}
+  for node in nodes:
+    if 'Relation Name' in node:
+      aliases[node.get('Alias', node['Relation Name'])] = (node.get('Schema', 'public'), node['Relation Name'])
+
+  all_conditions = [cond for node in nodes for cond in _conditions(node)]
+  candidates = []
+  for node in nodes:
+    if node.get('Node Type') != 'Seq Scan':
+      continue
+    schema, table = node.get('Schema', 'public'), node['Relation Name']
+    alias = node.get('Alias', table)
+    if (schema, table) not in columns_cache:
+      cur.execute(qry_relation_columns(schema, table))
+      columns_cache[(schema, table)] = set([row[0] for row in cur.fetchall()])
+    table_cols = columns_cache[(schema, table)]
+
+    # Filter on the scan itself (unqualified columns)
+    used = set()
+    for cond in _conditions(node):
+      used.update([w for w in word_pattern.findall(cond) if w in table_cols])
+    # Join conditions elsewhere in the plan (qualified with this alias)
+    for cond in all_conditions:
+      used.update([col for a, col in re.findall(r'\b(\w+)\.(\w+)\b', cond) if a == alias and col in table_cols])
+      for a, col in split_part_pattern.findall(cond):
+        if (a == alias or (a == '' and cond in _conditions(node))) and col in table_cols:
+          candidates.append({'schema': schema, 'table': table, 'columns': None,
+                             'expression': "SPLIT_PART({}, '-', 1)".format(col)})
+
+    used = used & set(advisor_columns)
+    for composite in advisor_composites:
+      if set(composite) <= used:
+        candidates.append({'schema': schema, 'table': table, 'columns': composite, 'expression': None})
+        used -= set(composite)
+    for col in sorted(used):
+      candidates.append({'schema': schema, 'table': table, 'columns': [col], 'expression': None})
+  return candidates
+
+
+def advise_indexes(cur, queries):
+  '''
+  Explains every captured query and collects the proposed indexes.
+  :param queries: list of {'script', 'query'} from load_captured_queries
+  :return: data frame of proposed indexes (with the number of queries that would use each) and the plans
+  '''
+  columns_cache = {}
+  rows = []
+  for i, q in enumerate(queries):
+    plan, ms = explain_query(cur, q['query'])
+    if plan is None:
+      continue
+    for c in find_index_candidates(cur, plan, columns_cache):
+      c['create_qry'] = qry_create_index(c['schema'], c['table'], columns=c['columns'], expression=c['expression'])
+      c['query_id'] = i
+      c['script'] = q.get('script')
+      rows.append(c)
+
+  if not rows:
+    return pd.DataFrame(columns=['schema', 'table', 'index', 'create_qry', 'queries', 'scripts'])
+
+  df = pd.DataFrame(rows)
+  df['index'] = df.apply(lambda r: r['expression'] if r['expression'] is not None else ', '.join(r['columns']), axis=1)
+  df_proposed = (df.groupby(['schema', 'table', 'index', 'create_qry'])
+                 .agg(queries=('query_id', 'nunique'),
+                      scripts=('script', lambda s: ', '.join(sorted(set([x for x in s if x])))))
+                 .reset_index()
+                 .sort_values(['queries', 'schema', 'table'], ascending=[False, True, True]))
+  return df_proposed
+
+
+def time_queries(cur, queries, repeat=1):
+  # Returns the best EXPLAIN ANALYZE execution time (ms) and the number of sequential scans for each query
+  rows = []
+  for i, q in enumerate(queries):
+    best = None
+    seq_scans = None
+    for r in range(repeat):
+      plan, ms = explain_query(cur, q['query'], analyze=True)
+      if plan is None:
+        break
+      seq_scans = len([n for n in walk_plan(plan) if n.get('Node Type') == 'Seq Scan'])
+      best = ms if best is None else min(best, ms)
+    rows.append({'query_id': i, 'script': q.get('script'), 'ms': best, 'seq_scans': seq_scans,
+                 'query': ' '.join(q['query'].split())[:200]})
+  return pd.DataFrame(rows)
+
+
+def create_indexes(con, df_proposed):
+  # Creates the proposed indexes and analyses the tables
+  cur = con.cursor()
+  for qry in df_proposed['create_qry']:
+    start = time.time()
+    print(qry)
+    cur.execute(qry)
+    print('  created in {:.1f}s'.format(time.time() - start))
+  for schema, table in df_proposed[['schema', 'table']].drop_duplicates().itertuples(index=False):
+    cur.execute('ANALYZE {0}.{1};'.format(schema, table))
+  con.commit()
+
+
+def index_report(con, queries, create=False, repeat=3):
+  '''
+  Times the captured queries, proposes indexes, optionally creates them and re-times the queries.
+  :param con: DBAPI (psycopg2) connection to the postgres database
+  :param queries: list of {'script', 'query'}
+  :param create: create the proposed indexes
+  :return: (data frame of proposed indexes, data frame of before/after timings)
+  '''
+  cur = con.cursor()
+  df_before = time_queries(cur, queries, repeat=repeat)
+  df_proposed = advise_indexes(cur, queries)
+  con.rollback()
+
+  df_timing = df_before.rename(columns={'ms': 'ms_before', 'seq_scans': 'seq_scans_before'})
+  if create and len(df_proposed) > 0:
+    create_indexes(con, df_proposed)
+    df_after = time_queries(cur, queries, repeat=repeat)
+    df_timing = df_timing.merge(df_after[['query_id', 'ms', 'seq_scans']]
+                                .rename(columns={'ms': 'ms_after', 'seq_scans': 'seq_scans_after'}),
+                                on='query_id', how='left')
+    df_timing['speed_up'] = (df_timing['ms_before'] / df_timing['ms_after']).round(1)
+    con.rollback()
+  return df_proposed, df_timing
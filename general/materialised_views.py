@@ -0,0 +1,389 @@
+## MATERIALISED VIEW REFRESH ORCHESTRATOR
+# Peter October 2019
+# The course packs and reports read from numbered views (ces.vw1_course_summaries_fixed,
+# ces.vw115_course_program, ces.vw202_course_comments, ...) that are recomputed on every query.
+# The hot views are converted in place into materialised views (the plain view is kept as
+# {view}_live) and indexed. Plain views built on a hot view are recreated so they read the
+# materialised view (a view is bound to the view it reads, not its name).
+# After an upload script finishes, refresh_materialised_views refreshes every materialised view
+# in the schemas (or reading tables in table_schemas, e.g. ces_summaries) in dependency order.
+# Views with no dependency between them are refreshed at the same time on separate connections
+# and the refresh time for each view is logged.
+
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  convert_list_string_for_sql
+)
+
+view_schemas = ['ces', 'course_enhancement', 'sim_ces']
+
+# Hot views to materialise: (schema, view, index column lists, unique index columns or None)
+# A unique index allows REFRESH MATERIALIZED VIEW CONCURRENTLY (readers are not blocked).
+# The unique index is only created when the rows are unique on those columns, otherwise the view
+# is refreshed without CONCURRENTLY. Comment and teacher views have no unique key.
+hot_views = [
+  ('ces', 'vw1_course_summaries_fixed', [['year', 'semester']], ['course_code_ces', 'year', 'semester']),
+  ('ces', 'vw115_course_program', [['course_code_ces', 'year', 'semester'], ['program_code']],
+   ['course_code_ces', 'year', 'semester', 'program_code']),
+  ('ces', 'vw202_course_comments', [['course_code_ces', 'year', 'semester']], None),
+  ('ces', 'vw301_course_thematic', [['course_code_ces', 'year', 'semester']], None),
+  ('ces', 'vw0002_course_summaries', [['year', 'semester']], ['course_code_ces', 'year', 'semester']),
+  ('ces', 'vw811_teacher_data', [['teaching_staff'], ['year', 'semester']], None),
+  ('course_enhancement', 'vw404_change_2019s1_reliable', [['course_code']], ['course_code_ces']),
+  ('sim_ces', 'vw100_course', [['year', 'semester']], ['course_code', 'year', 'semester']),
+  ('sim_ces', 'vw001_course_teacher_comments', [['course_code', 'year', 'semester']], None),
+]
+
+log_schema = 'lookups'
+log_table = 'tbl_matview_refresh_log'
+
+
+def qry_view_definition(schema, view):
+  qry = "SELECT pg_get_viewdef('{0}.{1}'::regclass, true) AS definition;".format(schema, view)
+  return qry
+
+
+def qry_relation_kind(schema, view):
+  # v = view, m = materialised view
+  qry = " SELECT c.relkind \n" \
+        " FROM pg_class c \n" \
+        " JOIN pg_namespace n ON n.oid = c.relnamespace \n" \
+        " WHERE n.nspname = '{0}' AND c.relname = '{1}';".format(schema, view)
+  return qry
+
+
+def qry_relation_columns(schema, view):
+  # pg_attribute is used as information_schema.columns does not list materialised views
+  qry = " SELECT a.attname \n" \
+        " FROM pg_attribute a \n" \
+        " WHERE a.attrelid = '{0}.{1}'::regclass AND a.attnum > 0 AND NOT a.attisdropped;".format(schema, view)
+  return qry
+
+
+def qry_view_dependencies(schemas=view_schemas):
+  # Returns every view / materialised view in schemas (None for every schema) with the views,
+  # materialised views and tables it reads from
+  schema_filter = '' if schemas is None else \
+    "   AND dep_ns.nspname IN {0} \n".format(convert_list_string_for_sql(schemas))
+  qry = " SELECT DISTINCT \n" \
+        "   dep_ns.nspname AS schema, dep.relname AS view, dep.relkind AS kind, \n" \
+        "   src_ns.nspname AS src_schema, src.relname AS src_view, src.relkind AS src_kind \n" \
+        " FROM pg_depend d \n" \
+        " JOIN pg_rewrite r ON r.oid = d.objid \n" \
+        " JOIN pg_class dep ON dep.oid = r.ev_class \n" \
+        " JOIN pg_namespace dep_ns ON dep_ns.oid = dep.relnamespace \n" \
+        " JOIN pg_class src ON src.oid = d.refobjid \n" \
+        " JOIN pg_namespace src_ns ON src_ns.oid = src.relnamespace \n" \
+        " WHERE d.classid = 'pg_rewrite'::regclass \n" \
+        "   AND d.refclassid = 'pg_class'::regclass \n" \
+        "   AND dep.oid <> src.oid \n" \
+        "   AND dep.relkind IN ('v', 'm') AND src.relkind IN ('v', 'm', 'r', 'p') \n" \
+        "   AND dep_ns.nspname NOT IN ('pg_catalog', 'information_schema') \n" \
+        "{0};".format(schema_filter)
+  return qry
+
+
+def qry_materialised_views(schemas=view_schemas):
+  qry = " SELECT schemaname AS schema, matviewname AS view \n" \
+        " FROM pg_matviews \n" \
+        " WHERE schemaname IN {0};".format(convert_list_string_for_sql(schemas))
+  return qry
+
+
+def qry_has_unique_index(schema, view):
+  qry = " SELECT count(*) \n" \
+        " FROM pg_index i \n" \
+        " WHERE i.indrelid = '{0}.{1}'::regclass AND i.indisunique AND i.indpred IS NULL;".format(schema, view)
+  return qry
+
+
+def qry_create_refresh_log(schema=log_schema, table=log_table):
+  qry = " CREATE TABLE IF NOT EXISTS {0}.{1} ( \n" \
+        "   refreshed_at timestamp DEFAULT now(), \n" \
+        "   schema_name character varying(63), \n" \
+        "   view_name character varying(63), \n" \
+        "   seconds numeric(10, 2), \n" \
+        "   concurrently boolean, \n" \
+        "   success boolean \n" \
+        " );".format(schema, table)
+  return qry
+
+
+def index_name(view, cols, unique=False):
+  return '{0}_{1}_{2}'.format('uix' if unique else 'ix', view, '_'.join(cols))[:63]
+
+
+def _fetch(cur, qry):
+  cur.execute(qry)
+  return cur.fetchall()
+
+
+def _direct_dependencies(cur):
+  # {(schema, view): set of (schema, relation)} for every view / materialised view in the database,
+  # plain views outside view_schemas are followed as well (e.g. the ces_summaries views)
+  direct = {}
+  for schema, view, kind, src_schema, src_view, src_kind in _fetch(cur, qry_view_dependencies(None)):
+    direct.setdefault((schema, view), set()).add((src_schema, src_view))
+  return direct
+
+
+def _reads(mv, direct, matviews):
+  # materialised views and tables mv reads, directly or through plain views
+  found = set()
+  stack = list(direct.get(mv, []))
+  seen = set()
+  while stack:
+    node = stack.pop()
+    if node in seen:
+      continue
+    seen.add(node)
+    if node in matviews or node not in direct:
+      found.add(node)
+    else:
+      stack.extend(direct.get(node, []))
+  return found
+
+
+def get_dependency_graph(cur, schemas=view_schemas):
+  '''
+  Returns the dependencies between the materialised views in schemas.
+  Materialised view A depends on materialised view B if A reads B directly or through plain views.
+  :param cur: cursor with connection to the postgres database
+  :return: dict {(schema, view): set of (schema, view)} for every materialised view
+  '''
+  matviews = set(_fetch(cur, qry_materialised_views(schemas)))
+  direct = _direct_dependencies(cur)
+  return {mv: _reads(mv, direct, matviews) & matviews for mv in matviews}
+
+
+def get_table_dependants(cur, table_schemas, schemas=view_schemas):
+  '''
+  Returns the materialised views in schemas that read a table in table_schemas (directly or through views).
+  :return: set of (schema, view)
+  '''
+  matviews = set(_fetch(cur, qry_materialised_views(schemas)))
+  direct = _direct_dependencies(cur)
+  return set([mv for mv in matviews
+              if any(node[0] in table_schemas for node in _reads(mv, direct, matviews) - matviews)])
+
+
+def _plain_view_dependants(cur, schema, view):
+  # plain views reading schema.view directly (they are bound to it and must be recreated)
+  qry = " SELECT DISTINCT dep_ns.nspname, dep.relname \n" \
+        " FROM pg_depend d \n" \
+        " JOIN pg_rewrite r ON r.oid = d.objid \n" \
+        " JOIN pg_class dep ON dep.oid = r.ev_class \n" \
+        " JOIN pg_namespace dep_ns ON dep_ns.oid = dep.relnamespace \n" \
+        " WHERE d.classid = 'pg_rewrite'::regclass \n" \
+        "   AND d.refclassid = 'pg_class'::regclass \n" \
+        "   AND d.refobjid = '{0}.{1}'::regclass \n" \
+        "   AND dep.oid <> d.refobjid \n" \
+        "   AND dep.relkind = 'v';".format(schema, view)
+  return _fetch(cur, qry)
+
+
+def get_refresh_levels(graph):
+  '''
+  Orders the materialised views into levels, each view only depends on views in earlier levels.
+  Views in the same level can be refreshed at the same time.
+  :param graph: dict from get_dependency_graph
+  :return: list of lists of (schema, view)
+  '''
+  remaining = {mv: set(deps) & set(graph) for mv, deps in graph.items()}
+  levels = []
+  while remaining:
+    level = sorted([mv for mv, deps in remaining.items() if not deps])
+    if not level:
+      raise ValueError('Circular dependency between materialised views: {}'.format(sorted(remaining)))
+    levels.append(level)
+    for mv in level:
+      del remaining[mv]
+    for deps in remaining.values():
+      deps.difference_update(level)
+  return levels
+
+
+def convert_to_materialised_views(con, views=hot_views):
+  '''
+  Converts the plain views in views into indexed materialised views with the same name.
+  The plain view is renamed {view}_live. All definitions (of the hot views and of the plain views
+  built on them) are read before any view is renamed, so a hot view built on another hot view and
+  the recreated dependant views read the materialised version.
+  :param con: DBAPI (psycopg2) connection to the postgres database
+  :param views: list of (schema, view, index column lists, unique columns)
+  '''
+  cur = con.cursor()
+  definitions = {}
+  for schema, view, index_cols, unique_cols in views:
+    kind = _fetch(cur, qry_relation_kind(schema, view))
+    if not kind or kind[0][0] != 'v':
+      print('{0}.{1} is not a plain view, skipped'.format(schema, view))
+      continue
+    definitions[(schema, view)] = _fetch(cur, qry_view_definition(schema, view))[0][0]
+
+  converted = [v for v in views if (v[0], v[1]) in definitions]
+
+  # plain views reading a hot view (other than the hot views themselves), recreated at the end
+  dependants = {}
+  for schema, view, index_cols, unique_cols in converted:
+    for dep in _plain_view_dependants(cur, schema, view):
+      if dep not in definitions and dep not in dependants:
+        dependants[dep] = _fetch(cur, qry_view_definition(dep[0], dep[1]))[0][0]
+
+  # Rename every plain view first, then create the materialised views with the original definitions
+  for schema, view, index_cols, unique_cols in converted:
+    cur.execute('ALTER VIEW {0}.{1} RENAME TO {1}_live;'.format(schema, view))
+
+  pending = list(converted)
+  while pending:
+    failed = []
+    for item in pending:
+      schema, view, index_cols, unique_cols = item
+      start = time.time()
+      cur.execute('SAVEPOINT create_mv;')
+      try:
+        cur.execute('CREATE MATERIALIZED VIEW {0}.{1} AS \n{2}'.format(schema, view,
+                                                                      definitions[(schema, view)].rstrip(' ;\n')))
+      except Exception:
+        # depends on a hot view that has not been created yet
+        cur.execute('ROLLBACK TO SAVEPOINT create_mv;')
+        failed.append(item)
+        continue
+      cur.execute('RELEASE SAVEPOINT create_mv;')
+
+      columns = set([row[0] for row in _fetch(cur, qry_relation_columns(schema, view))])
+      if unique_cols is not None and set(unique_cols) <= columns:
+        cur.execute('SAVEPOINT unique_ix;')
+        try:
+          cur.execute('CREATE UNIQUE INDEX {0} ON {1}.{2} ({3});'.format(index_name(view, unique_cols, unique=True),
+                                                                         schema, view, ', '.join(unique_cols)))
+          cur.execute('RELEASE SAVEPOINT unique_ix;')
+        except Exception:
+          # duplicate keys, the view is refreshed without CONCURRENTLY
+          cur.execute('ROLLBACK TO SAVEPOINT unique_ix;')
+          print('{0}.{1} is not unique on {2}, no unique index'.format(schema, view, ', '.join(unique_cols)))
+          cur.execute('CREATE INDEX {0} ON {1}.{2} ({3});'.format(index_name(view, unique_cols), schema, view,
+                                                                 ', '.join(unique_cols)))
+      for cols in index_cols:
+        if set(cols) <= columns:
+          cur.execute('CREATE INDEX {0} ON {1}.{2} ({3});'.format(index_name(view, cols), schema, view,
+                                                                 ', '.join(cols)))
+      print('{0}.{1} materialised in {2:.1f}s'.format(schema, view, time.time() - start))
+
+    if len(failed) == len(pending):
+      con.rollback()
+      raise ValueError('Could not create materialised views: {}'.format([(v[0], v[1]) for v in failed]))
+    pending = failed
+
+  # same definition (same columns) so CREATE OR REPLACE keeps the views built on the dependants
+  for (schema, view), definition in dependants.items():
+    cur.execute('CREATE OR REPLACE VIEW {0}.{1} AS \n{2}'.format(schema, view, definition.rstrip(' ;\n')))
+    print('{0}.{1} recreated on the materialised views'.format(schema, view))
+  con.commit()
+
+
+def rebind_live_dependants(con, views=hot_views):
+  '''
+  For views already converted: recreates the plain views still reading {view}_live so they read the
+  materialised view (the _live name in their definition is replaced by the view name).
+  :param con: DBAPI (psycopg2) connection to the postgres database
+  '''
+  cur = con.cursor()
+  for schema, view, index_cols, unique_cols in views:
+    kind = _fetch(cur, qry_relation_kind(schema, view))
+    live = _fetch(cur, qry_relation_kind(schema, view + '_live'))
+    if not kind or kind[0][0] != 'm' or not live:
+      continue
+    for dep_schema, dep_view in _plain_view_dependants(cur, schema, view + '_live'):
+      definition = _fetch(cur, qry_view_definition(dep_schema, dep_view))[0][0]
+      definition = re.sub(r'\b{0}_live\b'.format(view), view, definition)
+      cur.execute('CREATE OR REPLACE VIEW {0}.{1} AS \n{2}'.format(dep_schema, dep_view, definition.rstrip(' ;\n')))
+      print('{0}.{1} now reads {2}.{3}'.format(dep_schema, dep_view, schema, view))
+  con.commit()
+
+
+def refresh_view(engine, schema, view):
+  '''
+  Refreshes one materialised view on its own connection.
+  CONCURRENTLY is used when the view has a unique index.
+  :return: (schema, view, seconds, concurrently, success)
+  '''
+  con = engine.raw_connection()
+  start = time.time()
+  concurrently = False
+  try:
+    cur = con.cursor()
+    concurrently = _fetch(cur, qry_has_unique_index(schema, view))[0][0] > 0
+    cur.execute('REFRESH MATERIALIZED VIEW {0}{1}.{2};'.format('CONCURRENTLY ' if concurrently else '', schema, view))
+    con.commit()
+    success = True
+  except Exception:
+    con.rollback()
+    traceback.print_exc()
+    success = False
+  finally:
+    con.close()
+  return schema, view, round(time.time() - start, 2), concurrently, success
+
+
+def refresh_materialised_views(engine, schemas=view_schemas, max_workers=4, log=True, table_schemas=None):
+  '''
+  Refreshes every materialised view in schemas in dependency order.
+  Views in the same dependency level are refreshed in parallel (one connection each).
+  Usage at the end of an upload script: refresh_materialised_views(postgres_engine, schemas=['ces'])
+  :param engine: sqlalchemy engine for the postgres database
+  :param schemas: schemas to refresh (dependencies into other schemas are followed for ordering)
+  :param table_schemas: also refresh the materialised views reading tables in these schemas
+                        (e.g. ['ces_summaries'] after CES_summaries_database_fill.py)
+  :param max_workers: maximum number of views refreshed at the same time
+  :param log: write the refresh times to lookups.tbl_matview_refresh_log
+  :return: list of (schema, view, seconds, concurrently, success)
+  '''
+  con = engine.raw_connection()
+  try:
+    cur = con.cursor()
+    graph = get_dependency_graph(cur, schemas=view_schemas)
+    table_dependants = get_table_dependants(cur, table_schemas) if table_schemas else set()
+  finally:
+    con.close()
+
+  # Refresh the requested schemas and everything downstream of them
+  targets = set([mv for mv in graph if mv[0] in schemas]) | table_dependants
+  changed = True
+  while changed:
+    changed = False
+    for mv, deps in graph.items():
+      if mv not in targets and deps & targets:
+        targets.add(mv)
+        changed = True
+
+  start = time.time()
+  results = []
+  with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    for level in get_refresh_levels(graph):
+      level = [mv for mv in level if mv in targets]
+      for result in executor.map(lambda mv: refresh_view(engine, mv[0], mv[1]), level):
+        print('{0}.{1} refreshed in {2:.2f}s{3}{4}'.format(result[0], result[1], result[2],
+                                                           ' (concurrently)' if result[3] else '',
+                                                           '' if result[4] else ' FAILED'))
+        results.append(result)
+  print('{0} materialised views refreshed in {1:.1f}s'.format(len(results), time.time() - start))
+
+  if log and results:
+    con = engine.raw_connection()
+    try:
+      cur = con.cursor()
+      cur.execute(qry_create_refresh_log())
+      cur.executemany(' INSERT INTO {0}.{1} (schema_name, view_name, seconds, concurrently, success) '
+                      ' VALUES (%s, %s, %s, %s, %s);'.format(log_schema, log_table), results)
+      con.commit()
+    finally:
+      con.close()
+  return results
@@ -0,0 +1,92 @@
+## PLO CLO SIMILARITY
+# Peter February 2019
+# Suggested PLO to CLO alignments for the alignment workbooks (PLO alignment/PLO_CLO_mapping_success_v1.6.py).
+# Every PLO and CLO text of the catalogue is vectorised once with TF-IDF (one vocabulary, rows are
+# l2 normalised so a dot product is the cosine similarity). The pairs of every program (PLOs x CLOs
+# of the program courses) are scored together with row-wise sparse products in chunks, no per pair loop.
+# A CLO is suggested for a PLO when the score reaches min_score or it is one of the top_n CLOs of the PLO.
+#
+# Usage:
+#   sim = OutcomeSimilarity().fit(df_plo, df_clo)
+#   df_scores = sim.program_scores(df_mapping)
+
+import time
+import pickle
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Words in almost every learning outcome that do not separate outcomes
+outcome_stop_words = ['students', 'student', 'able', 'ability', 'demonstrate', 'apply', 'use', 'using',
+                      'develop', 'understanding', 'knowledge', 'skills', 'course', 'program', 'including']
+
+
+class OutcomeSimilarity(object):
+  '''
+  TF-IDF similarity of PLO and CLO texts.
+  fit: vectorise every PLO and CLO once
+  program_scores: score, rank and suggestion of every PLO x CLO pair of the programs
+  '''
+  def __init__(self, min_df=2, max_df=0.5, ngram_range=(1, 2), min_score=0.2, top_n=3):
+    stop_words = list(TfidfVectorizer(stop_words='english').get_stop_words()) + outcome_stop_words
+    self.vectoriser = TfidfVectorizer(stop_words=stop_words, min_df=min_df, max_df=max_df,
+                                      ngram_range=ngram_range, sublinear_tf=True, dtype=np.float32)
+    self.min_score = min_score
+    self.top_n = top_n
+    self.plo_keys = None
+    self.clo_keys = None
+
+  def fit(self, df_plo, df_clo):
+    '''
+    :param df_plo: program_code, plan_code, plo_nbr, plo_text
+    :param df_clo: course_id, clo_nbr, clo_text
+    '''
+    start = time.time()
+    self.plo_keys = df_plo[['program_code', 'plan_code', 'plo_nbr']].reset_index(drop=True)
+    self.clo_keys = df_clo[['course_id', 'clo_nbr']].reset_index(drop=True)
+    texts = df_plo['plo_text'].fillna('').astype(str).tolist() + df_clo['clo_text'].fillna('').astype(str).tolist()
+    x = self.vectoriser.fit_transform(texts).tocsr()
+    self.plo_matrix = x[:len(df_plo)]
+    self.clo_matrix = x[len(df_plo):]
+    print('{0} PLOs and {1} CLOs vectorised ({2} terms) in {3:.1f}s'.format(len(df_plo), len(df_clo), x.shape[1],
+                                                                         time.time() - start))
+    return self
+
+  def pair_scores(self, plo_rows, clo_rows, chunk_size=200000):
+    # Cosine similarity of each (PLO row, CLO row) pair, chunks of row-wise sparse products
+    scores = np.zeros(len(plo_rows), dtype=np.float32)
+    for i in range(0, len(plo_rows), chunk_size):
+      p = self.plo_matrix[plo_rows[i:i + chunk_size]]
+      c = self.clo_matrix[clo_rows[i:i + chunk_size]]
+      scores[i:i + chunk_size] = np.asarray(p.multiply(c).sum(axis=1)).ravel()
+    return scores
+
+  def program_scores(self, df_mapping):
+    '''
+    Scores every PLO x CLO pair of the programs in df_mapping.
+    :param df_mapping: program_code, plan_code, course_id of the program courses
+    :return: data frame program_code, plan_code, plo_nbr, course_id, clo_nbr, score, rank, suggested,
+             one row per pair (repeated PLO / CLO rows keep the highest score)
+    '''
+    start = time.time()
+    df_plo = self.plo_keys.rename_axis('plo_row').reset_index()
+    df_clo = self.clo_keys.rename_axis('clo_row').reset_index()
+    df = df_mapping[['program_code', 'plan_code', 'course_id']].drop_duplicates()
+    df = df.merge(df_plo, on=['program_code', 'plan_code']).merge(df_clo, on='course_id')
+
+    df['score'] = self.pair_scores(df['plo_row'].to_numpy(), df['clo_row'].to_numpy()).round(3)
+    df = df.sort_values('score', ascending=False, kind='mergesort').drop_duplicates(
+      ['program_code', 'plan_code', 'plo_nbr', 'course_id', 'clo_nbr']).sort_index()
+    df['rank'] = df.groupby(['program_code', 'plan_code', 'plo_nbr'])['score'].rank(method='first', ascending=False)
+    df['suggested'] = ((df['score'] >= self.min_score) | ((df['rank'] <= self.top_n) & (df['score'] > 0))).astype(int)
+    print('{0} PLO x CLO pairs scored in {1:.1f}s'.format(len(df), time.time() - start))
+    return df.drop(columns=['plo_row', 'clo_row']).reset_index(drop=True)
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
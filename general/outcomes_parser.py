@@ -0,0 +1,184 @@
+## LEARNING OUTCOMES PARSER
+# Peter Ryan Nov 2018
+# Splits the program (PLO) and course (CLO) learning outcome text exported from the
+# curriculum system into one row per outcome, shared by PLO_separation(_extras).py and CLO_separation.py.
+#   - the split and clean up patterns are compiled once
+#   - a whole column is parsed in one call, large columns are split into batches parsed in a process pool
+#   - the outcomes can be written straight to postgres with COPY (load_outcomes)
+# split_plos / split_clos keep the rules of the original get_PLOs / get_CLOs, except:
+#   - a PLO line starting with ':' has the ':' removed (get_PLOs returned the rest of that line as the list)
+#   - the CLO split patterns no longer end with an empty alternative (which split every character)
+# Scripts using parse_outcomes with processes must call it from under if __name__ == '__main__':
+
+import time
+import re
+import datetime
+import multiprocessing
+
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  copy_dataframe
+)
+
+html_tag = re.compile('<.*?>')
+clo_li_split = re.compile('<li>|</li>|CLO|<p>|</p>|<div>|</div>')
+clo_br_split = re.compile('<li>|</li>|<br>|<br />|</p>|<p>|</br>|<div>|</div>|CLO')
+clo_block_split = re.compile('<br>|<br />|</p>|<p>|</br>|CLO|<div>|</div>')
+clo_block_tag = re.compile('<p>|</p>|<br>|<br />|</br>|<div>|</div>|CLO')
+
+# characters stripped from each end of an outcome, one at a time in this order
+plo_strip_chars = ['-', '•', '*', '1', '2', '3', '4', '5', '6', '7', '8', '9', '.']
+clo_strip_chars = ['-', '•', '*', '1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '.']
+
+# CLO introduction lines dropped from the start of the list
+clo_intro_phrases = ['Learning outcomes', 'learning outcomes', 'completion of this course',
+                     'Enabling Knowledge and Skills for Capabilities']
+
+# PLO text of these programs is html
+html_programs = ['BP141']
+
+
+def clean_html(raw_html):
+  return html_tag.sub('', raw_html)
+
+
+def strip_outcome(text, strip_chars):
+  text = text.strip()
+  for c in strip_chars:
+    text = text.strip(c)
+  if text.startswith(':'):
+    text = text[1:]
+  return text.strip(')').strip('\uf0a7').strip()
+
+
+def split_plos(text, prog=None):
+  '''
+  PLOs of a program statement of capabilities (the lines after the introduction line ending in ':').
+  :param prog: 'program_code plan_code', printed on errors
+  :return: list of PLO texts, [''] when the text cannot be split
+  '''
+  try:
+    if prog is not None and any(p in prog for p in html_programs):
+      text = clean_html(text)
+    plos = []
+    for lo in text.split('\n'):
+      lo = strip_outcome(lo, plo_strip_chars)
+      if len(lo) > 10:
+        plos.append(lo)
+
+    while plos[0][-1] != ':':
+      plos = plos[1:]
+    return plos[1:]
+
+  except Exception as e:
+    print(e)
+    print(prog)
+    return ['']
+
+
+def split_clos(text, cid=None):
+  '''
+  CLOs of a course learning outcomes html.
+  :param cid: course id, printed on errors
+  :return: list of CLO texts, [''] when the text cannot be split
+  '''
+  try:
+    if '<li>' in text or '</li>' in text:
+      clos = clo_li_split.split(text)
+      if len(clos) == 1:
+        clos = clo_br_split.split(text)
+    elif clo_block_tag.search(text):
+      clos = clo_block_split.split(text)
+    else:
+      return [text]
+
+    clos_2 = []
+    for clo in clos:
+      clo = strip_outcome(clean_html(clo.replace('<br />', '\n')), clo_strip_chars)
+      if len(clo) > 10:
+        clos_2.append(clo)
+
+    if len(clos_2) == 1:
+      return clos_2
+
+    while ':' in clos_2[0][-4:]:
+      clos_2 = clos_2[1:]
+
+    while 'Learning Outcomes' in clos_2[0]:
+      clos_2 = clos_2[1:]
+
+    for phrase in clo_intro_phrases:
+      if phrase in clos_2[0]:
+        clos_2 = clos_2[1:]
+
+    if 'engage in activities leading to an understanding of\n' == clos_2[0]:
+      clos_2 = clos_2[1:]
+
+    return clos_2
+
+  except Exception as e:
+    print(cid)
+    print(e)
+    print(text, '\n')
+    return ['']
+
+
+outcome_splitters = {'plo': split_plos, 'clo': split_clos}
+
+
+def _parse_batch(args):
+  # (kind, first row position, texts, labels) -> [row position, outcome number, outcome text]
+  kind, offset, texts, labels = args
+  split = outcome_splitters[kind]
+  rows = []
+  for i, (text, label) in enumerate(zip(texts, labels)):
+    for k, outcome in enumerate(split(text, label), start=1):
+      rows.append([offset + i, k, outcome])
+  return rows
+
+
+def parse_outcomes(texts, labels=None, kind='plo', processes=1, batch_size=2000):
+  '''
+  Splits every outcome text of a column.
+  :param texts: outcome texts (e.g. df['Statement of Capabilities'])
+  :param labels: program / course label of each text, printed on errors
+  :param kind: 'plo' or 'clo'
+  :param processes: worker processes for more than batch_size texts (None for every core, 1 for this process)
+  :return: data frame row (position in texts), outcome_nbr, outcome_text
+  '''
+  start = time.time()
+  texts = list(texts)
+  labels = list(labels) if labels is not None else [None] * len(texts)
+  batches = [(kind, i, texts[i:i + batch_size], labels[i:i + batch_size])
+             for i in range(0, len(texts), batch_size)]
+
+  if processes == 1 or len(batches) <= 1:
+    results = [_parse_batch(b) for b in batches]
+  else:
+    with multiprocessing.Pool(processes=processes) as pool:
+      results = pool.map(_parse_batch, batches, chunksize=1)
+
+  df = pd.DataFrame([r for rows in results for r in rows], columns=['row', 'outcome_nbr', 'outcome_text'])
+  print('{0} {1} texts split into {2} outcomes in {3:.2f}s'.format(len(texts), kind.upper(), len(df),
+                                                                 time.time() - start))
+  return df
+
+
+def outcome_rows(df_source, df_outcomes, columns):
+  # Source columns of each outcome, the outcomes in source row order
+  return df_source.iloc[df_outcomes['row'].to_numpy()][columns].reset_index(drop=True).join(
+    df_outcomes[['outcome_nbr', 'outcome_text']].reset_index(drop=True))
+
+
+def load_outcomes(df, engine, schema, table, text_col='outcome_text', replace_col=None):
+  '''
+  Bulk loads the split outcomes (empty outcomes dropped) with COPY.
+  :param replace_col: rows already loaded with the same values of this column are replaced
+  '''
+  df = df.loc[df[text_col].fillna('') != ''].assign(loaded=datetime.datetime.now())
+  copy_dataframe(df, schema, table, engine, replace_col=replace_col)
+  print('{0}.{1}: {2} outcomes loaded'.format(schema, table, len(df)))
@@ -0,0 +1,157 @@
+## PERFORMANCE CUBE
+# Peter October 2019
+# Data layer for the School, College and SIM performance charts
+# (Other Reports/School_performance_report.py, College_performance_report.py,
+#  School_performance_report_SIM.py, Program_performance_report_SIM.py).
+# A source view is read with one query for every entity (school, college or program),
+# level / staff type, year and semester in the year range and held as a tidy cube indexed by
+# (entity, level, year, semester) over the full year x semester grid.
+# The chart builders slice the cube (one indexed lookup per trace) instead of filtering the data
+# for every school, level, year and semester, so adding schools or years does not add queries
+# or filter passes, and a missing semester is a gap in the line rather than a shifted point.
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  db_extract_query_to_dataframe,
+  convert_list_string_for_sql
+)
+
+# source: (view, entity column, level column)
+cube_sources = {
+  'school': ('ces.vw146_school_bus_for_graph', 'school_name_short', 'level'),
+  'college': ('ces.vw157_college_for_graph', 'college_name_short', 'level'),
+  'school_sim': ('sim_ces.vw302_school_bus_for_graph', 'school', 'staff_type'),
+  'program_sim': ('sim_ces.vw202_program', 'program_code', 'staff_type'),
+}
+
+
+def qry_performance_cube(source, start_year, end_year=None, levels=None):
+  '''
+  One query for every entity, level, year and semester of a source view.
+  :param source: key of cube_sources
+  :param levels: only these levels / staff types, None for all
+  '''
+  view, entity_col, level_col = cube_sources[source]
+  qry = ' SELECT * \n' \
+        ' FROM {0} \n' \
+        ' WHERE year >= {1} \n' \
+        ''.format(view, start_year)
+  if end_year is not None:
+    qry += '   AND year <= {} \n'.format(end_year)
+  if levels:
+    qry += '   AND {0} IN {1} \n'.format(level_col, convert_list_string_for_sql(levels))
+  qry += ' ORDER BY {0}, {1}, year, semester; \n'.format(entity_col, level_col)
+  return qry
+
+
+class PerformanceCube(object):
+  '''
+  Tidy cube of a performance view indexed by (entity, level, year, semester).
+  series: values of a measure for an entity, level and semester by year
+  term_series: values of a measure for an entity and level by term (year S1, year S2, ...)
+  attribute: a descriptive column (colour_html, school_name, ...) of an entity and level
+  '''
+  def __init__(self, df, entity_col, level_col, start_year=None, end_year=None, semesters=(1, 2)):
+    self.entity_col = entity_col
+    self.level_col = level_col
+    keys = [entity_col, level_col, 'year', 'semester']
+    df = df.copy()
+    df['year'] = df['year'].astype(int)
+    df['semester'] = df['semester'].astype(int)
+    self.start_year = int(df['year'].min() if start_year is None else start_year)
+    self.end_year = int(df['year'].max() if end_year is None else end_year)
+    self.years = list(range(self.start_year, self.end_year + 1))
+    self.semesters = list(semesters)
+
+    # descriptive columns are held once per entity and level
+    self.attributes = df.drop_duplicates([entity_col, level_col]).set_index([entity_col, level_col])
+
+    # measures reindexed over the full year x semester grid of every entity and level
+    # (numeric columns come back from postgres as Decimal objects so each column is converted,
+    # an all null column, e.g. NULL::numeric AS mgts, is kept as a measure with no values)
+    measures = []
+    for col in df.columns:
+      if col in keys:
+        continue
+      if df[col].isnull().all():
+        df[col] = np.nan
+        measures.append(col)
+        continue
+      values = pd.to_numeric(df[col], errors='coerce')
+      if values.notnull().sum() == df[col].notnull().sum():
+        df[col] = values.astype(float)
+        measures.append(col)
+    pairs = self.attributes.index
+    grid = pd.MultiIndex.from_tuples([(e, l, y, s) for e, l in pairs for y in self.years for s in self.semesters],
+                                     names=keys)
+    self.frame = df.drop_duplicates(keys).set_index(keys)[measures].reindex(grid).sort_index()
+
+  @classmethod
+  def from_db(cls, cur, source, start_year, end_year=None, levels=None):
+    view, entity_col, level_col = cube_sources[source]
+    df = db_extract_query_to_dataframe(qry_performance_cube(source, start_year, end_year, levels), cur,
+                                       print_messages=False)
+    return cls(df, entity_col, level_col, start_year=start_year, end_year=end_year)
+
+  @classmethod
+  def from_frame(cls, df, source, start_year=None, end_year=None):
+    # Accepts a cube or the data frame of a source view (the chart builders take either)
+    if isinstance(df, cls):
+      return df
+    view, entity_col, level_col = cube_sources[source]
+    return cls(df, entity_col, level_col, start_year=start_year, end_year=end_year)
+
+  @property
+  def entities(self):
+    return self.attributes.index.get_level_values(0).unique().tolist()
+
+  def has(self, entity, level):
+    return (entity, level) in self.attributes.index
+
+  def attribute(self, entity, level, col, default=None):
+    try:
+      value = self.attributes.at[(entity, level), col]
+    except KeyError:
+      return default
+    return default if pd.isnull(value) else value
+
+  def _values(self, values):
+    # floats with missing values as None (plotly leaves a gap)
+    values = values.astype(float)
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+  def series(self, entity, level, semester, measure, start_year=None, end_year=None):
+    '''
+    Values of a measure by year for one entity, level and semester (None where there is no result).
+    '''
+    years = list(range(int(start_year or self.start_year), int(end_year or self.end_year) + 1))
+    if not self.has(entity, level) or measure not in self.frame:
+      return [None] * len(years)
+    values = self.frame[measure].xs((entity, level), level=[0, 1]).xs(int(semester), level='semester')
+    return self._values(values.reindex(years))
+
+  def term_series(self, entity, level, measure, start_year=None, end_year=None):
+    '''
+    Values of a measure by term (year S1, year S2, ...) for one entity and level.
+    '''
+    terms = pd.MultiIndex.from_product([range(int(start_year or self.start_year), int(end_year or self.end_year) + 1),
+                                        self.semesters], names=['year', 'semester'])
+    if not self.has(entity, level) or measure not in self.frame:
+      return [None] * len(terms)
+    values = self.frame[measure].xs((entity, level), level=[0, 1])
+    return self._values(values.reindex(terms))
+
+  def year_series(self, entity, measure, start_year=None, end_year=None):
+    '''
+    Values of a measure that is the same for every level and semester of an entity (e.g. gts_target).
+    '''
+    years = list(range(int(start_year or self.start_year), int(end_year or self.end_year) + 1))
+    if entity not in self.entities or measure not in self.frame:
+      return [None] * len(years)
+    values = self.frame[measure].xs(entity, level=0).groupby(level='year').first()
+    return self._values(values.reindex(years))
@@ -0,0 +1,182 @@
+## PLO CLO ALIGNMENT HARVESTER
+# Peter March 2019
+# Reads the completed PLO_CLO_alignment_<program>.xlsx files (PLO alignment/PLO_CLO_mapping_success_v1.6.py)
+# back into the database.
+#   - each workbook is read in read-only mode (values only) in a process pool
+#   - PLOs_to_CLOs gives the alignment matrix (0/1 in column I), PLOs and CLOs the audit columns
+#   - values outside the data validation lists, missing numbers and duplicate pairs are reported
+#     as issues and the rows are not loaded
+#   - the tables are bulk loaded with COPY, the rows of the harvested programs are replaced
+# Scripts using harvest_workbooks must call it from under if __name__ == '__main__':
+#
+# Usage:
+#   harvest = harvest_workbooks(glob.glob(directory + 'PLO_CLO_alignment_*.xlsx'))
+#   load_harvest(harvest, postgres_engine)
+
+import os
+import time
+import datetime
+import multiprocessing
+
+import pandas as pd
+import openpyxl
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  copy_dataframe
+)
+
+# Column layout of the v1.6 alignment workbooks (header in row 1)
+align_columns = ['plo_nbr', 'clo_nbr', 'program_code', 'course_code', 'plo_text', 'clo_text',
+                 'plo_clear', 'clo_clear', 'aligned']
+audit_columns = ['general', 'general_1', 'active_verb', 'active_verb_1', 'focus_object', 'focus_object_1',
+                 'context_qualifier', 'context_qualifier_1', 'clear_usable']
+plo_columns = ['program_code', 'plan_code', 'program_name', 'career', 'school_code', 'school_abbr',
+               'plo_nbr', 'plo_text'] + audit_columns + ['comments']
+clo_columns = ['course_id', 'course_code', 'course_name', 'school_code', 'school_abbr',
+               'clo_nbr', 'clo_text'] + audit_columns
+
+# Destination tables: name: (schema, table, key columns replaced on reload)
+harvest_tables = {
+  'alignment': ('programs', 'tbl_plo_clo_alignment', 'program_code'),
+  'plo_audit': ('programs', 'tbl_plo_audit', 'program_code'),
+  'clo_audit': ('courses', 'tbl_clo_audit', 'program_code'),
+}
+
+
+def sheet_frame(wb, sheet_name, columns):
+  # Values of the first len(columns) columns below the header row, blank rows dropped
+  ws = wb[sheet_name]
+  rows = [r[:len(columns)] for r in ws.iter_rows(min_row=2, max_col=len(columns), values_only=True)]
+  df = pd.DataFrame(rows, columns=columns)
+  df['sheet_row'] = df.index + 2
+  return df.dropna(how='all', subset=columns)
+
+
+def to_number(s):
+  # Numbers stored as text (e.g. '1', '1.0') are converted, other values become nan
+  return pd.to_numeric(s.astype(str).str.strip().replace({'None': None, '': None}), errors='coerce')
+
+
+def validate_alignment(df, filename):
+  '''
+  Checks the alignment rows of one workbook.
+  :return: (valid rows, list of issues [filename, sheet, row, issue])
+  '''
+  issues = []
+  df = df.copy()
+  aligned = df['aligned']
+  df['aligned'] = to_number(aligned)
+  df['plo_nbr'] = to_number(df['plo_nbr'])
+  df['clo_nbr'] = to_number(df['clo_nbr'])
+
+  bad = aligned.notnull() & ~df['aligned'].isin([0, 1])
+  for r, v in zip(df.loc[bad, 'sheet_row'], aligned[bad]):
+    issues.append([filename, 'PLOs_to_CLOs', r, 'aligned value {} is not 0 or 1'.format(v)])
+  missing = df['plo_nbr'].isnull() | df['clo_nbr'].isnull() | df['course_code'].isnull()
+  for r in df.loc[missing, 'sheet_row']:
+    issues.append([filename, 'PLOs_to_CLOs', r, 'missing PLO, CLO or course'])
+  df = df.loc[~bad & ~missing]
+
+  dup = df.duplicated(['program_code', 'plo_nbr', 'course_code', 'clo_nbr'], keep='first')
+  for r in df.loc[dup, 'sheet_row']:
+    issues.append([filename, 'PLOs_to_CLOs', r, 'duplicate PLO / CLO pair'])
+  df = df.loc[~dup]
+
+  blank = df['aligned'].isnull().sum()
+  if blank > 0:
+    issues.append([filename, 'PLOs_to_CLOs', None, '{} of {} pairs not completed'.format(blank, len(df))])
+  df['plo_nbr'] = df['plo_nbr'].astype(int)
+  df['clo_nbr'] = df['clo_nbr'].astype(int)
+  return df, issues
+
+
+def harvest_workbook(filename):
+  '''
+  Reads one returned alignment workbook.
+  :return: dictionary alignment, plo_audit, clo_audit data frames and issues list
+  '''
+  source = os.path.basename(filename)
+  result = {'issues': []}
+  try:
+    wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    df_align = sheet_frame(wb, 'PLOs_to_CLOs', align_columns)
+    df_plo = sheet_frame(wb, 'PLOs', plo_columns)
+    df_clo = sheet_frame(wb, 'CLOs', clo_columns)
+    wb.close()
+  except Exception as e:
+    result['issues'].append([source, None, None, 'could not read workbook: {}'.format(e)])
+    return result
+
+  df_align, issues = validate_alignment(df_align, source)
+  result['issues'] += issues
+  program_codes = df_align['program_code'].dropna().unique().tolist()
+  if len(program_codes) != 1:
+    result['issues'].append([source, 'PLOs_to_CLOs', None,
+                             'expected one program, found {}'.format(program_codes)])
+    return result
+  program_code = program_codes[0]
+
+  df_plo['plo_nbr'] = to_number(df_plo['plo_nbr'])
+  df_clo['clo_nbr'] = to_number(df_clo['clo_nbr'])
+  df_clo['program_code'] = program_code
+
+  result['alignment'] = df_align[['program_code', 'plo_nbr', 'course_code', 'clo_nbr', 'aligned']]
+  result['plo_audit'] = df_plo[['program_code', 'plan_code', 'plo_nbr'] + audit_columns + ['comments']]
+  result['clo_audit'] = df_clo[['program_code', 'course_id', 'course_code', 'clo_nbr'] + audit_columns]
+  for name in harvest_tables:
+    result[name] = result[name].assign(source_file=source)
+  return result
+
+
+def harvest_workbooks(filenames, processes=None):
+  '''
+  Reads the returned workbooks across a process pool.
+  :param processes: number of worker processes (default: number of cores), 1 to read in this process
+  :return: dictionary alignment, plo_audit, clo_audit, issues data frames
+  '''
+  start = time.time()
+  if processes == 1:
+    results = [harvest_workbook(f) for f in filenames]
+  else:
+    with multiprocessing.Pool(processes=processes) as pool:
+      results = pool.map(harvest_workbook, filenames, chunksize=1)
+
+  harvested = datetime.datetime.now()
+  harvest = {}
+  for name in harvest_tables:
+    dfs = [r[name] for r in results if name in r]
+    harvest[name] = pd.concat(dfs, ignore_index=True).assign(harvested=harvested) if dfs else pd.DataFrame()
+  harvest['issues'] = pd.DataFrame([i for r in results for i in r['issues']],
+                                   columns=['source_file', 'sheet', 'sheet_row', 'issue'])
+  print('{0} workbooks harvested in {1:.1f}s: {2} alignment rows, {3} issues'.format(
+    len(filenames), time.time() - start, len(harvest['alignment']), len(harvest['issues'])))
+  return harvest
+
+
+def load_harvest(harvest, engine):
+  # Replaces the rows of the harvested programs in every harvest table
+  for name, (schema, table, replace_col) in harvest_tables.items():
+    df = harvest[name]
+    if len(df) > 0:
+      copy_dataframe(df, schema, table, engine, replace_col=replace_col)
+      print('{0}.{1}: {2} rows loaded'.format(schema, table, len(df)))
+
+
+def qry_plo_coverage(program_codes=None, schema='programs', table='tbl_plo_clo_alignment'):
+  # Number of courses and CLOs aligned to each PLO
+  where = ''
+  if program_codes is not None:
+    where = " AND program_code IN ('{}') \n".format("', '".join(program_codes))
+  qry = ' SELECT program_code, plo_nbr, \n' \
+        '   COUNT(DISTINCT course_code) AS courses_aligned, \n' \
+        '   COUNT(*) AS clos_aligned \n' \
+        ' FROM {0}.{1} \n' \
+        ' WHERE aligned = 1 \n' \
+        '{2}' \
+        ' GROUP BY program_code, plo_nbr \n' \
+        ' ORDER BY program_code, plo_nbr \n' \
+        ''.format(schema, table, where)
+  return qry
@@ -0,0 +1,235 @@
+## PLOTLY REPORT OUTPUT
+# Peter October 2019
+# plotly.offline.plot embeds the full plotly.js bundle (~3 MB) in every html file it writes.
+# report_plot writes the charts of a report run into one directory that holds a single shared
+# plotly.min.js, and each chart html only contains the compacted figure json
+# (floats rounded, no whitespace) so a chart is a few KB to a few hundred KB and the browser
+# caches plotly.js once for the whole report set. The plotly template is kept so the charts look as
+# plotly.offline.plot draws them (keep_template=False saves ~10 KB a chart with plain plotly.js styling).
+#
+# Usage (in place of plotly.offline.plot(fig, filename)):
+#   from general.plotly_report_output import report_plot, write_report_index
+#   report_plot(fig, filename + '.html')
+#   write_report_index(folder)  # optional index.html linking every chart in the folder
+#   report_page([heading_html, fig_table, [fig_s1, fig_s2]], filename)  # several charts on one page
+
+import os
+import json
+import html
+import decimal
+
+import numpy as np
+
+plotly_js_name = 'plotly.min.js'
+default_decimals = 3
+
+chart_template = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+</head>
+<body style="margin:0">
+<div id="chart" style="width:{width};height:{height};"></div>
+<script>
+var figure = {figure};
+Plotly.newPlot('chart', figure.data, figure.layout || {{}}, {config});
+</script>
+</body>
+</html>
+'''
+
+
+def _compact(obj, decimals):
+  # Rounds floats and converts numpy types so the figure can be dumped as compact json
+  if isinstance(obj, dict):
+    return {k: _compact(v, decimals) for k, v in obj.items() if v is not None}
+  if isinstance(obj, (list, tuple)):
+    return [_compact(v, decimals) for v in obj]
+  if isinstance(obj, np.ndarray):
+    if obj.dtype.kind == 'M':
+      # datetime64 .tolist() gives integer nanoseconds
+      return [None if np.isnat(v) else str(np.datetime_as_string(v)) for v in obj]
+    if obj.dtype.kind == 'f':
+      return [None if np.isnan(v) else v for v in np.round(obj, decimals).tolist()]
+    return _compact(obj.tolist(), decimals)
+  if isinstance(obj, np.datetime64):
+    return None if np.isnat(obj) else str(np.datetime_as_string(obj))
+  if isinstance(obj, decimal.Decimal):
+    # postgres numeric columns
+    obj = float(obj)
+  if isinstance(obj, (float, np.floating)):
+    if np.isnan(obj) or np.isinf(obj):
+      return None
+    value = round(float(obj), decimals)
+    return int(value) if value.is_integer() else value
+  if isinstance(obj, np.integer):
+    return int(obj)
+  if isinstance(obj, np.bool_):
+    return bool(obj)
+  if hasattr(obj, 'isoformat'):
+    return obj.isoformat()
+  return obj
+
+
+def figure_to_dict(fig):
+  # Accepts a plotly Figure or the {'data': [...], 'layout': {...}} dicts used in the report scripts
+  if hasattr(fig, 'to_plotly_json'):
+    fig = fig.to_plotly_json()
+  fig_dict = {'data': [trace.to_plotly_json() if hasattr(trace, 'to_plotly_json') else trace
+                       for trace in fig.get('data', [])]}
+  layout = fig.get('layout', {})
+  if hasattr(layout, 'to_plotly_json'):
+    layout = layout.to_plotly_json()
+  fig_dict['layout'] = dict(layout)
+  return fig_dict
+
+
+def compact_figure_json(fig, decimals=default_decimals, keep_template=True):
+  '''
+  Returns the figure as compact json.
+  :param decimals: floats are rounded to this many decimal places
+  :param keep_template: keep layout.template (the charts look as plotly.offline.plot draws them),
+                        False drops the ~10 KB template and the charts use the plain plotly.js styling
+  '''
+  fig_dict = figure_to_dict(fig)
+  if not keep_template:
+    fig_dict['layout'].pop('template', None)
+  # </ is escaped so text in the figure cannot close the script tag
+  # anything _compact does not convert is serialised as plotly.offline.plot does
+  from plotly.utils import PlotlyJSONEncoder
+  return json.dumps(_compact(fig_dict, decimals), separators=(',', ':'),
+                    cls=PlotlyJSONEncoder).replace('</', '<\\/')
+
+
+def ensure_plotly_js(report_dir):
+  # Writes the shared plotly.min.js into the report directory once
+  path = os.path.join(report_dir, plotly_js_name)
+  if not os.path.exists(path):
+    from plotly.offline import get_plotlyjs
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(get_plotlyjs())
+  return path
+
+
+def report_plot(fig, filename='temp-plot.html', report_dir=None, decimals=default_decimals,
+                keep_template=True, auto_open=False, config=None):
+  '''
+  Writes a chart html that references the shared plotly.min.js.
+  :param fig: plotly Figure or figure dict
+  :param filename: output html file, the shared plotly.min.js is written to its directory
+  :param report_dir: write the chart into this directory instead (one shared plotly.js for the run)
+  :param auto_open: open the chart in the browser (as plotly.offline.plot)
+  :return: path of the html file
+  '''
+  if report_dir is not None:
+    filename = os.path.join(report_dir, os.path.basename(filename))
+  if not filename.endswith('.html'):
+    filename += '.html'
+  directory = os.path.dirname(os.path.abspath(filename))
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  ensure_plotly_js(directory)
+
+  fig_json = compact_figure_json(fig, decimals=decimals, keep_template=keep_template)
+  layout = figure_to_dict(fig)['layout']
+  width = '{}px'.format(layout['width']) if layout.get('width') else '100%'
+  height = '{}px'.format(layout['height']) if layout.get('height') else '100vh'
+  if config is None:
+    config = {'displaylogo': False}
+
+  with open(filename, 'w', encoding='utf-8') as f:
+    f.write(chart_template.format(title=html.escape(os.path.splitext(os.path.basename(filename))[0]),
+                                  plotly_js=plotly_js_name,
+                                  width=width,
+                                  height=height,
+                                  figure=fig_json,
+                                  config=json.dumps(config)))
+
+  if auto_open:
+    import webbrowser
+    webbrowser.open('file://' + os.path.abspath(filename))
+  return filename
+
+
+page_template = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{margin:0; font-family:Sans-serif;}}
+.row {{display:flex; flex-wrap:wrap;}}
+{css}
+</style>
+</head>
+<body>
+{body}
+<script>
+{scripts}
+</script>
+</body>
+</html>
+'''
+
+
+def report_page(items, filename, report_dir=None, title=None, css='', decimals=default_decimals,
+                keep_template=True, config=None):
+  '''
+  Writes a page of several charts and html blocks that references the shared plotly.min.js.
+  :param items: list of html strings (written as they are), figures (written as a chart) and
+                lists of these (written side by side as a row)
+  :param filename: output html file, the shared plotly.min.js is written to its directory
+  :param report_dir: write the page into this directory instead
+  :param css: extra css added to the page style
+  :return: path of the html file
+  '''
+  if report_dir is not None:
+    filename = os.path.join(report_dir, os.path.basename(filename))
+  if not filename.endswith('.html'):
+    filename += '.html'
+  directory = os.path.dirname(os.path.abspath(filename))
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  ensure_plotly_js(directory)
+  if title is None:
+    title = os.path.splitext(os.path.basename(filename))[0]
+  if config is None:
+    config = {'displaylogo': False}
+
+  scripts = []
+
+  def write_item(item):
+    if isinstance(item, str):
+      return item
+    if isinstance(item, (list, tuple)):
+      return '<div class="row">\n{}\n</div>'.format('\n'.join([write_item(i) for i in item]))
+    chart_id = 'chart{}'.format(len(scripts))
+    layout = figure_to_dict(item)['layout']
+    width = '{}px'.format(layout['width']) if layout.get('width') else '100%'
+    height = '{}px'.format(layout['height']) if layout.get('height') else '450px'
+    scripts.append("var f = {0};\nPlotly.newPlot('{1}', f.data, f.layout || {{}}, {2});".format(
+      compact_figure_json(item, decimals=decimals, keep_template=keep_template), chart_id, json.dumps(config)))
+    return '<div id="{0}" style="width:{1};height:{2};"></div>'.format(chart_id, width, height)
+
+  body = '\n'.join([write_item(item) for item in items])
+  with open(filename, 'w', encoding='utf-8') as f:
+    f.write(page_template.format(title=html.escape(title),
+                                 plotly_js=plotly_js_name,
+                                 css=css,
+                                 body=body,
+                                 scripts='\n'.join(scripts)))
+  return filename
+
+
+def write_report_index(report_dir, title='Report'):
+  # Writes index.html linking every chart in the report directory
+  charts = sorted([f for f in os.listdir(report_dir) if f.endswith('.html') and f != 'index.html'])
+  links = '\n'.join(['<li><a href="{0}">{1}</a></li>'.format(html.escape(f), html.escape(os.path.splitext(f)[0]))
+                     for f in charts])
+  with open(os.path.join(report_dir, 'index.html'), 'w', encoding='utf-8') as f:
+    f.write('<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{0}</title></head>\n'
+            '<body>\n<h1>{0}</h1>\n<ul>\n{1}\n</ul>\n</body>\n</html>\n'.format(html.escape(title), links))
+  return os.path.join(report_dir, 'index.html')
@@ -0,0 +1,119 @@
+## PROGRAM FILE MANIFEST
+# Peter March 2019
+# Change detection for the PLO / CLO program files (PLO alignment/PLO_CLO_mapping*.py).
+# Each program's inputs (PLO rows, Program_course_mapping rows and the CLO rows of the mapped courses,
+# plus the template and any program level rows written to the file such as the suggestion scores)
+# are hashed and compared with the manifest of the files generated last time.
+# Only programs with a new hash or a missing file are regenerated, and the manifest is saved after
+# each file so an interrupted run carries on where it stopped.
+#
+# Usage:
+#   manifest = ProgramManifest(directory + 'manifest.json')
+#   hashes = program_hashes(df_plo, df_clo, df_mapping, extra=file_hash(directory + template))
+#   hashes = program_hashes(df_plo, df_clo, df_mapping, extra=file_hash(directory + template), df_scores=df_scores)
+#   changed = manifest.changed(hashes, directory)
+#   ... generate the changed programs ...
+#   manifest.record(key, hashes[key], save_filename)
+
+import os
+import json
+import hashlib
+import datetime
+
+import numpy as np
+import pandas as pd
+
+program_cols = ['program_code', 'plan_code']
+
+
+def program_key(program_code, plan_code):
+  return '{}_{}'.format(program_code, plan_code)
+
+
+def file_hash(filename):
+  # sha1 of a file (e.g. the template) so a template change regenerates every program
+  sha = hashlib.sha1()
+  with open(filename, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      sha.update(block)
+  return sha.hexdigest()
+
+
+def frame_digests(df, by):
+  '''
+  Digest of the rows of each group (row order ignored), values compared as text.
+  Missing key values are grouped as 'nan' (as program_key formats them) instead of being dropped.
+  :return: dictionary group key: sha1 hex digest
+  '''
+  df = _fill_keys(df, by)
+  row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+  return {key: hashlib.sha1(np.sort(row_hashes[idx]).tobytes()).hexdigest()
+          for key, idx in df.groupby(by).indices.items()}
+
+
+def _fill_keys(df, by):
+  # groupby drops the rows with a missing key value, e.g. a program without a plan_code
+  cols = [by] if isinstance(by, str) else by
+  return df.assign(**{c: df[c].astype(object).where(df[c].notnull(), 'nan') for c in cols})
+
+
+def program_hashes(df_plo, df_clo, df_mapping, extra='', df_scores=None):
+  '''
+  Input hash of every program (PLOs, mapping rows and CLOs of the mapped courses).
+  :param extra: text included in every hash e.g. the template file hash
+  :param df_scores: other rows written to the program files, with program_code and plan_code
+                    (e.g. the PLO x CLO suggestion scores), None when there are none
+  :return: dictionary program key: hash
+  '''
+  plo_digests = frame_digests(df_plo, program_cols)
+  mapping_digests = frame_digests(df_mapping, program_cols)
+  clo_digests = frame_digests(df_clo, 'course_id')
+  score_digests = frame_digests(df_scores, program_cols) if df_scores is not None else {}
+  program_courses = _fill_keys(df_mapping, program_cols).groupby(program_cols)['course_id'].unique()
+
+  hashes = {}
+  for key in set(plo_digests) | set(mapping_digests):
+    courses = sorted(program_courses.get(key, []), key=str)
+    parts = [plo_digests.get(key, ''), mapping_digests.get(key, ''), score_digests.get(key, ''), extra] + \
+            ['{}:{}'.format(c, clo_digests.get(c, '')) for c in courses]
+    hashes[program_key(*key)] = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+  return hashes
+
+
+class ProgramManifest(object):
+  '''
+  Hash, file name and generated time of every program file (json file).
+  '''
+  def __init__(self, filename):
+    self.filename = filename
+    self.entries = {}
+    if os.path.exists(filename):
+      with open(filename, 'r') as f:
+        self.entries = json.load(f)
+
+  def changed(self, hashes, directory=None):
+    '''
+    Program keys whose hash changed or were never generated.
+    :param directory: also regenerate when the file recorded is missing from directory
+    '''
+    changed = []
+    for key, h in hashes.items():
+      entry = self.entries.get(key)
+      if (entry is None or entry['hash'] != h or
+        (directory is not None and not os.path.exists(directory + entry['filename']))):
+        changed.append(key)
+    print('{0} of {1} programs changed'.format(len(changed), len(hashes)))
+    return changed
+
+  def record(self, key, h, filename, save=True):
+    self.entries[key] = {'hash': h, 'filename': filename,
+                         'generated': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+    if save:
+      self.save()
+
+  def save(self):
+    # written to a temporary file first so an interrupted save does not lose the manifest
+    tmp = self.filename + '.tmp'
+    with open(tmp, 'w') as f:
+      json.dump(self.entries, f, indent=1, sort_keys=True)
+    os.replace(tmp, self.filename)
@@ -0,0 +1,223 @@
+## REGRESSION WORKBENCH
+# Peter May 2020
+# Batch version of the assessment regression in pipeline/regression.py.
+# Fits the OLS model with the same diagnostics (White, Breusch-Pagan, Ljung-Box, residual mean,
+# test rmse / r2) for every dataset (course workbook sheet), group (term) and feature subset.
+#   - the workbooks are parsed once and cached (pickle next to the workbook, reused while the
+#     workbook is unchanged)
+#   - the design matrices are built once in the parent process and handed to each worker process
+#     once (Pool initializer), the tasks are only the matrix keys
+#   - the matrix cache holds a digest of the input datasets and is rebuilt when a workbook changes
+#   - the results are one row per model written to an excel report
+
+import os
+import math
+import time
+import pickle
+import hashlib
+import itertools
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import statsmodels.api as sm
+from statsmodels.stats import diagnostic as diag
+from statsmodels.stats.outliers_influence import variance_inflation_factor
+
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import mean_squared_error, r2_score
+
+# design matrices of the worker process (set once by the Pool initializer)
+_matrices = {}
+
+
+'''-------------------------------------------- Inputs ---------------------------------------'''
+def load_results_workbook(path, sheets=None, cache=True, skipfooter=0):
+  '''
+  Reads the sheets of a results workbook, parsed sheets are cached in <workbook>.pkl
+  and reused while the workbook modified time is unchanged.
+  :param sheets: sheet names, None for every sheet
+  :return: dictionary sheet name: data frame
+  '''
+  cache_file = os.path.splitext(path)[0] + '.pkl'
+  mtime = os.path.getmtime(path)
+  if cache and os.path.exists(cache_file):
+    with open(cache_file, 'rb') as f:
+      cached = pickle.load(f)
+    if cached['mtime'] == mtime and (sheets is None or all(s in cached['sheets'] for s in sheets)):
+      return {s: df for s, df in cached['sheets'].items() if sheets is None or s in sheets}
+
+  dfs = pd.read_excel(path, sheet_name=sheets, skipfooter=skipfooter)
+  dfs = {str(s): df for s, df in dfs.items()}
+  if cache:
+    with open(cache_file, 'wb') as f:
+      pickle.dump({'mtime': mtime, 'sheets': dfs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+  return dfs
+
+
+def feature_subsets(features, min_features=1, max_features=None):
+  # every combination of the features from min_features to max_features long
+  if max_features is None:
+    max_features = len(features)
+  return [list(c) for k in range(min_features, max_features + 1) for c in itertools.combinations(features, k)]
+
+
+def model_keys(datasets, target, features, group_col=None, min_features=1, max_features=None, all_groups=True):
+  '''
+  Keys of every model: (dataset, group, target, features).
+  :param datasets: dictionary name: data frame
+  :param group_col: fit each value of this column separately (e.g. 'Term'), None for no groups
+  :param all_groups: also fit all the rows of a dataset (group 'All') when there is a group_col
+  '''
+  keys = []
+  for name, df in datasets.items():
+    groups = []
+    if group_col is not None and group_col in df.columns:
+      groups = sorted(df[group_col].dropna().unique().tolist())
+    if group_col is None or all_groups or not groups:
+      groups = ['All'] + groups
+    for group in groups:
+      for subset in feature_subsets(features, min_features, max_features):
+        keys.append((name, group, target, tuple(subset)))
+  return keys
+
+
+def design_matrices(datasets, keys, group_col=None):
+  '''
+  X (with constant) and y of every model key, built once.
+  Rows with a missing target or feature are dropped.
+  :return: dictionary key: (X, y) numpy arrays
+  '''
+  matrices = {}
+  for name, group, target, features in keys:
+    df = datasets[name]
+    if group != 'All':
+      df = df.loc[df[group_col] == group]
+    df = df[list(features) + [target]].apply(pd.to_numeric, errors='coerce').dropna()
+    x = sm.add_constant(df[list(features)].to_numpy(dtype=float), has_constant='add')
+    matrices[(name, group, target, features)] = (x, df[target].to_numpy(dtype=float))
+  return matrices
+
+
+def datasets_digest(datasets):
+  # md5 of the names, columns and values of every dataset (changes when a workbook is edited)
+  digest = hashlib.md5()
+  for name in sorted(datasets):
+    df = datasets[name]
+    digest.update(str(name).encode('utf-8'))
+    digest.update(str(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+  return digest.hexdigest()
+
+
+'''-------------------------------------------- Models ---------------------------------------'''
+def ljungbox_min_pvalue(resid, lags):
+  # older statsmodels return (stat, pvalues), newer a data frame
+  result = diag.acorr_ljungbox(resid, lags=lags)
+  if isinstance(result, pd.DataFrame):
+    return float(result['lb_pvalue'].min())
+  return float(np.min(result[1]))
+
+
+def fit_model(key, x, y, test_size=0.2, random_state=1):
+  '''
+  OLS fit with the diagnostics of pipeline/regression.py.
+  Heteroscedasticity and autocorrelation p values over 0.05 mean no evidence of either.
+  :return: dictionary, one results row
+  '''
+  name, group, target, features = key
+  row = {'dataset': name, 'group': group, 'target': target, 'features': ', '.join(features),
+         'n_features': len(features), 'n': len(y)}
+  if len(y) < len(features) + 5:
+    row['error'] = 'too few rows'
+    return row
+  try:
+    est = sm.OLS(y, x).fit()
+    row.update({'r2': est.rsquared, 'adj_r2': est.rsquared_adj, 'aic': est.aic, 'bic': est.bic,
+                'f_pval': est.f_pvalue, 'intercept': est.params[0], 'intercept_pval': est.pvalues[0]})
+    for i, feature in enumerate(features):
+      row['coef_{}'.format(feature)] = est.params[i + 1]
+      row['pval_{}'.format(feature)] = est.pvalues[i + 1]
+
+    _, row['white_pval'], _, row['white_f_pval'] = diag.het_white(est.resid, est.model.exog)
+    _, row['bp_pval'], _, row['bp_f_pval'] = diag.het_breuschpagan(est.resid, est.model.exog)
+    row['ljungbox_min_pval'] = ljungbox_min_pvalue(est.resid, max(1, min(10, len(y) // 5)))
+    row['mean_resid'] = float(np.mean(est.resid))
+    if len(features) > 1:
+      row['max_vif'] = max(variance_inflation_factor(x, i) for i in range(1, x.shape[1]))
+
+    # out of sample error of a model fitted on the training rows
+    x_train, x_test, y_train, y_test = train_test_split(x[:, 1:], y, test_size=test_size,
+                                                        random_state=random_state)
+    y_predict = LinearRegression().fit(x_train, y_train).predict(x_test)
+    row['test_rmse'] = math.sqrt(mean_squared_error(y_test, y_predict))
+    row['test_r2'] = r2_score(y_test, y_predict)
+  except Exception as e:
+    row['error'] = str(e)
+  return row
+
+
+def _init_worker(matrices):
+  global _matrices
+  _matrices = matrices
+
+
+def _fit_key(key):
+  x, y = _matrices[key]
+  return fit_model(key, x, y)
+
+
+def run_workbench(datasets, target, features, group_col=None, min_features=1, max_features=None,
+                  processes=None, matrix_cache=None):
+  '''
+  Fits every dataset, group and feature subset in parallel processes.
+  :param processes: number of worker processes, None for every core, 1 to fit in this process
+  :param matrix_cache: pickle file of the design matrices, reused when it has every model key
+                       and was built from the same datasets (datasets_digest)
+  :return: data frame, one row per model
+  '''
+  start = time.time()
+  keys = model_keys(datasets, target, features, group_col, min_features, max_features)
+
+  matrices = None
+  digest = datasets_digest(datasets) if matrix_cache is not None else None
+  if matrix_cache is not None and os.path.exists(matrix_cache):
+    with open(matrix_cache, 'rb') as f:
+      cached = pickle.load(f)
+    if cached.get('digest') == digest and cached.get('group_col') == group_col and \
+        all(k in cached['matrices'] for k in keys):
+      matrices = cached['matrices']
+  if matrices is None:
+    matrices = design_matrices(datasets, keys, group_col)
+    if matrix_cache is not None:
+      with open(matrix_cache, 'wb') as f:
+        pickle.dump({'digest': digest, 'group_col': group_col, 'matrices': matrices}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+  if processes == 1:
+    rows = [fit_model(k, *matrices[k]) for k in keys]
+  else:
+    with Pool(processes=processes, initializer=_init_worker, initargs=(matrices,)) as pool:
+      rows = pool.map(_fit_key, keys, chunksize=max(1, len(keys) // 50))
+
+  df_results = pd.DataFrame(rows)
+  print('{0} models fitted in {1:.1f}s'.format(len(df_results), time.time() - start))
+  return df_results
+
+
+def write_results_report(df_results, filename, sort_by='adj_r2', alpha=0.05):
+  '''
+  Excel report: every model, the best model of each dataset and group, and the models that fail a diagnostic.
+  '''
+  df = df_results.sort_values(['dataset', 'group', sort_by], ascending=[True, True, False])
+  diagnostics = [c for c in ['white_pval', 'bp_pval', 'ljungbox_min_pval'] if c in df.columns]
+  df['diagnostics_ok'] = (df[diagnostics] > alpha).all(axis=1)
+  df_best = df.loc[df[sort_by].notnull()].groupby(['dataset', 'group']).head(1)
+
+  with pd.ExcelWriter(filename) as writer:
+    df_best.to_excel(writer, sheet_name='best', index=False)
+    df.to_excel(writer, sheet_name='models', index=False)
+    df.loc[~df['diagnostics_ok']].to_excel(writer, sheet_name='failed_diagnostics', index=False)
+  return filename
@@ -41,68 +41,19 @@ def qry_get_course_code_locations_for_course_id(st_term, end_term):
   '''.format(st_term, end_term)
   return qry
 
-def qry_sams_course_locations(crsList=None, st_term='1800', end_term='2000'):
-  crsList = ['ACCT1028', 'ACCT1046', 'ACCT1056', 'ACCT1060', 'ACCT1064', 'ACCT1077', 'ACCT2189', 'ACCT2213', 'ACCT2228',
-             'ACCT2267', 'ACCT2271', 'ACCT2275', 'ACCT2277', 'ACCT5371C', 'ACCT5372C', 'ACCT5380C', 'ACCT5381C', 'ACCT5391C',
-             'ACCT5393C', 'ACCT5394C', 'BAFI1002',
-  'BAFI1018', 'BAFI1026', 'BAFI1042', 'BAFI1070', 'BAFI2081', 'BAFI5210C', 'BAFI5211C', 'BAFI5212C', 'BAFI5213C',
-  'BAFI5215C',
-  'BAFI5220C', 'BAFI5221C', 'BUSM1074', 'BUSM1080', 'BUSM1094', 'BUSM1162', 'BUSM1222', 'BUSM1313', 'BUSM1534',
-  'BUSM1539', 'BUSM3115',
-  'BUSM3119', 'BUSM3122', 'BUSM3125', 'BUSM3323', 'BUSM4052', 'BUSM4054', 'BUSM4095', 'BUSM4141', 'BUSM4160',
-  'BUSM4176', 'BUSM4177',
-  'BUSM4295', 'BUSM4323', 'BUSM4360', 'BUSM4361', 'BUSM4367', 'BUSM4369', 'BUSM4371', 'BUSM4372', 'BUSM4377',
-  'BUSM4379', 'BUSM4380',
-  'BUSM4448', 'BUSM4495', 'BUSM4496', 'BUSM4528', 'BUSM4531', 'BUSM4534', 'BUSM4546', 'BUSM4550', 'BUSM4558',
-  'BUSM4583', 'BUSM4688',
-  'BUSM7932C', 'BUSM7938C', 'COMM7332C', 'COMM7333C', 'COSC6188C', 'COSC7357C', 'COSC7358C', 'COSC7359C', 'COSC7360C',
-  'COSC7362C',
-  'COSC7365C', 'COSC7373C', 'COSC7374C', 'ECON1020', 'ECON1030', 'ECON1042', 'ECON1066', 'ECON1082', 'ECON1086',
-  'ECON1223', 'ECON1238',
-  'ECON1246', 'ECON1247', 'ECON1248', 'ECON1273', 'ECON1275', 'EMPL7068C', 'EMPL7070C', 'EMPL7076C', 'GRAP5370C',
-  'INTE1002', 'INTE1030',
-  'INTE1063', 'INTE2043', 'INTE2489', 'ISYS1039', 'ISYS1168', 'ISYS2056', 'ISYS2395', 'ISYS2396', 'ISYS2427',
-  'ISYS2452', 'ISYS3314',
-  'ISYS3374', 'JUST5748', 'JUST5749', 'JUST5750', 'LAW1019', 'LAW1023', 'LAW1024', 'LAW1028', 'LAW2395', 'LAW2442',
-  'LAW2453', 'LAW2457',
-  'LAW2477', 'LAW2486', 'LAW2487', 'LAW2488', 'LAW2490', 'LAW2492', 'LAW2493', 'LAW2494', 'LAW2496', 'LAW2524',
-  'LAW2538', 'LAW2540',
-  'LAW2551', 'LAW5716', 'LAW5717', 'LAW5719', 'LAW5720', 'LAW5721', 'LAW5724', 'LAW5730C', 'LAW5732C', 'LIBR1028',
-  'LIBR1070', 'MATH5332C',
-  'MKTG1041', 'MKTG1045', 'MKTG1048', 'MKTG1050', 'MKTG1053', 'MKTG1061', 'MKTG1071', 'MKTG1080', 'MKTG1086',
-  'MKTG1092', 'MKTG1104',
-  'MKTG1126', 'MKTG1215', 'MKTG1276', 'MKTG1296', 'MKTG1329', 'MKTG1415', 'MKTG1423', 'MKTG6045C', 'MKTG7878',
-  'MKTG7881', 'MKTG7887C',
-  'MKTG7888C', 'MKTG7896', 'MKTG7911C', 'MKTG7913C', 'MKTG7929C', 'MKTG7943C', 'MKTG7947C', 'MKTG7977C', 'OFFC5328C',
-  'OHTH5867C',
-  'OHTH5872C', 'OMGT1053', 'OMGT1058', 'OMGT1070', 'OMGT2155', 'OMGT2190', 'OMGT2243', 'OMGT2295', 'OMGT5034',
-  'OMGT5039C', 'POLI5044C',
-  'ECON1268', 'LAW2447', 'BAFI3184', 'ECON1194', 'BAFI3192', 'ACCT2160', 'ACCT2105', 'BAFI3182', 'ACCT2126',
-  'ACCT2158', 'LAW2485', 'BUSM2416',
-  'BUSM4529', 'BUSM3244', 'BUSM4532', 'BUSM4488', 'BUSM4155', 'BUSM2412', 'BUSM4161', 'MKTG1205', 'BUSM4374',
-  'BUSM4561', 'BUSM3311', 'ISYS2109',
-  'SOCU2264', 'BUSM4557', 'BUSM3097', 'OMGT2085', 'ISYS2110', 'BUSM4092', 'BUSM3299']
-
-  crsList = ['ACCT1028', 'ACCT1046']
+def qry_class_course_campuses(st_term='1800', end_term=None):
+  # Latest term of every course id, course code and campus offered (course location index, general/course_locations.py)
+  end_filter = "AND strm <= '{0}' ".format(end_term) if end_term is not None else ''
   qry = '''
-  SELECT *
-  FROM (
-    SELECT DISTINCT
-      t1.course_id, t1.course_code_ms, t1.campus_ms, campus, course_code
-    FROM ({0}) t1
-    LEFT OUTER JOIN ({1}) t2
-    ON t1.course_id = t2.course_id
-  )
-  pivot(
-    max(course_code)
-    for campus in ('AUSCY' city, 'AUSBR' brunswick, 'AUSBU' bundoora, 'AUSOL' aus_online,
-    'SGPIM' singapore_im, 'SGPKP' singapore_kp, 'CHNSI' china_shanghai,
-    'CHNBJ' china_beijing, 'HKGAC' hongkong_ac, 'HKGVT' hongkong_vt,
-    'AUSVN' AUSVN, 'VNMRI' veitnam_ri, 'VNMPA' veitnam_pa,
-    'VNMRH' veitnam_rh, 'IDNUP' uph, 'ONLOU' www_ou, 'ONLKP' www_kp)
-  )
-  '''.format(qry_get_course_id_for_course_codes(crsList, st_term, end_term),
-             qry_get_course_code_locations_for_course_id(st_term, end_term))
+      SELECT cls.CRSE_ID AS course_id,
+        cls.SUBJECT || cls.CATALOG_NBR AS course_code,
+        MAX(cls.DESCR) KEEP (DENSE_RANK LAST ORDER BY cls.STRM) AS course_name,
+        cls.CAMPUS AS campus,
+        MAX(cls.STRM) AS last_term
+      FROM PS_CLASS_TBL cls
+      WHERE strm >= '{0}' {1}
+      GROUP BY cls.CRSE_ID, cls.SUBJECT || cls.CATALOG_NBR, cls.CAMPUS
+  '''.format(st_term, end_filter)
   return qry
 
 
@@ -144,6 +95,41 @@ SELECT DISTINCT
   '''.format(st_term, end_term)
   return qry
 
+def qry_grade_distribution(st_term='1700', end_term='1900', acad_group='BUS'):
+  # Grade counts and marks of every course, campus and term, aggregated from qry_std_class_grades
+  # (grade distribution cube, general/grade_distribution.py)
+  qry = '''
+SELECT
+   grd.course_code,
+   cls.CAMPUS AS campus,
+   MAX(cls.ACAD_ORG) AS school_code,
+   grd.term_code,
+   MAX(term.term_name) AS term_name,
+   MAX(term.term_year) AS term_year,
+   COUNT(*) AS enrolments,
+   SUM(CASE WHEN grd.course_grade_points_per_unit = 0 AND grd.course_grade IN ('NN', 'DNS', 'NH', 'SP') THEN 1 ELSE 0 END) AS nn,
+   SUM(CASE WHEN grd.course_grade_points_per_unit = 1 THEN 1 ELSE 0 END) AS pa,
+   SUM(CASE WHEN grd.course_grade_points_per_unit = 2 THEN 1 ELSE 0 END) AS cr,
+   SUM(CASE WHEN grd.course_grade_points_per_unit = 3 THEN 1 ELSE 0 END) AS di,
+   SUM(CASE WHEN grd.course_grade_points_per_unit = 4 THEN 1 ELSE 0 END) AS hd,
+   SUM(CASE WHEN REGEXP_LIKE(grd.course_mark, '^[0-9]+[.]?[0-9]*$') THEN TO_NUMBER(grd.course_mark) END) AS mark_sum,
+   SUM(CASE WHEN REGEXP_LIKE(grd.course_mark, '^[0-9]+[.]?[0-9]*$') THEN 1 ELSE 0 END) AS marked
+ FROM ({0}) grd
+ INNER JOIN PS_CLASS_TBL cls ON (cls.STRM = grd.term_code AND cls.CLASS_NBR = grd.class_nbr)
+ INNER JOIN (
+   SELECT STRM, MAX(DESCRSHORT) AS term_name, MAX(ACAD_YEAR) AS term_year
+   FROM PS_TERM_TBL
+   GROUP BY STRM
+   ) term ON (term.STRM = grd.term_code)
+ WHERE cls.ACAD_GROUP = '{1}'
+   AND grd.include_in_gpa = 'Y'
+   AND grd.enrl_status = 'E'
+   AND grd.enrl_reason = 'ENRL'
+   AND grd.grading_basis <> 'NON'
+ GROUP BY grd.course_code, cls.CAMPUS, grd.term_code
+  '''.format(qry_std_class_grades(st_term, end_term), acad_group)
+  return qry
+
 def qry_course_program_enrolments(st_term='1300', end_term='1900'):
   qry = '''
 SELECT
@@ -255,6 +241,18 @@ WHERE  prg1.acad_group IN ('SET', 'TRAIN', 'RMITU', 'DSC', 'SEH', 'RMITV', 'BUS'
   '''
   return qry
 
+def qry_reference_table(table, columns, since=None):
+  # Every effective dated row of a reference table, or only the rows with an effdt after since (YYYY-MM-DD)
+  # (SAMS reference cache, general/sams_reference_cache.py)
+  since_filter = "WHERE effdt > TO_DATE('{0}', 'YYYY-MM-DD') ".format(since) if since is not None else ''
+  qry = '''
+      SELECT {0}, effdt
+      FROM {1}
+      {2}
+  '''.format(', '.join(columns), table, since_filter)
+  return qry
+
+
 def qry_program_course_structure(program_code=None, active=True):
   qry = """
       SELECT
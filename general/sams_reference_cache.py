@@ -0,0 +1,193 @@
+## SAMS REFERENCE CACHE
+# Peter Ryan Nov 2018
+# Local copy of the effective dated SAMS reference tables (programs, plans, schools, course lists).
+# The qry_program_details / qry_course_details / qry_program_course_structure queries find the
+# current row of each table with a correlated SELECT MAX(effdt) subquery every time they run.
+# Here each table is read once, every row gets the date range it is effective for
+# ([effdt, next effdt of the same key)) in an IntervalIndex, and the current row as of any date is
+# an interval lookup. update reads only the rows with an effdt after the latest one already held,
+# or after yesterday when rows dated today or later are held (a row inserted later with an earlier effdt
+# is still read).
+#
+# Usage:
+#   ref = ReferenceCache.from_sams(sams_engine, cache_file='C:\\Peter\\CoB\\sams_reference.pkl')
+#   ref.update(sams_engine, cache_file='C:\\Peter\\CoB\\sams_reference.pkl')
+#   ref.school_name('615H')
+#   ref.program_details()
+
+import os
+import time
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.sams_queries import (
+  qry_reference_table
+)
+
+# name: (SAMS table, key columns, value columns)
+reference_tables = {
+  'program': ('PS_ACAD_PROG_TBL', ['acad_prog', 'acad_career', 'campus'],
+              ['acad_plan', 'acad_group', 'acad_org', 'descr', 'eff_status']),
+  'plan': ('PS_ACAD_PLAN_TBL', ['acad_prog', 'acad_plan'],
+           ['acad_career', 'descr', 'diploma_descr', 'eff_status']),
+  'org': ('PS_ACAD_ORG_TBL', ['acad_org'],
+          ['descr', 'eff_status']),
+  'course_list': ('PS_CLST_MAIN_TBL', ['course_list', 'acad_prog', 'acad_plan', 'acad_career'],
+                  ['descr254a', 'descr', 'descrshort', 'eff_status']),
+}
+
+program_groups = ['SET', 'TRAIN', 'RMITU', 'DSC', 'SEH', 'RMITV', 'BUS']
+
+
+class EffectiveDatedTable(object):
+  '''
+  Rows of an effective dated table with the interval each row is current for.
+  as_of: the current row of every key on a date
+  lookup: the current row of one key on a date
+  '''
+  def __init__(self, df, key_cols):
+    self.key_cols = key_cols
+    df = df.copy()
+    df['effdt'] = pd.to_datetime(df['effdt'])
+    self.df = df.drop_duplicates(key_cols + ['effdt'], keep='last').sort_values(key_cols + ['effdt'])
+    self.df = self.df.reset_index(drop=True)
+    self.max_effdt = self.df['effdt'].max()
+    self._views = {}
+
+  def _view(self, active_only):
+    # rows (all or active only) with end_dt and the interval index, built once
+    if active_only not in self._views:
+      df = self.df.loc[self.df['eff_status'] == 'A'] if active_only else self.df
+      df = df.reset_index(drop=True)
+      next_dt = df.groupby(self.key_cols, sort=False)['effdt'].shift(-1)
+      df = df.assign(end_dt=next_dt.fillna(pd.Timestamp.max))
+      intervals = pd.IntervalIndex.from_arrays(df['effdt'], df['end_dt'], closed='left')
+      positions = df.groupby(self.key_cols, sort=False).indices
+      self._views[active_only] = (df, intervals, positions)
+    return self._views[active_only]
+
+  def as_of(self, date=None, active_only=False):
+    '''
+    Current row of every key.
+    :param date: as of date, None for the latest row of each key (including future dated rows)
+    :param active_only: only rows with eff_status 'A' are considered
+    '''
+    df, intervals, positions = self._view(active_only)
+    if date is None:
+      return df.loc[df['end_dt'] == pd.Timestamp.max].drop(columns='end_dt')
+    return df.loc[intervals.contains(pd.Timestamp(date))].drop(columns='end_dt')
+
+  def lookup(self, key, date=None, active_only=False):
+    '''
+    Current row of one key (dictionary, None when there is no row).
+    :param key: key value, a tuple when there is more than one key column
+    '''
+    df, intervals, positions = self._view(active_only)
+    rows = positions.get(key)
+    if rows is None or len(rows) == 0:
+      return None
+    if date is None:
+      i = rows[-1]
+    else:
+      j = np.searchsorted(df['effdt'].values[rows], np.datetime64(pd.Timestamp(date)), side='right') - 1
+      if j < 0:
+        return None
+      i = rows[j]
+    return df.iloc[i].drop('end_dt').to_dict()
+
+  def append(self, df_new):
+    return EffectiveDatedTable(pd.concat([self.df, df_new], ignore_index=True), self.key_cols)
+
+
+class ReferenceCache(object):
+  '''
+  The reference_tables held as EffectiveDatedTables.
+  '''
+  def __init__(self, tables):
+    self.tables = tables
+
+  @classmethod
+  def from_sams(cls, sams_engine, cache_file=None, refresh=False):
+    # Reads the cache file, or every reference table from SAMS when there is no cache file (or refresh)
+    if cache_file is not None and os.path.exists(cache_file) and not refresh:
+      return cls.load(cache_file)
+    start = time.time()
+    tables = {}
+    for name, (table, key_cols, value_cols) in reference_tables.items():
+      df = pd.read_sql(sql=qry_reference_table(table, key_cols + value_cols), con=sams_engine)
+      tables[name] = EffectiveDatedTable(df, key_cols)
+    cache = cls(tables)
+    print('SAMS reference tables loaded in {0:.1f}s'.format(time.time() - start))
+    if cache_file is not None:
+      cache.save(cache_file)
+    return cache
+
+  def update(self, sams_engine, cache_file=None):
+    # Reads only the rows with an effdt after the latest effdt held for each table (no later than yesterday,
+    # rows already held are read again and replace the cached rows with the same key and effdt)
+    yesterday = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+    for name, (table, key_cols, value_cols) in reference_tables.items():
+      since = min(self.tables[name].max_effdt, yesterday).strftime('%Y-%m-%d')
+      df_new = pd.read_sql(sql=qry_reference_table(table, key_cols + value_cols, since=since), con=sams_engine)
+      if len(df_new) > 0:
+        self.tables[name] = self.tables[name].append(df_new)
+      print('{0}: {1} new rows after {2}'.format(table, len(df_new), since))
+    if cache_file is not None:
+      self.save(cache_file)
+    return self
+
+  def save(self, filename):
+    with open(filename, 'wb') as f:
+      pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+  @staticmethod
+  def load(filename):
+    with open(filename, 'rb') as f:
+      return pickle.load(f)
+
+  def school_name(self, acad_org, date=None):
+    # the current row of the school, when it is active
+    row = self.tables['org'].lookup(acad_org, date=date)
+    return row['descr'] if row is not None and row['eff_status'] == 'A' else None
+
+  def plan(self, acad_prog, acad_plan, date=None):
+    return self.tables['plan'].lookup((acad_prog, acad_plan), date=date)
+
+  def course_list_name(self, course_list, acad_prog, acad_plan, acad_career, date=None):
+    row = self.tables['course_list'].lookup((course_list, acad_prog, acad_plan, acad_career), date=date,
+                                            active_only=True)
+    return row['descr254a'] if row is not None else None
+
+  def program_details(self, date=None):
+    '''
+    qry_program_details from the cache: program_code, college, school_code, school_name,
+    acad_career, program_name, program_status of every program.
+    '''
+    df_prg = self.tables['program'].df
+    # the latest row of each program (any career / campus), as the max(effdt) per acad_prog
+    if date is not None:
+      df_prg = df_prg.loc[df_prg['effdt'] <= pd.Timestamp(date)]
+    df_prg = df_prg.loc[df_prg['effdt'] == df_prg.groupby('acad_prog')['effdt'].transform('max')]
+    df_prg = df_prg.loc[df_prg['effdt'] > pd.Timestamp('2000-12-31')]
+
+    df_plan = self.tables['plan'].as_of(date)[['acad_prog', 'acad_plan', 'acad_career', 'diploma_descr']]
+    df_org = self.tables['org'].as_of(date)
+    df_org = df_org.loc[df_org['eff_status'] == 'A', ['acad_org', 'descr']]
+
+    df = df_prg.merge(df_plan, on=['acad_prog', 'acad_plan', 'acad_career'], how='left')
+    df = df.merge(df_org.rename(columns={'descr': 'school_name'}), on='acad_org', how='left')
+    df = df.loc[df['acad_group'].isin(program_groups)]
+    return pd.DataFrame({
+      'program_code': df['acad_prog'],
+      'college': df['acad_group'].replace({'SET': 'SEH'}),
+      'school_code': df['acad_org'],
+      'school_name': df['school_name'],
+      'acad_career': df['acad_career'],
+      'program_name': df['diploma_descr'].fillna(df['descr']),
+      'program_status': df['eff_status'].map({'A': 'OPEN', 'I': 'DISC'}).fillna('UKN'),
+    }).drop_duplicates().reset_index(drop=True)
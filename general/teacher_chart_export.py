@@ -0,0 +1,217 @@
+## TEACHER CHART BATCH EXPORT
+# Peter October 2019
+# Renders the teacher/course GTS box and swarm plots (Explore_teachers3_school.py) in batch.
+# The teacher data is split into pages of teachers once, the pages are rendered across a
+# process pool with the non-interactive Agg backend and the rendered pages are written into
+# one combined multi-page PDF (and optionally one png per page).
+# Scripts using export_teacher_pages must call it from under if __name__ == '__main__':
+# so the worker processes do not re-run the script.
+
+import io
+import time
+import multiprocessing
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.image as mpimg
+from matplotlib.backends.backend_pdf import PdfPages
+import seaborn as sns
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+import general.RMIT_colours as rc
+
+default_settings = {
+  'title': 'Teacher/Course GTS comparison (2015-2019)',
+  'current_year': 2019,
+  'vert': False,
+  'measure': 'gts',
+  'measure_label': 'Percent Agree',
+  'teacher_label': 'Employee ID',
+  'subject_areas': ['BAFI', 'ECON', 'MKTG', 'BUSM'],
+  'type_palette3': sns.color_palette([rc.RMIT_Blue3, rc.RMIT_Orange3]),
+  'type_palette2': sns.color_palette([rc.RMIT_Blue2, rc.RMIT_Orange2]),
+  'type_palette': sns.color_palette([rc.RMIT_Blue, rc.RMIT_Orange]),
+  'area_palette3': sns.color_palette([rc.RMIT_Lemon3, rc.RMIT_Aqua3, rc.RMIT_Purple3, rc.RMIT_Green2]),
+  'area_palette': sns.color_palette([rc.RMIT_Lemon, rc.RMIT_Aqua, rc.RMIT_Purple, rc.RMIT_Green]),
+  'dpi': 150,
+}
+
+
+def split_teacher_pages(df, teachers, step=10):
+  '''
+  Groups the teacher data into pages of step teachers in one pass.
+  :param df: teacher data frame with an emplid column
+  :param teachers: ordered list of emplids (one page per step teachers)
+  :param step: teachers per page
+  :return: list of (page number, list of emplids, data frame for the page)
+  '''
+  page_lookup = {}
+  page_teachers = {}
+  for i, emplid in enumerate(teachers):
+    page = i // step + 1
+    page_lookup[emplid] = page
+    page_teachers.setdefault(page, []).append(emplid)
+
+  pages = df['emplid'].astype(object).map(page_lookup)
+  groups = {page: df_page for page, df_page in df.groupby(pages, sort=True)}
+
+  return [(page, page_teachers[page], groups.get(page, df.iloc[0:0]))
+          for page in sorted(page_teachers)]
+
+
+def draw_teacher_page(ax, df_page, teachers, settings):
+  # Draws one page of teacher box plots with swarm overlays (same layout as Explore_teachers3_school.py)
+  measure_val = settings['measure']
+  teacher_val = 'emplid'
+  if settings['vert']:
+    x_val, y_val = measure_val, teacher_val
+  else:
+    x_val, y_val = teacher_val, measure_val
+  area_order = settings['subject_areas'] + [''] * 4
+
+  is_staff = df_page['type'] == 'Staff'
+  is_course = df_page['type'] == 'Course'
+  is_current = df_page['year'] == settings['current_year']
+
+  sns.boxplot(x=x_val, y=y_val, ax=ax,
+              data=df_page,
+              order=teachers,
+              hue='type', hue_order=['Staff', 'Course'],
+              palette=settings['type_palette3'],
+              dodge=True,
+              fliersize=0)
+
+  sns.swarmplot(x=x_val, y=y_val, ax=ax,
+                data=df_page.loc[is_staff],
+                order=teachers,
+                hue='subject_area', hue_order=area_order,
+                palette=settings['area_palette3'],
+                edgecolor=rc.RMIT_Black, linewidth=0.5,
+                dodge=True)
+
+  sns.swarmplot(x=x_val, y=y_val, ax=ax,
+                data=df_page.loc[is_course],
+                order=teachers,
+                hue='type', hue_order=['', 'Course'],
+                palette=settings['type_palette2'],
+                edgecolor=rc.RMIT_Black, linewidth=0.5,
+                size=5,
+                dodge=True)
+
+  sns.swarmplot(x=x_val, y=y_val, ax=ax,
+                data=df_page.loc[is_current & is_staff],
+                order=teachers,
+                hue='subject_area', hue_order=area_order,
+                palette=settings['area_palette'],
+                edgecolor=rc.RMIT_Black, linewidth=0.5,
+                size=5,
+                dodge=True)
+
+  sns.swarmplot(x=x_val, y=y_val, ax=ax,
+                data=df_page.loc[is_current & is_course],
+                order=teachers,
+                hue='type', hue_order=['', 'Course'],
+                palette=settings['type_palette'],
+                edgecolor=rc.RMIT_Black, linewidth=0.5,
+                size=5,
+                dodge=True)
+
+  # Empty plot to fill in space in legend
+  ax.plot(0, 0, '-', color='none', label='A')
+  handles, labels = ax.get_legend_handles_labels()
+  areas = settings['subject_areas']
+  current = str(settings['current_year'])
+  if len(handles) >= 13:
+    ax.legend(
+      [handles[2], handles[7], handles[12], handles[0], handles[0],
+       handles[1], handles[3], handles[4], handles[5], handles[6],
+       handles[0], handles[8], handles[9], handles[10], handles[11]],
+      ['Course', 'Pre ' + current, current, '', '',
+       'Teacher'] + areas + [''] + ['{} {}'.format(area, current) for area in areas],
+      loc='lower left' if settings['vert'] else 'lower right',
+      ncol=3)
+
+  ax.axes.set_title(settings['title'], fontsize=16)
+  if settings['vert']:
+    ax.set_ylabel(settings['teacher_label'], fontsize=14)
+    ax.set_xlabel(settings['measure_label'], fontsize=14)
+    ax.set_xlim([0, 105])
+  else:
+    ax.set_ylabel(settings['measure_label'], fontsize=14)
+    ax.set_xlabel(settings['teacher_label'], fontsize=14)
+    ax.set_ylim([0, 105])
+
+
+def render_teacher_page(job):
+  '''
+  Worker function: renders one page and returns it as png bytes.
+  :param job: (page number, list of emplids, page data frame, settings, png filename or None)
+  :return: (page number, png bytes)
+  '''
+  page, teachers, df_page, settings, png_filename = job
+  sns.set_style('darkgrid')
+  dims = (8.27, 11.69) if settings['vert'] else (11.69, 8.27)
+  fig, ax = plt.subplots(figsize=dims)
+  draw_teacher_page(ax, df_page, teachers, settings)
+  if settings['vert']:
+    plt.subplots_adjust(left=0.11, bottom=0.05, right=0.97, top=0.97)
+  else:
+    plt.subplots_adjust(left=0.07, bottom=0.1, right=0.97, top=0.93)
+
+  buffer = io.BytesIO()
+  fig.savefig(buffer, format='png', dpi=settings['dpi'])
+  plt.close(fig)
+
+  png = buffer.getvalue()
+  if png_filename is not None:
+    with open(png_filename, 'wb') as f:
+      f.write(png)
+  return page, png
+
+
+def write_pages_pdf(pages, pdf_filename, settings):
+  # Combines rendered png pages into one multi-page pdf
+  dims = (8.27, 11.69) if settings['vert'] else (11.69, 8.27)
+  with PdfPages(pdf_filename) as pdf:
+    for page, png in pages:
+      fig = plt.figure(figsize=dims)
+      ax = fig.add_axes([0, 0, 1, 1])
+      ax.axis('off')
+      ax.imshow(mpimg.imread(io.BytesIO(png), format='png'))
+      pdf.savefig(fig, dpi=settings['dpi'])
+      plt.close(fig)
+
+
+def export_teacher_pages(df, teachers, pdf_filename, step=10, processes=None,
+                         png_filename_format=None, settings=None):
+  '''
+  Renders all teacher pages across a process pool and writes a combined pdf.
+  :param df: encoded teacher data frame (see general.ces_teacher_data.load_teacher_data)
+  :param teachers: ordered list of emplids to plot
+  :param pdf_filename: combined pdf output file
+  :param step: teachers per page
+  :param processes: number of worker processes (default: number of cores)
+  :param png_filename_format: optional format string for one png per page e.g. 'folder\\teacher_n{:02d}.png'
+  :param settings: overrides for default_settings
+  :return: number of pages written
+  '''
+  page_settings = dict(default_settings)
+  if settings is not None:
+    page_settings.update(settings)
+
+  start = time.time()
+  jobs = [(page, page_teachers, df_page, page_settings,
+           png_filename_format.format(page) if png_filename_format is not None else None)
+          for page, page_teachers, df_page in split_teacher_pages(df, teachers, step=step)]
+
+  if processes == 1:
+    pages = [render_teacher_page(job) for job in jobs]
+  else:
+    with multiprocessing.Pool(processes=processes) as pool:
+      pages = pool.map(render_teacher_page, jobs, chunksize=1)
+
+  write_pages_pdf(sorted(pages, key=lambda x: x[0]), pdf_filename, page_settings)
+  print('{0} teacher pages written to {1} in {2:.1f}s'.format(len(pages), pdf_filename, time.time() - start))
+  return len(pages)
@@ -0,0 +1,212 @@
+## TERM, LOCATION AND SCHOOL METADATA
+# Peter Ryan Nov 2018
+# One table of the term code, location and school metadata used across the reports, in place of the
+# if-chains copied into sams_helper_functions (get_term_category, get_term_code_ends),
+# db_helper_functions (get_school_name, get_campus_list_string), Course_enhancement_functions
+# (get_term_name) and the Course Assessment scripts.
+#   - every lookup is built once when the module is imported and is a dictionary lookup
+#   - map_school_abbreviations maps a whole column (series.map on the dictionary) for the report scripts
+#
+# Usage:
+#   term_name('1950')                   -> '2019 Semester 2'
+#   term_name('1950', short=True)       -> '2019 S2'
+#   term_code_ends('MELB', 1, 'HE')     -> ['10']
+#   df['school_abbr'] = map_school_abbreviations(df['school_code'], overrides={'VN': 'SBM'})
+#   axis = term_axis(2015, 2019, semester=None)   -> axis.labels ('2015<br> S1', ...), axis.x (0.5, 1.5, ...)
+
+import functools
+from collections import namedtuple
+
+import pandas as pd
+
+# term code suffix: (term name, short term name)
+term_suffixes = {
+  '00': ('Summer Semester', 'Irregular offering'),
+  '01': ('Academic Year', 'Irregular offering'),
+  '02': ('Flexible Term', 'Irregular offering'),
+  '03': ('Academic Year', 'Irregular offering'),
+  '05': ('Semester 1', 'S1'),
+  '10': ('Semester 1', 'S1'),
+  '45': ('Semester 2', 'S2'),
+  '50': ('Semester 2', 'S2'),
+  '20': ('Offshore Semester 1', 'S1'),
+  '30': ('Offshore Semester 2', 'Irregular offering'),
+  '60': ('Offshore Semester 3', 'S2'),
+  '70': ('Offshore Semester 4', 'Irregular offering'),
+  '78': ('Spring Semester', 'Irregular offering'),
+  '91': ('Vietnam Semester 1', 'S1'),
+  '92': ('Vietnam Semester 2', 'S2'),
+  '93': ('Vietnam Semester 3', 'S3'),
+}
+
+# location: [(semester, level, term code suffix)], level None when the location has one set of terms
+location_terms = {
+  'MELB': [(1, 'VE', '05'), (1, 'HE', '10'), (2, 'VE', '45'), (2, 'HE', '50')],
+  'SIM': [(1, None, '20'), (2, None, '60')],
+  'SBM': [(1, None, '91'), (2, None, '92'), (3, None, '93')],
+  'CSI': [(1, None, '08'), (2, None, '48'), (3, None, '20'), (4, None, '30'), (5, None, '60')],
+}
+location_aliases = {'VN': 'SBM', 'SUIBE': 'CSI', 'UPH': 'CSI'}
+
+# location: term categories of each semester
+location_term_categories = {
+  'MELB': {1: 1, 2: 2},
+  'SBM': {1: 5, 2: 6, 3: 7},
+  'SIM': {1: 5, 2: 7},
+}
+
+# location: campuses in the SAMS campus filters (None for all campuses)
+location_campus_filters = {
+  'MELB': None,
+  'SIM': ('SGPIM',),
+  'CSI': ('CHNSI',),
+  'SUIBE': ('CHNSI',),
+  'SBM': ('VNMRH', 'VNMRI'),
+  'VN': ('VNMRH', 'VNMRI'),
+}
+
+# school code: school abbreviation
+school_abbreviations = {
+  '610P': 'CBO',
+  '615H': 'ACCT',
+  '620H': 'BITL',
+  '625H': 'EFM',
+  '630H': 'MGT',
+  '650T': 'VBE',
+  '660H': 'GSBL',
+  'VN': 'Not CoB',
+}
+
+# chart x axis: tick labels, tick positions, (year, semester) of each tick, semesters a year, number of ticks
+TermAxis = namedtuple('TermAxis', ['labels', 'x', 'index', 'semesters', 'no_terms'])
+
+# years in the precomputed term table
+term_years = range(2000, 2040)
+
+
+def _term_table():
+  rows = []
+  for year in term_years:
+    for suffix, (name, short_name) in term_suffixes.items():
+      rows.append(['{0:02d}{1}'.format(year % 100, suffix), year, suffix,
+                   '{0} {1}'.format(year, name), '{0} {1}'.format(year, short_name)])
+  return pd.DataFrame(rows, columns=['term_code', 'year', 'term_suffix', 'term_name', 'term_short_name'])
+
+
+def _term_code_ends():
+  # (location, semester, level) -> term code suffixes, for every semester / level combination incl. None
+  ends = {}
+  for location, terms in location_terms.items():
+    for semester, level, suffix in terms:
+      # (the keys repeat when level is None, each suffix is listed once)
+      for key in set([(location, None, None), (location, semester, None),
+                      (location, None, level), (location, semester, level)]):
+        ends.setdefault(key, []).append(suffix)
+  return ends
+
+
+term_table = _term_table()
+term_names = dict(zip(term_table['term_code'], term_table['term_name']))
+term_short_names = dict(zip(term_table['term_code'], term_table['term_short_name']))
+term_code_end_lists = _term_code_ends()
+
+
+def _location(location):
+  return location_aliases.get(location, location)
+
+
+def term_name(term_code, short=False):
+  '''
+  :param term_code: RMIT term code
+  :return: string 'Year Term_name' ('Year' when the term is not known, '' when the code is not a term code)
+  '''
+  names = term_short_names if short else term_names
+  name = names.get(term_code)
+  if name is not None:
+    return name
+  try:
+    year = '20{}'.format(term_code[:2])
+  except TypeError:
+    return ''
+  if short:
+    return '{0} {1}'.format(year, 'Irregular offering')
+  suffix = term_suffixes.get(term_code[2:])
+  return '{0} {1}'.format(year, suffix[0]) if suffix is not None else year
+
+
+def term_code_ends(location, semester=None, level=None):
+  '''
+  Term code suffixes of a location.
+  :param semester: semester number, None for every semester
+  :param level: 'HE' or 'VE' (Melbourne), None for both levels
+  :return: list of suffixes (e.g. ['05', '45']), None when the selection is not available
+  '''
+  ends = term_code_end_lists.get((_location(location), semester, level))
+  if ends is None and level is not None:
+    # locations with one set of terms for both levels
+    ends = term_code_end_lists.get((_location(location), semester, None))
+  if ends is None:
+    print('Selection not available')
+  return ends
+
+
+def term_categories(location, semester=None):
+  '''
+  :return: list of the term categories of a location (or of one semester), None when not available
+  '''
+  categories = location_term_categories.get(location)
+  if categories is None or (semester is not None and semester not in categories):
+    print('Selection not available')
+    return None
+  if semester is None:
+    return list(categories.values())
+  return [categories[semester]]
+
+
+def campus_list_string(location):
+  # SAMS IN list of the campuses of a location (e.g. "('SGPIM')"), None for all campuses
+  campuses = location_campus_filters.get(location)
+  if campuses is None:
+    return None
+  return '({})'.format(', '.join("'{}'".format(c) for c in campuses))
+
+
+def school_abbreviation(school_code):
+  return school_abbreviations.get(school_code)
+
+
+def map_school_abbreviations(school_codes, overrides=None):
+  '''
+  School abbreviation of every school code of a column.
+  :param overrides: dictionary school code: abbreviation replacing the table entries (e.g. {'VN': 'SBM'})
+  :return: series of abbreviations (None when the code is not known)
+  '''
+  abbreviations = dict(school_abbreviations, **(overrides or {}))
+  abbrs = pd.Series(school_codes).map(abbreviations).astype(object)
+  return abbrs.where(abbrs.notnull(), None)
+
+
+def term_axis(start_year, end_year, semester=None, location='MELB', by_year=False):
+  '''
+  x axis of the term charts, built once for each range and shared by every figure (treat as read only).
+  :param semester: one semester a year (e.g. 1), None for every semester of the location
+  :param by_year: one tick a year labelled 'YYYY<br>' (semester None in the index)
+  :return: TermAxis, ticks at 0.5, 1.5, ... with labels 'YYYY<br> Sn' and axis range [0, no_terms]
+  '''
+  semesters = tuple(sorted(set(sem for sem, level, suffix in location_terms[_location(location)])))
+  if semester not in semesters:
+    semester = None
+  return _term_axis(int(start_year), int(end_year), semester, semesters, by_year)
+
+
+@functools.lru_cache(maxsize=None)
+def _term_axis(start_year, end_year, semester, semesters, by_year):
+  if by_year:
+    index = tuple((year, None) for year in range(start_year, end_year + 1))
+    labels = tuple('{}<br>'.format(year) for year, sem in index)
+  else:
+    semesters = (semester,) if semester is not None else semesters
+    index = tuple((year, sem) for year in range(start_year, end_year + 1) for sem in semesters)
+    labels = tuple('{}<br> S{}'.format(year, sem) for year, sem in index)
+  x = tuple(i - 0.5 for i in range(1, len(index) + 1))
+  return TermAxis(labels, x, index, semesters, len(index))
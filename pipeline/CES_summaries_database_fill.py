@@ -1,6 +1,8 @@
 import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
+from sqlalchemy import create_engine
+
 import general.RMIT_colours as rc
 
 from general.db_helper_functions import (
@@ -8,6 +10,13 @@ from general.db_helper_functions import (
   db_extract_query_to_dataframe
 )
 
+from general.ces_summaries_queries import (
+  qry_create_summaries_table,
+  qry_load_summaries_partition,
+  qry_create_summaries_combined_view
+)
+from general.materialised_views import refresh_materialised_views
+
 
 '''--------------------------------- Connect to Database  ----------------------------'''
 # create postgres engine this is the connection to the postgres database
@@ -24,83 +33,40 @@ con_string = "host='{0}' " \
 con, cur = connect_to_postgres_db(con_string)
 
 
-for year in range(2014, 2019):
-  for sem in [1, 2]:
-    for level in ['ve', 'he']:
-      qry  = " DROP TABLE IF EXISTS ces_summaries.tbl_{0}_{1}_sem{2} CASCADE; \n".format(level, year, sem)
-      print(qry)
-      
-      qry = " CREATE TABLE ces_summaries.tbl_{0}_{1}_sem{2} \n" \
-            " ( \n" \
-            '    course_code text COLLATE pg_catalog."default", \n' \
-            '    all_flag text COLLATE pg_catalog."default", \n' \
-            '    class_nbr text COLLATE pg_catalog."default", \n' \
-            '    term_code text COLLATE pg_catalog."default", \n' \
-            '    section_code text COLLATE pg_catalog."default", \n' \
-            '    course_name text COLLATE pg_catalog."default", \n' \
-            '    teaching_staff text COLLATE pg_catalog."default", \n' \
-            '    course_coordinator text COLLATE pg_catalog."default", \n' \
-            '    career text COLLATE pg_catalog."default", \n' \
-            '    survey_population integer, \n' \
-            '    osi_response_count integer, \n' \
-            '    gts_response_count integer, \n' \
-            '    reliability text COLLATE pg_catalog."default", \n' \
-            '    campus text COLLATE pg_catalog."default", \n' \
-            '    gts numeric, \n' \
-            '    gts_mean numeric, \n' \
-            '    osi numeric, \n' \
-            '    osi_mean numeric, \n' \
-            '    international_count integer, \n' \
-            '    domestic_count integer, \n' \
-            '    ft_count integer, \n' \
-            '    pt_count integer, \n' \
-            '    gts1 numeric, \n' \
-            '    gts2 numeric, \n' \
-            '    gts3 numeric, \n' \
-            '    gts4 numeric, \n' \
-            '    gts5 numeric, \n' \
-            '    gts6 numeric \n' \
-            ' ) \n' \
-            ' WITH ( \n' \
-            '    OIDS = FALSE \n' \
-            ' ) \n' \
-            'TABLESPACE pg_default; \n'.format(level, year, sem)
-      print(qry)
-      
-      qry = " ALTER TABLE ces_summaries.tbl_{0}_{1}_sem{2} \n" \
-            " OWNER to postgres; \n".format(level, year, sem)
-      print(qry)
-      
-    
-      qry = " COPY ces_summaries.tbl_{0}_{1}_sem{2}( \n" \
-            "    course_code, all_flag, class_nbr, term_code, \n" \
-            "    section_code, course_name, teaching_staff, course_coordinator, \n" \
-            "    career, survey_population, osi_response_count, gts_response_count, \n" \
-            "    reliability, campus, gts, gts_mean, osi, osi_mean, international_count, \n" \
-            "    domestic_count, ft_count, pt_count, gts1, gts2, gts3, gts4, gts5, gts6 \n" \
-            "   ) \n" \
-            " FROM 'C:\Peter\CoB\CES\whole_college_summaries\csv\{1}_{3}_sem{2}.csv' delimiter ',' csv header; \n " \
-            "".format(level, year, sem, level.upper())
-      print(qry)
-    
-qry = " CREATE OR REPLACE VIEW ces_summaries.vw_summaries_combined AS \n" \
-      "   SELECT t2.* \n" \
-      "   FROM ( \n"
+# One partitioned table (ces_summaries.tbl_summaries) replaces the per level/year/semester tables.
+# Each semester is loaded into a staging table and attached as a partition.
+# Set migrate = True to fill the partitions from the old ces_summaries.tbl_{level}_{year}_sem{n} tables
+# instead of the csv files.
+execute = False
+migrate = False
+
+
+def run_qry(qry):
+  print(qry)
+  if execute:
+    cur.execute(qry)
+    con.commit()
+
+
+run_qry(qry_create_summaries_table())
 
 for year in range(2014, 2019):
   for sem in [1, 2]:
     for level in ['ve', 'he']:
-      qry += "      SELECT  \n" \
-             "        '{0}'::text AS survey_year, \n" \
-             "        {1}::integer AS survey_semester, \n" \
-             "        '{2}'::text AS survey_level, \n" \
-             "        t1.* \n" \
-             "      FROM ces_summaries.tbl_{3}_{0}_sem{1} t1\n" \
-             "      UNION \n".format(year, sem, level.upper(), level)
-qry = qry[:-10]
-qry += "    ) t2; \n"
-print(qry)
-#db_extract_query_to_dataframe(qry, cur, print_messages=False)
+      filename = 'C:\\Peter\\CoB\\CES\\whole_college_summaries\\csv\\{0}_{1}_sem{2}.csv'.format(year, level.upper(), sem)
+      run_qry(qry_load_summaries_partition(year, sem, level, filename=filename, from_old_table=migrate))
+
+# vw_summaries_combined keeps its columns but reads the partitioned table (no UNION dedupe sort)
+run_qry(qry_create_summaries_combined_view())
+
+# Refresh the materialised views reading ces_summaries (e.g. ces.vw811_teacher_data) and their dependants
+if execute:
+  engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                             postgres_pw,
+                                                             postgres_host,
+                                                             postgres_dbname)
+  postgres_engine = create_engine(engine_string)
+  refresh_materialised_views(postgres_engine, schemas=[], table_schemas=['ces_summaries'])
 
 
 qry = " CREATE OR REPLACE VIEW ces_summaries.vw_teacher_performance_post_2014 AS \n" \
@@ -0,0 +1,56 @@
+## Build the comment search index
+# Copies the CES, SES, OUA and SIM comments into comment_search.tbl_comments (tsvector + GIN index)
+# and saves a local CommentIndex for searching without the database.
+
+import time
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  connect_to_postgres_db
+)
+
+from general.comment_search import (
+  qry_create_comment_search_table,
+  qry_rebuild_comment_search_table,
+  search_comments,
+  get_comments,
+  CommentIndex
+)
+
+'''--------------------------------- Connect to Database  ----------------------------'''
+postgres_pw = input("Postgres Password: ")
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+
+con_string = "host='{0}' " \
+             "dbname='{1}' " \
+             "user='{2}' " \
+             "password='{3}' " \
+             "".format(postgres_host, postgres_dbname, postgres_user, postgres_pw)
+postgres_con, postgres_cur = connect_to_postgres_db(con_string)
+
+'''-------------------------------------------- Set Parameters -------------------------------------'''
+sources = ['ces', 'ses', 'oua', 'sim']
+local_index_file = 'H:\\Projects\\CoB\\CES\\comment_index.pkl'
+
+start = time.time()
+postgres_cur.execute(qry_create_comment_search_table())
+postgres_cur.execute(qry_rebuild_comment_search_table(sources=sources))
+postgres_con.commit()
+print('Postgres comment index rebuilt in {:.1f}s'.format(time.time() - start))
+
+start = time.time()
+df_comments = get_comments(postgres_cur)
+comment_index = CommentIndex(df_comments)
+comment_index.save(local_index_file)
+print('Local comment index ({0} comments, {1} terms) built in {2:.1f}s'.format(len(df_comments),
+                                                                             len(comment_index.postings),
+                                                                             time.time() - start))
+
+# Check both indexes return results
+print(tabulate(search_comments(postgres_cur, 'assessment feedback', years=[2019], limit=10), headers='keys'))
+print(tabulate(comment_index.search('assessment feedback', year=[2019], limit=10), headers='keys'))
@@ -0,0 +1,45 @@
+## Clean the comments already stored in postgres
+# The comment loaders now clean comments on load (general.comment_cleaning).
+# This script applies the same cleaning to the comments loaded before that, table by table
+# (truncate and reload in one transaction so the views on the tables are kept).
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.comment_cleaning import clean_comments
+from general.materialised_views import refresh_materialised_views
+
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+postgres_pw = input("Postgres Password: ")
+
+engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                           postgres_pw,
+                                                           postgres_host,
+                                                           postgres_dbname)
+postgres_engine = create_engine(engine_string)
+
+# (schema, table, comment columns, drop rows when 'all'/'any' comments are null, value stored for null comments)
+comment_tables = [
+  ('ces', 'tbl_course_comments', ['best', 'improve'], 'all', ''),
+  ('ses', 'tbl_comments', ['best', 'improve'], 'all', ''),
+  ('ces_oua', 'tbl_course_comments', ['best', 'improve'], 'all', ''),
+  ('sim_ces', 'tbl_course_teacher_comments', ['comment_text'], 'all', None),
+]
+
+for schema, table, text_cols, how, null_value in comment_tables:
+  df = pd.read_sql_table(table, postgres_engine, schema=schema)
+  df_clean = clean_comments(df, text_cols, how=how, null_value=null_value)
+  changed = (df.loc[df_clean.index, text_cols].fillna('') != df_clean[text_cols].fillna('')).any(axis=1).sum()
+  print('{0}.{1}: {2} rows, {3} comments changed, {4} null comment rows removed'.format(
+    schema, table, len(df), changed, len(df) - len(df_clean)))
+
+  with postgres_engine.begin() as con:
+    con.exec_driver_sql('TRUNCATE TABLE {0}.{1};'.format(schema, table))
+    df_clean.to_sql(name=table, con=con, schema=schema, if_exists='append', index=False)
+
+refresh_materialised_views(postgres_engine, schemas=['ces', 'sim_ces'])
@@ -10,6 +10,9 @@ import sys
 sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 from general.sams_helper_functions import *
 from general.sams_queries import *
+from general.db_helper_functions import (
+  get_school_name
+)
 
 # Create connections
 # create sams engine this is the connection to the oracle database
@@ -64,25 +67,6 @@ def get_all_sbm_bus_courses(term_year, term_code):
   return qry
   
 
-def get_school_name(school_code):
-  if school_code == '610P':
-    return 'CBO'
-  if school_code == '615H':
-    return 'ACCT'
-  if school_code == '620H':
-    return 'BITL'
-  if school_code == '625H':
-    return 'EFM'
-  if school_code == '630H':
-    return 'MGT'
-  if school_code == '650T':
-    return 'VBE'
-  if school_code == '660H':
-    return 'GSBL'
-  if school_code == 'VN':
-    return 'Not CoB'
-  return None
-
 # Get all SIM courses
 df_courses = pd.read_sql(sql=get_all_sbm_bus_courses(current_year, term_code_final), con=sams_engine)
 print(tabulate(df_courses, headers='keys'))
@@ -0,0 +1,50 @@
+## Index advisor report for the CES lookup columns
+# Reads the queries captured by the course pack, program pack and SIM scripts
+# (see general.index_advisor.QueryCaptureCursor), proposes indexes and saves the
+# proposed index list and the before/after query timings to excel.
+
+import pandas as pd
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.db_helper_functions import (
+  connect_to_postgres_db
+)
+
+from general.index_advisor import (
+  load_captured_queries,
+  index_report
+)
+
+'''--------------------------------- Connect to Database  ----------------------------'''
+postgres_pw = input("Postgres Password: ")
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+
+con_string = "host='{0}' " \
+             "dbname='{1}' " \
+             "user='{2}' " \
+             "password='{3}' " \
+             "".format(postgres_host, postgres_dbname, postgres_user, postgres_pw)
+postgres_con, postgres_cur = connect_to_postgres_db(con_string)
+
+'''-------------------------------------------- Set Parameters -------------------------------------'''
+captured_queries_file = 'H:\\Projects\\CoB\\Database\\captured_queries.json'
+report_file = 'H:\\Projects\\CoB\\Database\\index_advisor_report.xlsx'
+create = False  # True creates the proposed indexes and re-times the queries
+
+queries = load_captured_queries(captured_queries_file)
+print('{} captured queries'.format(len(queries)))
+
+df_proposed, df_timing = index_report(postgres_con, queries, create=create, repeat=3)
+
+print(tabulate(df_proposed, headers='keys'))
+print(tabulate(df_timing.drop(columns=['query']), headers='keys'))
+
+with pd.ExcelWriter(report_file) as writer:
+  df_proposed.to_excel(writer, sheet_name='proposed_indexes', index=False)
+  df_timing.to_excel(writer, sheet_name='timings', index=False)
+print('Report saved to {}'.format(report_file))
@@ -0,0 +1,55 @@
+## Convert the hot CES views to materialised views and refresh them
+# Run once with convert = True to materialise the views in general.materialised_views.hot_views,
+# afterwards the upload scripts refresh them automatically.
+
+from sqlalchemy import create_engine
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.materialised_views import (
+  hot_views,
+  view_schemas,
+  convert_to_materialised_views,
+  rebind_live_dependants,
+  get_dependency_graph,
+  get_refresh_levels,
+  refresh_materialised_views
+)
+
+# create postgres engine this is the connection to the postgres database
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+postgres_pw = input("Postgres Password: ")
+
+engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                           postgres_pw,
+                                                           postgres_host,
+                                                           postgres_dbname)
+postgres_engine = create_engine(engine_string)
+
+convert = False
+
+if convert:
+  con = postgres_engine.raw_connection()
+  try:
+    convert_to_materialised_views(con, views=hot_views)
+  finally:
+    con.close()
+
+# Plain views still reading a {view}_live view are pointed at the materialised view
+con = postgres_engine.raw_connection()
+try:
+  rebind_live_dependants(con, views=hot_views)
+finally:
+  con.close()
+
+# Print the refresh order
+con = postgres_engine.raw_connection()
+graph = get_dependency_graph(con.cursor(), schemas=view_schemas)
+con.close()
+for i, level in enumerate(get_refresh_levels(graph)):
+  print('Level {0}: {1}'.format(i, ', '.join(['{0}.{1}'.format(schema, view) for schema, view in level])))
+
+refresh_materialised_views(postgres_engine, schemas=view_schemas)
@@ -0,0 +1,43 @@
+'''
+Assessment regression for every course results workbook
+  - fits the pipeline/regression.py model and diagnostics for every sheet, term and feature subset
+  - writes the results to an excel report
+
+Peter Ryan May 2020
+'''
+
+import os
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.regression_workbench import (
+  load_results_workbook,
+  run_workbench,
+  write_results_report
+)
+
+# Directory containing files, one workbook per course with a sheet per year
+directory = 'H:\\Projects\\CoB\\FNP31 Results\\'
+workbooks = ['FNP31_results_clean.xlsx']
+
+target = 'Exam'
+features = ['Test', 'Assign']
+group_col = 'Term'
+report_file = directory + 'regression_results.xlsx'
+
+
+if __name__ == '__main__':
+  # datasets named <course> <sheet> e.g. FNP31 2019
+  datasets = {}
+  for filename in workbooks:
+    course = filename.split('_')[0]
+    for sheet, df in load_results_workbook(directory + filename).items():
+      datasets['{} {}'.format(course, sheet)] = df
+
+  # the design matrix cache is rebuilt when any workbook (dataset) has changed
+  df_results = run_workbench(datasets, target, features, group_col=group_col,
+                             matrix_cache=os.path.join(directory, 'regression_matrices.pkl'))
+  print(tabulate(df_results[['dataset', 'group', 'features', 'n', 'adj_r2', 'test_rmse']], headers='keys'))
+  write_results_report(df_results, report_file)
@@ -0,0 +1,65 @@
+## Automatic theming of a semester's CES comments
+# Replaces the manual theme spreadsheets loaded by upload_ces_comments_themes.py.
+# Writes the course themes to course_enhancement.tbl_course_thematic and the comment level
+# themes to excel for checking.
+
+import os
+from sqlalchemy import create_engine
+from tabulate import tabulate
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.comment_theming import (
+  ThemeModel,
+  theme_semester,
+  qry_delete_semester_themes
+)
+from general.materialised_views import refresh_materialised_views
+
+postgres_user = 'pjryan'
+postgres_host = 'localhost'
+postgres_dbname = 'postgres'
+postgres_pw = input("Postgres Password: ")
+
+engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                           postgres_pw,
+                                                           postgres_host,
+                                                           postgres_dbname)
+postgres_engine = create_engine(engine_string)
+
+'''-------------------------------------------- Set Parameters -------------------------------------'''
+year = 2019
+semester = 2
+n_themes = 25
+top_n = 3
+incremental = False  # True updates the saved model's themes with this semester's comments
+replace = True  # delete this semester's themes in tbl_course_thematic before writing
+model_file = 'H:\\Projects\\CoB\\CES\\Themes\\ces_theme_model.pkl'
+output_file = 'H:\\Projects\\CoB\\CES\\Themes\\Comment_themes_{0}S{1}_auto.xlsx'.format(year, semester)
+
+# Reuse the saved themes when there is a model, otherwise fit one on this semester
+model = ThemeModel.load(model_file) if os.path.exists(model_file) else None
+
+con = postgres_engine.raw_connection()
+try:
+  model, df_comment_themes, df_course_themes = theme_semester(con.cursor(), year, semester,
+                                                              model=model, n_themes=n_themes,
+                                                              top_n=top_n, incremental=incremental)
+finally:
+  con.close()
+model.save(model_file)
+
+for i, label in enumerate(model.labels):
+  print('Theme {0:2d}: {1}'.format(i, label))
+print(tabulate(df_course_themes.head(20), headers='keys'))
+
+df_comment_themes.to_excel(output_file, index=False)
+
+with postgres_engine.begin() as con:
+  if replace:
+    con.exec_driver_sql(qry_delete_semester_themes(year, semester))
+  df_course_themes.to_sql(name='tbl_course_thematic', con=con, schema='course_enhancement',
+                          if_exists='append', index=False)
+
+refresh_materialised_views(postgres_engine, schemas=['ces', 'course_enhancement'])
@@ -1,7 +1,6 @@
 ## Test script to upload data from SAMS into local db
 # Peter Ryan Nov 2018
 
-import pandas as pd
 import tabulate
 import datetime as dt
 import psycopg2
@@ -10,6 +9,9 @@ sys.path.append('c:\\Peter\\GitHub\\CoB\\')
 
 import general.RMIT_colours as rc
 from general.sams_queries import *
+from general.course_locations import (
+  CourseLocationIndex
+)
 
 from general.db_helper_functions import(
   connect_to_postgres_db
@@ -24,6 +26,8 @@ from general.postgres_queries import (
 year = 2019
 semester = 1
 level = 'NA'
+course_list = ['ACCT1028', 'ACCT1046']
+course_locations_file = 'C:\\Peter\\CoB\\course_locations.pkl'
 
 # Create connections
 postgres_pw = input("Postgres Password: ")
@@ -32,7 +36,10 @@ sams_pw = input("SAMS Password: ")
 # create sams engine this is the connection to the oracle database
 sams_engine = return_sams_engine(password_str=sams_pw)
 
-result_dataframe = pd.read_sql(sql=qry_sams_course_locations(), con=sams_engine)
+# course locations from the local index (built from SAMS the first time, then refreshed from the last term)
+course_locations = CourseLocationIndex.from_sams(sams_engine, cache_file=course_locations_file)
+course_locations.update(sams_engine, cache_file=course_locations_file)
+result_dataframe = course_locations.wide(course_list)
 
 print(tabulate.tabulate(result_dataframe, headers='keys'))
 
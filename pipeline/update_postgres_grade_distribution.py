@@ -0,0 +1,47 @@
+'''
+Load the grade distribution cube of a semester
+  - grade counts, pass rate, mean mark and distribution percentages of every course, location and term
+  - computed in SAMS (qry_grade_distribution) and loaded into Local postgres Database
+      - courses.tbl_grade_distribution
+
+Run once the semester's grades are finalised. Terms already loaded are replaced.
+The course assessment files (course_grade_distribution_files_create.py) read this table.
+
+Peter Ryan Jan 2020
+'''
+
+from tabulate import tabulate
+from sqlalchemy import create_engine
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.sams_helper_functions import (
+  return_sams_engine
+)
+from general.grade_distribution import (
+  load_grade_cube
+)
+
+# Terms after st_term and before end_term are (re)loaded
+st_term = '1500'
+end_term = '2000'
+
+
+if __name__ == '__main__':
+  # Create connections
+  password_str = input("SAMS Password: ")
+  sams_engine = return_sams_engine(password_str=password_str)
+
+  postgres_user = 'pjryan'
+  postgres_host = 'localhost'
+  postgres_dbname = 'postgres'
+  postgres_pw = input("Postgres Password: ")
+  engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                             postgres_pw,
+                                                             postgres_host,
+                                                             postgres_dbname)
+  postgres_engine = create_engine(engine_string)
+
+  df = load_grade_cube(sams_engine, postgres_engine, st_term=st_term, end_term=end_term)
+  print(tabulate(df[:10], headers='keys'))
@@ -4,7 +4,6 @@
 import datetime as dt
 import psycopg2
 from sqlalchemy import (create_engine, orm)
-import pandas as pd
 import tabulate
 
 import sys
@@ -15,6 +14,12 @@ from general.sams_queries import *
 from general.sams_helper_functions import *
 from general.postgres_queries import (
   qry_delete_after_term)
+from general.sams_reference_cache import (
+  ReferenceCache
+)
+
+# local copy of the SAMS reference tables, only rows with a newer effdt are read from SAMS
+reference_cache = 'C:\\Peter\\CoB\\sams_reference.pkl'
 
 # Get inputs
 password_str = input("SAMS Password: ")
@@ -37,14 +42,10 @@ postgres_engine = create_engine(engine_string)
 postgres_con = postgres_engine.connect()
 
 
-# get data from sams
-sams_qry = qry_program_details()
-print(sams_qry)
-
-try:
-  df = pd.read_sql(sql=sams_qry, con=sams_engine)
-except:
-  print(sams_qry)
+# get data from sams (current program, plan and school rows from the reference cache)
+ref = ReferenceCache.from_sams(sams_engine, cache_file=reference_cache)
+ref.update(sams_engine, cache_file=reference_cache)
+df = ref.program_details()
 
 print(len(df))
 
@@ -9,6 +9,10 @@ import psycopg2
 from sqlalchemy import (create_engine, orm)
 from tabulate import tabulate
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.materialised_views import refresh_materialised_views
+
 
 # Create connections
 # create postgres engine this is the connection to the oracle database
@@ -48,5 +52,5 @@ df.to_sql(name='tbl_courses',
             index=False
           )
 
-
-
+# Refresh the materialised views built on the uploaded tables
+refresh_materialised_views(postgres_engine, schemas=['course_enhancement'])
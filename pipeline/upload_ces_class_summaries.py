@@ -23,6 +23,10 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.materialised_views import refresh_materialised_views
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -199,3 +203,5 @@ for filename in os.listdir(directory):
     else:
         continue
 
+# Refresh the materialised views built on the uploaded tables
+refresh_materialised_views(postgres_engine, schemas=['ces'])
@@ -8,6 +8,11 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.materialised_views import refresh_materialised_views
+from general.comment_cleaning import clean_comments
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -55,6 +60,9 @@ def upload_course_comments_from_excel(directory, filename, engine,
 
   mask = df.program_code == 'Unknown'
   df.loc[mask, 'program_code'] = 'UNKNW'
+
+  # Clean the comments once here so the packs can use them as stored
+  df = clean_comments(df, ['best', 'improve'], how='all', null_value='')
   
   df = df.infer_objects()
 
@@ -88,3 +96,5 @@ for filename in os.listdir(directory):
     else:
         continue
 
+# Refresh the materialised views built on the uploaded tables
+refresh_materialised_views(postgres_engine, schemas=['ces'])
@@ -8,6 +8,10 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.materialised_views import refresh_materialised_views
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -61,4 +65,5 @@ filename = 'Comment_themes_2018S2_Wave3_VBE_S1_leftovers.xlsx'
 print(os.path.join(directory, filename))
 upload_course_comments_themes_from_excel(directory, filename, postgres_engine)
 
-
+# Refresh the materialised views built on the uploaded tables
+refresh_materialised_views(postgres_engine, schemas=['ces', 'course_enhancement'])
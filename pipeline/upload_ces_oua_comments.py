@@ -8,6 +8,10 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.comment_cleaning import clean_comments
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -59,6 +63,7 @@ def upload_course_comments_from_excel(directory, filename, engine,
   df = df.infer_objects()
   
   df = df.loc[df['classkey'].notna()]
+  df = clean_comments(df, ['best', 'improve'], how='all', null_value='')
 
   # print(tabulate(df, headers='keys'))
   
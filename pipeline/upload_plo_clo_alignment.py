@@ -0,0 +1,50 @@
+'''
+Load the completed PLO to CLO alignment workbooks
+  - returned PLO_CLO_alignment_<program>_28Feb2019.xlsx files (PLO_CLO_mapping_success_v1.6.py)
+  - into Local postgres Database
+      - programs.tbl_plo_clo_alignment
+      - programs.tbl_plo_audit
+      - courses.tbl_clo_audit
+
+Copy the returned files into 'directory'.
+Rows of programs already loaded are replaced, rows that fail validation are
+written to the issues file and not loaded.
+
+Peter Ryan March 2019
+'''
+
+import glob
+from tabulate import tabulate
+from sqlalchemy import create_engine
+
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+
+from general.plo_clo_harvester import (
+  harvest_workbooks,
+  load_harvest
+)
+
+# Directory containing returned files
+directory = 'H:\\Projects\\CoB\\Program Transformation\\CLO mapping\\Success\\Returned\\'
+issues_filename = 'PLO_CLO_alignment_issues.xlsx'
+
+
+if __name__ == '__main__':
+  # Create connections
+  postgres_user = 'pjryan'
+  postgres_host = 'localhost'
+  postgres_dbname = 'postgres'
+  postgres_pw = input("Postgres Password: ")
+  engine_string = 'postgresql+psycopg2://{}:{}@{}/{}'.format(postgres_user,
+                                                             postgres_pw,
+                                                             postgres_host,
+                                                             postgres_dbname)
+  postgres_engine = create_engine(engine_string)
+
+  harvest = harvest_workbooks(glob.glob(directory + 'PLO_CLO_alignment_*.xlsx'))
+  if len(harvest['issues']) > 0:
+    print(tabulate(harvest['issues'][:50], headers='keys'))
+    harvest['issues'].to_excel(directory + issues_filename, index=False)
+
+  load_harvest(harvest, postgres_engine)
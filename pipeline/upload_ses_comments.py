@@ -8,6 +8,10 @@ import psycopg2
 from tabulate import tabulate
 from sqlalchemy import (create_engine, orm)
 
+import sys
+sys.path.append('c:\\Peter\\GitHub\\CoB\\')
+from general.comment_cleaning import clean_comments
+
 # Create connections
 # create postgres engine this is the connection to the oracle database
 postgres_user = 'pjryan'
@@ -41,8 +45,7 @@ def upload_ses_comments_from_excel(directory, filename, engine,
   year = filename2.split('_')[3].split('.')[0]
   
   df.columns = ['best', 'improve']
-  df = df.dropna(subset=['best', 'improve'], how='all')
-  df = df.fillna('')
+  df = clean_comments(df, ['best', 'improve'], how='all', null_value='')
 
   df['year'] = int(year)
   df['level'] = level
@@ -95,7 +98,7 @@ def upload_comments_from_excel(directory, filename, engine,
 
   print(tabulate(df, headers='keys'))
   
-  df = df.dropna(subset=['best', 'improve'], how='all')
+  df = clean_comments(df, ['best', 'improve'], how='all', null_value='')
   df = df.fillna('')
   
   df = df.infer_objects()
@@ -16,6 +16,7 @@ from general.db_helper_functions import (
   connect_to_postgres_db,
   db_extract_query_to_dataframe
 )
+from general.ces_teacher_data import load_teacher_data
 
 '''--------------------------------- Connect to Database  ----------------------------'''
 # create postgres engine this is the connection to the postgres database
@@ -39,7 +40,8 @@ def get_data(cur, tbl, schema='ces'):
         "".format(schema, tbl)
   return db_extract_query_to_dataframe(qry, cur, print_messages=False)
 
-df_teacher = get_data(postgres_cur, tbl='vw8501_teacher_efm_clean')
+df_teacher = load_teacher_data(postgres_cur, tbl='vw8501_teacher_efm_clean', schema='ces',
+                               order_by=None, report=True)
 df_course = get_data(postgres_cur, tbl='vw8511_course_efm_clean')
 
 